@@ -13,8 +13,13 @@ Fecha: 2024
 =============================================================================
 """
 
-import requests
 from scraper import InfocasasScraper
+from scraper_async import AsyncInfocasasScraper
+from metricas import LLM_RESPUESTAS, LLM_SEGUNDOS
+from modelo import Propiedad
+from replica import grabando, grabar_completado, redirigir
+from transporte import obtener_sesion, obtener_cliente_async
+import asyncio
 import json
 import re
 import time
@@ -81,8 +86,9 @@ NUNCA así:
 - Propiedad 2: ...
 * Casa en..."""
 
-        # Inicializar scraper
+        # Inicializar scraper (síncrono para CLI, asíncrono para el backend)
         self.scraper = InfocasasScraper()
+        self.scraper_async = AsyncInfocasasScraper()
         
         # ======================================================================
         # FILTROS DE BÚSQUEDA ACUMULATIVOS
@@ -96,8 +102,9 @@ NUNCA así:
             'dormitorios': None          # cantidad de dormitorios
         }
         
-        # Última búsqueda realizada (para referencias posteriores)
-        self.ultima_busqueda = None
+        # Última búsqueda realizada (para referencias posteriores), compacta:
+        # (propiedades como Propiedad, ubicación buscada, operación)
+        self._ultima_busqueda = None
     
     # ==========================================================================
     # LIMPIEZA DE DATOS SENSIBLES
@@ -241,7 +248,8 @@ NUNCA así:
     
     def buscar_propiedades(self) -> dict:
         """
-        Ejecuta la búsqueda usando los filtros acumulados.
+        Ejecuta la búsqueda usando los filtros acumulados y la guarda como
+        última búsqueda.
         
         Returns:
             Diccionario con total de resultados y lista de propiedades
@@ -254,19 +262,74 @@ NUNCA así:
             max_price=self.filtros['presupuesto_max'],
             bedrooms=self.filtros['dormitorios']
         )
+        return self._recordar_busqueda(propiedades)
+    
+    async def buscar_propiedades_async(self) -> dict:
+        """
+        Versión asíncrona de buscar_propiedades (no bloquea el event loop).
         
-        # Filtrar manualmente por precio si es necesario
-        if self.filtros['presupuesto_max']:
-            propiedades = [
-                p for p in propiedades 
-                if p['precio']['monto'] and 
-                   p['precio']['monto'] <= self.filtros['presupuesto_max']
-            ]
-
-        # Construir resultado estructurado
+        Returns:
+            Diccionario con total de resultados y lista de propiedades
+        """
+        propiedades = await self.scraper_async.search_properties(
+            operation=self.filtros['operacion'],
+            prop_type=self.filtros['tipo_propiedad'],
+            location=self.filtros['ubicacion'],
+            max_price=self.filtros['presupuesto_max'],
+            bedrooms=self.filtros['dormitorios']
+        )
+        return self._recordar_busqueda(propiedades)
+    
+    def _filtrar_presupuesto(self, propiedades: list) -> list:
+        """Descarta las propiedades sin precio o por encima del presupuesto."""
+        if not self.filtros['presupuesto_max']:
+            return propiedades
+        return [
+            p for p in propiedades 
+            if p['precio']['monto'] and 
+               p['precio']['monto'] <= self.filtros['presupuesto_max']
+        ]
+    
+    def _recordar_busqueda(self, propiedades: list) -> dict:
+        """
+        Guarda la búsqueda como Propiedad (compacta: la sesión puede durar
+        mucho) y retorna el resultado estructurado para el modelo.
+        """
+        propiedades = self._filtrar_presupuesto(propiedades)
+        ubicacion = self.filtros['ubicacion_solicitada'] or self.filtros['ubicacion']
+        operacion = self.filtros['operacion'] or 'venta'
+        self._ultima_busqueda = (tuple(Propiedad.desde_dict(p) for p in propiedades), ubicacion, operacion)
+        return self._resumir_resultados(propiedades, ubicacion, operacion)
+    
+    @property
+    def ultima_busqueda(self):
+        """Resultado estructurado de la última búsqueda (se arma en cada acceso)."""
+        if self._ultima_busqueda is None:
+            return None
+        propiedades, ubicacion, operacion = self._ultima_busqueda
+        return self._resumir_resultados([p.to_dict() for p in propiedades], ubicacion, operacion)
+    
+    def _formatear_resultados(self, propiedades: list) -> dict:
+        """
+        Filtra por presupuesto y arma el resultado estructurado para el modelo.
+        
+        Args:
+            propiedades: Lista de propiedades devuelta por el scraper
+            
+        Returns:
+            Diccionario con total de resultados y lista de propiedades
+        """
+        return self._resumir_resultados(
+            self._filtrar_presupuesto(propiedades),
+            self.filtros['ubicacion_solicitada'] or self.filtros['ubicacion'],
+            self.filtros['operacion'] or 'venta'
+        )
+    
+    def _resumir_resultados(self, propiedades: list, ubicacion_buscada: str, operacion: str) -> dict:
+        """Resultado estructurado (total y propiedades numeradas) de propiedades ya filtradas."""
         resultado = {
             'total': len(propiedades),
-            'ubicacion_buscada': self.filtros['ubicacion_solicitada'] or self.filtros['ubicacion'],
+            'ubicacion_buscada': ubicacion_buscada,
             'propiedades': []
         }
         
@@ -303,7 +366,7 @@ NUNCA así:
                 'banos': prop['caracteristicas']['banos'] or '?',
                 'm2': m2_str,
                 'tipo': prop['informacion_basica'].get('tipo_propiedad', 'Casa'),
-                'operacion': self.filtros['operacion'] or 'venta',
+                'operacion': operacion,
                 'destacado': prop.get('destacado', False),
                 'imagenes': prop.get('imagenes', []),
                 'coordenadas': prop['ubicacion'].get('coordenadas'),
@@ -334,12 +397,105 @@ NUNCA así:
         
         if debe_buscar:
             try:
-                resultados = self.buscar_propiedades()
-                self.ultima_busqueda = resultados
-                resultados_json = resultados
+                resultados_json = self.buscar_propiedades()
             except Exception as e:
                 print(f"[DEBUG] Error en búsqueda: {e}")
         
+        headers, data = self._preparar_llamada_llm(mensaje, resultados_json)
+        
+        try:
+            response = self._llamar_llm(headers, data, timeout=30)
+            
+            # Reintentar en caso de error temporal (429, 502, 503)
+            if response.status_code in [429, 503, 502]:
+                time.sleep(2)
+                response = self._llamar_llm(headers, data, timeout=45)
+            
+            if grabando():
+                grabar_completado(data, response)
+            return self._procesar_respuesta_llm(mensaje, response)
+            
+        except Exception as e:
+            print(f"[DEBUG] Excepción: {str(e)}")
+            return "Disculpá, se cortó nuestra conexión. ¿Me repetís lo último?"
+
+    async def chat_async(self, mensaje: str) -> str:
+        """
+        Versión asíncrona de chat: la búsqueda y la llamada a OpenRouter
+        no bloquean el event loop del backend.
+        
+        Args:
+            mensaje: Mensaje del usuario
+            
+        Returns:
+            Respuesta del agente
+        """
+        # Extraer filtros del mensaje actual
+        self.extraer_filtros(mensaje)
+        
+        # Determinar si debemos buscar propiedades
+        debe_buscar = self._tiene_filtros_completos()
+        resultados_json = None
+        
+        if debe_buscar:
+            try:
+                resultados_json = await self.buscar_propiedades_async()
+            except Exception as e:
+                print(f"[DEBUG] Error en búsqueda: {e}")
+        
+        headers, data = self._preparar_llamada_llm(mensaje, resultados_json)
+        
+        try:
+            response = await self._llamar_llm_async(headers, data, timeout=30)
+            
+            # Reintentar en caso de error temporal (429, 502, 503)
+            if response.status_code in [429, 503, 502]:
+                await asyncio.sleep(2)
+                response = await self._llamar_llm_async(headers, data, timeout=45)
+            
+            if grabando():
+                grabar_completado(data, response)
+            return self._procesar_respuesta_llm(mensaje, response)
+            
+        except Exception as e:
+            print(f"[DEBUG] Excepción: {str(e)}")
+            return "Disculpá, se cortó nuestra conexión. ¿Me repetís lo último?"
+
+    def _llamar_llm(self, headers: dict, data: dict, timeout: int):
+        """POST a OpenRouter, con su latencia y estado en las métricas."""
+        with LLM_SEGUNDOS.cronometrar():
+            try:
+                response = obtener_sesion().post(redirigir(self.api_url), headers=headers, json=data, timeout=timeout)
+            except Exception:
+                LLM_RESPUESTAS.inc(estado='error')
+                raise
+        LLM_RESPUESTAS.inc(estado=response.status_code)
+        return response
+
+    async def _llamar_llm_async(self, headers: dict, data: dict, timeout: int):
+        """Versión asíncrona de _llamar_llm."""
+        with LLM_SEGUNDOS.cronometrar():
+            try:
+                response = await obtener_cliente_async().post(
+                    redirigir(self.api_url), headers=headers, json=data, timeout=timeout
+                )
+            except Exception:
+                LLM_RESPUESTAS.inc(estado='error')
+                raise
+        LLM_RESPUESTAS.inc(estado=response.status_code)
+        return response
+
+    def _preparar_llamada_llm(self, mensaje: str, resultados_json=None) -> tuple:
+        """
+        Arma headers y payload para OpenRouter con el contexto de búsqueda.
+        
+        Args:
+            mensaje: Mensaje del usuario
+            resultados_json: Resultados de búsqueda (opcional)
+            
+        Returns:
+            Tupla (headers, data)
+        """
         # Construir el contexto dinámico
         system_prompt = self._construir_system_prompt(resultados_json)
         
@@ -372,39 +528,34 @@ NUNCA así:
             "max_tokens": 2048
         }
         
-        try:
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if 'choices' in result and len(result['choices']) > 0:
-                    respuesta_texto = result['choices'][0]['message']['content']
-                    
-                    # Guardar en historial
-                    self.history.append({"role": "user", "content": mensaje})
-                    self.history.append({"role": "assistant", "content": respuesta_texto})
-                    
-                    return respuesta_texto
-                else:
-                    return "No recibí respuesta del modelo."
-            else:
-                # Reintentar en caso de error temporal (429, 502, 503)
-                if response.status_code in [429, 503, 502]:
-                    time.sleep(2)
-                    response = requests.post(self.api_url, headers=headers, json=data, timeout=45)
-                    if response.status_code == 200:
-                        result = response.json()
-                        respuesta_texto = result['choices'][0]['message']['content']
-                        self.history.append({"role": "user", "content": mensaje})
-                        self.history.append({"role": "assistant", "content": respuesta_texto})
-                        return respuesta_texto
+        return headers, data
 
-                print(f"[DEBUG] Error API OpenRouter: {response.status_code} - {response.text}")
-                return "Disculpá, tuve un problemita técnico con la conexión. ¿Podemos intentar de nuevo?"
+    def _procesar_respuesta_llm(self, mensaje: str, response) -> str:
+        """
+        Interpreta la respuesta de OpenRouter y actualiza el historial.
+        
+        Args:
+            mensaje: Mensaje original del usuario
+            response: Respuesta HTTP (requests o httpx)
             
-        except Exception as e:
-            print(f"[DEBUG] Excepción: {str(e)}")
-            return "Disculpá, se cortó nuestra conexión. ¿Me repetís lo último?"
+        Returns:
+            Texto de respuesta para el usuario
+        """
+        if response.status_code == 200:
+            result = response.json()
+            if 'choices' in result and len(result['choices']) > 0:
+                respuesta_texto = result['choices'][0]['message']['content']
+                
+                # Guardar en historial
+                self.history.append({"role": "user", "content": mensaje})
+                self.history.append({"role": "assistant", "content": respuesta_texto})
+                
+                return respuesta_texto
+            else:
+                return "No recibí respuesta del modelo."
+        
+        print(f"[DEBUG] Error API OpenRouter: {response.status_code} - {response.text}")
+        return "Disculpá, tuve un problemita técnico con la conexión. ¿Podemos intentar de nuevo?"
 
     def _construir_system_prompt(self, resultados_json=None) -> str:
         """
@@ -462,7 +613,7 @@ NUNCA así:
                 zona = resultados_json.get('ubicacion_buscada', 'esa zona')
                 prompt += f"\n\n[SIN RESULTADOS]: No hay propiedades disponibles en {zona}.\n"
                 prompt += "INSTRUCCIÓN: Decile al cliente que no encontraste nada y sugerí alternativas."
-        elif self.ultima_busqueda and self.ultima_busqueda['total'] > 0:
+        elif self._ultima_busqueda and self._ultima_busqueda[0]:
             # Usar búsqueda previa si no hay nuevos resultados
             prompt += f"\n\n[RESULTADOS ANTERIORES DISPONIBLES]\n"
             prompt += json.dumps(self.ultima_busqueda, ensure_ascii=False, indent=2)
@@ -495,7 +646,7 @@ NUNCA así:
     def reset_conversacion(self):
         """Reinicia la conversación y los filtros."""
         self.history = []
-        self.ultima_busqueda = None
+        self._ultima_busqueda = None
         self.filtros = {
             'operacion': None,
             'tipo_propiedad': None,
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+ALMACÉN LOCAL DE PROPIEDADES - INMO
+=============================================================================
+Base SQLite con las propiedades extraídas de InfoCasas. La llena el crawler
+(crawler.py) y guarda además el progreso de cada combinación
+operación × tipo × ubicación para poder retomar un recorrido interrumpido.
+
+InfocasasScraper la consulta antes de ir a InfoCasas: si la combinación
+buscada se recorrió dentro de la ventana de frescura, la respuesta sale de
+los índices locales en milisegundos.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+ALMACEN_CONFIG = {
+    'ruta': os.getenv(
+        'INMO_DB_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos', 'propiedades.db')
+    ),
+    # Responder búsquedas desde el almacén (si no, solo lo usa el crawler)
+    'busqueda_local': os.getenv('INMO_BUSQUEDA_LOCAL', 'false').lower() == 'true',
+    # Antigüedad máxima de un recorrido para considerarlo vigente
+    'frescura_horas': float(os.getenv('INMO_FRESCURA_HORAS', '24')),
+    # Propiedades por página en las respuestas locales
+    'por_pagina': int(os.getenv('INMO_LOCAL_POR_PAGINA', '24')),
+}
+
+# Búsquedas respondidas localmente vs. derivadas a InfoCasas
+ESTADISTICAS_ALMACEN = {
+    'locales': 0,
+    'vencidas': 0,
+}
+_lock_estadisticas = threading.Lock()
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS propiedades (
+    id              TEXT NOT NULL,
+    operacion       TEXT NOT NULL,
+    tipo            TEXT NOT NULL,
+    ciudad          TEXT,
+    barrio          TEXT,
+    departamento    TEXT,
+    precio          REAL,
+    moneda          TEXT,
+    dormitorios     INTEGER,
+    banos           INTEGER,
+    latitud         REAL,
+    longitud        REAL,
+    destacado       INTEGER NOT NULL DEFAULT 0,
+    hash            TEXT NOT NULL,
+    datos           TEXT NOT NULL,
+    creado_en       REAL NOT NULL,
+    actualizado_en  REAL NOT NULL,
+    visto_en        REAL NOT NULL,
+    PRIMARY KEY (operacion, id)
+);
+
+-- Índices compuestos para las búsquedas: ubicación + operación + tipo + precio.
+-- Incluyen los demás filtros, el orden y visto_en para no leer las filas (con
+-- el JSON) de los candidatos que no llegan a la página pedida.
+CREATE INDEX IF NOT EXISTS idx_prop_ciudad
+    ON propiedades (ciudad, operacion, tipo, precio, dormitorios, banos, destacado, creado_en, visto_en);
+CREATE INDEX IF NOT EXISTS idx_prop_departamento
+    ON propiedades (departamento, operacion, tipo, precio, dormitorios, banos, destacado, creado_en, visto_en);
+CREATE INDEX IF NOT EXISTS idx_prop_barrio
+    ON propiedades (barrio, operacion, tipo, precio, dormitorios, banos, destacado, creado_en, visto_en);
+
+CREATE TABLE IF NOT EXISTS unidades_crawl (
+    clave           TEXT PRIMARY KEY,
+    operacion       TEXT NOT NULL,
+    tipo            TEXT NOT NULL,
+    ubicacion       TEXT NOT NULL,
+    estado          TEXT NOT NULL DEFAULT 'pendiente',
+    ultima_pagina   INTEGER NOT NULL DEFAULT 0,
+    propiedades     INTEGER NOT NULL DEFAULT 0,
+    iniciada_en     REAL,
+    completada_en   REAL
+);
+
+CREATE TABLE IF NOT EXISTS corridas (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    inicio          REAL NOT NULL,
+    fin             REAL,
+    estadisticas    TEXT
+);
+"""
+
+
+def _slug(nombre: Optional[str]) -> Optional[str]:
+    """Convierte un nombre de InfoCasas ('Fernando de la Mora') en slug de URL."""
+    if not nombre:
+        return None
+    slug = nombre.lower().strip().replace(' ', '-')
+    for acento, sin_acento in (('á', 'a'), ('é', 'e'), ('í', 'i'), ('ó', 'o'), ('ú', 'u'), ('ñ', 'n'), ('ü', 'u')):
+        slug = slug.replace(acento, sin_acento)
+    return slug
+
+
+def hash_propiedad(prop: Dict[str, Any]) -> str:
+    """Hash estable del contenido de una propiedad (para detectar cambios)."""
+    canonico = json.dumps(prop, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(canonico.encode('utf-8')).hexdigest()
+
+
+class AlmacenPropiedades:
+    """
+    Almacén SQLite de propiedades y del progreso del crawler.
+
+    Una sola conexión compartida entre hilos, protegida por un lock (SQLite
+    serializa las escrituras de todos modos).
+    """
+
+    def __init__(self, ruta: Optional[str] = None):
+        """
+        Args:
+            ruta: Archivo de la base (por defecto ALMACEN_CONFIG['ruta'])
+        """
+        self.ruta = ruta or ALMACEN_CONFIG['ruta']
+        if self.ruta != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        with self._lock:
+            self._conexion.execute('PRAGMA journal_mode=WAL')
+            self._conexion.execute('PRAGMA synchronous=NORMAL')
+            self._conexion.executescript(_ESQUEMA)
+            self._migrar()
+            self._conexion.commit()
+
+    def _migrar(self):
+        """Agrega a una base anterior las columnas que le faltan (llamar con el lock)."""
+        columnas = {fila['name'] for fila in self._conexion.execute('PRAGMA table_info(unidades_crawl)')}
+        if 'iniciada_en' not in columnas:
+            self._conexion.execute('ALTER TABLE unidades_crawl ADD COLUMN iniciada_en REAL')
+        indexadas = {fila['name'] for fila in self._conexion.execute('PRAGMA index_info(idx_prop_ciudad)')}
+        if 'visto_en' not in indexadas:
+            for indice in ('idx_prop_ciudad', 'idx_prop_departamento', 'idx_prop_barrio'):
+                self._conexion.execute(f'DROP INDEX IF EXISTS {indice}')
+            self._conexion.executescript(_ESQUEMA)
+
+    def cerrar(self):
+        """Cierra la conexión a la base."""
+        with self._lock:
+            self._conexion.close()
+
+    # ==========================================================================
+    # PROPIEDADES
+    # ==========================================================================
+
+    def guardar_propiedades(self, operacion: str, tipo: str, propiedades: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Inserta o actualiza propiedades (con la forma de _extract_property_data).
+
+        Las que no cambiaron desde la última vez (mismo hash) no se reescriben,
+        solo se marca que se volvieron a ver.
+
+        Returns:
+            Contadores {'nuevas', 'actualizadas', 'sin_cambios'}
+        """
+        contadores = {'nuevas': 0, 'actualizadas': 0, 'sin_cambios': 0}
+        ahora = time.time()
+
+        with self._lock:
+            cursor = self._conexion.cursor()
+            for prop in propiedades:
+                prop_id = prop['identificacion']['id']
+                if prop_id is None:
+                    continue
+                prop_id = str(prop_id)
+                hash_actual = hash_propiedad(prop)
+
+                fila = cursor.execute(
+                    'SELECT hash FROM propiedades WHERE operacion = ? AND id = ?',
+                    (operacion, prop_id)
+                ).fetchone()
+
+                if fila is not None and fila['hash'] == hash_actual:
+                    cursor.execute(
+                        'UPDATE propiedades SET visto_en = ? WHERE operacion = ? AND id = ?',
+                        (ahora, operacion, prop_id)
+                    )
+                    contadores['sin_cambios'] += 1
+                    continue
+
+                ubicacion = prop['ubicacion']
+                coordenadas = ubicacion.get('coordenadas') or {}
+                valores = (
+                    tipo,
+                    _slug(ubicacion.get('ciudad')),
+                    _slug(ubicacion.get('barrio')),
+                    _slug(ubicacion.get('departamento')),
+                    prop['precio']['monto'],
+                    prop['precio']['moneda'],
+                    prop['caracteristicas']['dormitorios'],
+                    prop['caracteristicas']['banos'],
+                    coordenadas.get('latitud'),
+                    coordenadas.get('longitud'),
+                    1 if prop.get('destacado') else 0,
+                    hash_actual,
+                    json.dumps(prop, ensure_ascii=False),
+                )
+
+                if fila is None:
+                    cursor.execute(
+                        '''INSERT INTO propiedades (
+                               tipo, ciudad, barrio, departamento, precio, moneda,
+                               dormitorios, banos, latitud, longitud, destacado, hash, datos,
+                               operacion, id, creado_en, actualizado_en, visto_en
+                           ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                        valores + (operacion, prop_id, ahora, ahora, ahora)
+                    )
+                    contadores['nuevas'] += 1
+                else:
+                    cursor.execute(
+                        '''UPDATE propiedades SET
+                               tipo = ?, ciudad = ?, barrio = ?, departamento = ?, precio = ?, moneda = ?,
+                               dormitorios = ?, banos = ?, latitud = ?, longitud = ?, destacado = ?,
+                               hash = ?, datos = ?, actualizado_en = ?, visto_en = ?
+                           WHERE operacion = ? AND id = ?''',
+                        valores + (ahora, ahora, operacion, prop_id)
+                    )
+                    contadores['actualizadas'] += 1
+            self._conexion.commit()
+
+        return contadores
+
+    def contar_propiedades(self) -> int:
+        """Cantidad total de propiedades almacenadas."""
+        with self._lock:
+            return self._conexion.execute('SELECT COUNT(*) FROM propiedades').fetchone()[0]
+
+    def iterar_propiedades(self, lote: int = 1000) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Recorre todas las propiedades como (operacion, tipo, datos), de a
+        'lote' filas por consulta para no retener el lock entre lotes.
+        """
+        ultima = 0
+        while True:
+            with self._lock:
+                filas = self._conexion.execute(
+                    'SELECT rowid, operacion, tipo, datos FROM propiedades WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                    (ultima, lote)
+                ).fetchall()
+            if not filas:
+                return
+            for fila in filas:
+                yield fila['operacion'], fila['tipo'], json.loads(fila['datos'])
+            ultima = filas[-1]['rowid']
+
+    def buscar(self,
+               operacion: str,
+               tipos: Optional[List[str]],
+               ubicacion: str,
+               precio_min: Optional[int] = None,
+               precio_max: Optional[int] = None,
+               dormitorios: Optional[int] = None,
+               banos: Optional[int] = None,
+               pagina: int = 1,
+               por_pagina: Optional[int] = None,
+               visto_desde: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Busca propiedades en los índices locales.
+
+        Args:
+            operacion: 'venta' o 'alquiler'
+            tipos: Slugs de tipo ('casas', 'departamentos'...) o None para todos
+            ubicacion: Slug de ciudad, departamento o barrio
+            pagina: Página (1 en adelante) de tamaño por_pagina
+            visto_desde: Solo las vistas desde ese momento (ver inicio_pasadas)
+
+        Returns:
+            Propiedades con la forma de _extract_property_data
+        """
+        por_pagina = por_pagina or ALMACEN_CONFIG['por_pagina']
+        condiciones = ['operacion = ?']
+        parametros: List[Any] = [operacion]
+
+        if tipos:
+            condiciones.append(f"tipo IN ({', '.join('?' * len(tipos))})")
+            parametros.extend(tipos)
+        if precio_min:
+            condiciones.append('precio >= ?')
+            parametros.append(precio_min)
+        if precio_max:
+            condiciones.append('precio <= ?')
+            parametros.append(precio_max)
+        if dormitorios:
+            condiciones.append('dormitorios = ?')
+            parametros.append(dormitorios)
+        if banos:
+            condiciones.append('banos = ?')
+            parametros.append(banos)
+        if visto_desde:
+            condiciones.append('visto_en >= ?')
+            parametros.append(visto_desde)
+
+        filtro = ' AND '.join(condiciones)
+        # Una rama por índice de ubicación: cada una se resuelve solo con su
+        # índice; el JSON se lee únicamente para las filas de la página.
+        ramas = ' UNION '.join(
+            f'SELECT rowid AS fila, destacado, creado_en FROM propiedades WHERE {columna} = ? AND {filtro}'
+            for columna in ('ciudad', 'departamento', 'barrio')
+        )
+        orden = 'destacado DESC, creado_en DESC, fila'
+        consulta = (
+            f'SELECT p.datos FROM ('
+            f'SELECT fila, destacado, creado_en FROM ({ramas}) ORDER BY {orden} LIMIT ? OFFSET ?'
+            f') AS pagina JOIN propiedades AS p ON p.rowid = pagina.fila '
+            f'ORDER BY pagina.destacado DESC, pagina.creado_en DESC, pagina.fila'
+        )
+        valores = []
+        for _ in range(3):
+            valores.append(ubicacion)
+            valores.extend(parametros)
+        valores.extend([por_pagina, (max(pagina, 1) - 1) * por_pagina])
+
+        with self._lock:
+            filas = self._conexion.execute(consulta, valores).fetchall()
+        return [json.loads(fila['datos']) for fila in filas]
+
+    def esta_fresco(self, operacion: str, tipos: List[str], ubicacion: str,
+                    frescura_horas: Optional[float] = None) -> bool:
+        """
+        Indica si todas las combinaciones operación × tipo × ubicación se
+        recorrieron completas dentro de la ventana de frescura.
+        """
+        if frescura_horas is None:
+            frescura_horas = ALMACEN_CONFIG['frescura_horas']
+        limite = time.time() - frescura_horas * 3600
+        claves = [f"{operacion}/{tipo}/{ubicacion}" for tipo in tipos]
+
+        with self._lock:
+            vigentes = self._conexion.execute(
+                f'''SELECT COUNT(*) FROM unidades_crawl
+                    WHERE clave IN ({', '.join('?' * len(claves))})
+                      AND completada_en IS NOT NULL AND completada_en >= ?''',
+                claves + [limite]
+            ).fetchone()[0]
+        return vigentes == len(claves)
+
+    def inicio_pasadas(self, operacion: str, tipos: List[str], ubicacion: str) -> float:
+        """
+        Inicio del recorrido completo más antiguo de las combinaciones: una
+        propiedad vista antes no apareció en el último recorrido de su
+        unidad (0 si alguna no tiene inicio anotado).
+        """
+        claves = [f"{operacion}/{tipo}/{ubicacion}" for tipo in tipos]
+        with self._lock:
+            inicio = self._conexion.execute(
+                f'''SELECT MIN(COALESCE(iniciada_en, 0)) FROM unidades_crawl
+                    WHERE clave IN ({', '.join('?' * len(claves))})''',
+                claves
+            ).fetchone()[0]
+        return inicio or 0.0
+
+    # ==========================================================================
+    # PROGRESO DEL CRAWLER (CHECKPOINTS)
+    # ==========================================================================
+
+    def registrar_unidades(self, unidades: List[Dict[str, str]]):
+        """Da de alta las unidades de trabajo que todavía no existen."""
+        with self._lock:
+            self._conexion.executemany(
+                '''INSERT OR IGNORE INTO unidades_crawl (clave, operacion, tipo, ubicacion)
+                   VALUES (:clave, :operacion, :tipo, :ubicacion)''',
+                unidades
+            )
+            self._conexion.commit()
+
+    def unidades_pendientes(self, claves: List[str]) -> List[Dict[str, Any]]:
+        """Retorna, en el orden dado, las unidades que no están completas."""
+        with self._lock:
+            filas = {
+                fila['clave']: dict(fila)
+                for fila in self._conexion.execute(
+                    "SELECT * FROM unidades_crawl WHERE estado != 'completa'"
+                )
+            }
+        return [filas[clave] for clave in claves if clave in filas]
+
+    def iniciar_pasada(self, clave: str):
+        """
+        Anota el inicio del recorrido de una unidad. Al retomar uno cortado se
+        conserva el inicio original; una unidad a medio recorrer de antes de
+        esta columna queda sin inicio (y su recorrido no retira nada).
+        """
+        with self._lock:
+            self._conexion.execute(
+                '''UPDATE unidades_crawl
+                   SET iniciada_en = COALESCE(iniciada_en, CASE WHEN ultima_pagina = 0 THEN ? END)
+                   WHERE clave = ?''',
+                (time.time(), clave)
+            )
+            self._conexion.commit()
+
+    def marcar_pagina(self, clave: str, pagina: int, propiedades: int):
+        """Checkpoint: la página 'pagina' de la unidad quedó guardada."""
+        with self._lock:
+            self._conexion.execute(
+                '''UPDATE unidades_crawl
+                   SET estado = 'en_curso', ultima_pagina = ?, propiedades = propiedades + ?
+                   WHERE clave = ?''',
+                (pagina, propiedades, clave)
+            )
+            self._conexion.commit()
+
+    def completar_unidad(self, clave: str, retirar: bool = True) -> int:
+        """
+        Marca una unidad como recorrida por completo. Con retirar=True borra
+        las propiedades de la unidad que el recorrido no vio (vendidas,
+        alquiladas o dadas de baja en InfoCasas).
+
+        Returns:
+            Cantidad de propiedades retiradas
+        """
+        with self._lock:
+            unidad = self._conexion.execute(
+                'SELECT operacion, tipo, ubicacion, iniciada_en FROM unidades_crawl WHERE clave = ?',
+                (clave,)
+            ).fetchone()
+            retiradas = 0
+            if retirar and unidad is not None and unidad['iniciada_en'] is not None:
+                retiradas = self._conexion.execute(
+                    '''DELETE FROM propiedades
+                       WHERE operacion = ? AND tipo = ? AND visto_en < ?
+                         AND (ciudad = ? OR departamento = ? OR barrio = ?)''',
+                    (unidad['operacion'], unidad['tipo'], unidad['iniciada_en'],
+                     unidad['ubicacion'], unidad['ubicacion'], unidad['ubicacion'])
+                ).rowcount
+            self._conexion.execute(
+                "UPDATE unidades_crawl SET estado = 'completa', completada_en = ? WHERE clave = ?",
+                (time.time(), clave)
+            )
+            self._conexion.commit()
+        return retiradas
+
+    def reiniciar_unidades(self):
+        """
+        Vuelve todas las unidades a 'pendiente' para un recorrido nuevo. Dejan
+        de estar vigentes hasta completarse otra vez: a mitad del recorrido el
+        almacén mezcla propiedades viejas y nuevas.
+        """
+        with self._lock:
+            self._conexion.execute(
+                '''UPDATE unidades_crawl
+                   SET estado = 'pendiente', ultima_pagina = 0, propiedades = 0,
+                       iniciada_en = NULL, completada_en = NULL'''
+            )
+            self._conexion.commit()
+
+    # ==========================================================================
+    # CORRIDAS
+    # ==========================================================================
+
+    def iniciar_corrida(self) -> int:
+        """Registra el inicio de una corrida del crawler y retorna su id."""
+        with self._lock:
+            cursor = self._conexion.execute('INSERT INTO corridas (inicio) VALUES (?)', (time.time(),))
+            self._conexion.commit()
+            return cursor.lastrowid
+
+    def finalizar_corrida(self, corrida_id: int, estadisticas: Dict[str, Any]):
+        """Guarda las estadísticas finales de una corrida."""
+        with self._lock:
+            self._conexion.execute(
+                'UPDATE corridas SET fin = ?, estadisticas = ? WHERE id = ?',
+                (time.time(), json.dumps(estadisticas), corrida_id)
+            )
+            self._conexion.commit()
+
+
+# =============================================================================
+# ESTADÍSTICAS
+# =============================================================================
+
+def contar_busqueda(resultado: str):
+    """Registra si una búsqueda se respondió local ('locales') o no ('vencidas')."""
+    with _lock_estadisticas:
+        ESTADISTICAS_ALMACEN[resultado] += 1
+
+
+def estadisticas_almacen() -> Dict[str, Any]:
+    """Retorna una copia de los contadores del almacén."""
+    with _lock_estadisticas:
+        estadisticas = dict(ESTADISTICAS_ALMACEN)
+    estadisticas['busqueda_local'] = ALMACEN_CONFIG['busqueda_local']
+    estadisticas['frescura_horas'] = ALMACEN_CONFIG['frescura_horas']
+    return estadisticas
@@ -14,12 +14,16 @@ Fecha: 2024
 =============================================================================
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
 import sys
 import os
+import time
+import numpy as np
 from dotenv import load_dotenv
 
 # Agregar directorio padre al path para importar módulos
@@ -32,6 +36,16 @@ load_dotenv(dotenv_path=env_path)
 
 from agente import AgenteInmoParaguay
 from scraper import InfocasasScraper
+from scraper_async import AsyncInfocasasScraper
+from transporte import estadisticas_conexiones, cerrar_cliente_async
+from parseo import estadisticas_parseo
+from almacen import estadisticas_almacen
+from cobertura import estadisticas_cobertura
+from destacados import estadisticas_destacado
+from metricas import METRICAS_CONFIG, PEDIDO_SEGUNDOS, PEDIDOS, exponer, registrar_colector
+from precarga import estadisticas_precarga, obtener_registro, PRECARGA_CONFIG
+from trafico import estadisticas_trafico
+from espacial import ESPACIAL_CONFIG, MapaPropiedades
 
 # =============================================================================
 # CONFIGURACIÓN DE LA APLICACIÓN
@@ -74,6 +88,62 @@ else:
         allow_headers=["*"],
     )
 
+@app.middleware("http")
+async def medir_pedidos(request: Request, call_next):
+    """Duración y estado de cada pedido, por endpoint (plantilla de la ruta)."""
+    inicio = time.perf_counter()
+    estado = 500
+    try:
+        response = await call_next(request)
+        estado = response.status_code
+        return response
+    finally:
+        ruta = request.scope.get('route')
+        endpoint = ruta.path if ruta is not None else 'otro'
+        PEDIDO_SEGUNDOS.observar(time.perf_counter() - inicio, endpoint=endpoint)
+        PEDIDOS.inc(endpoint=endpoint, estado=estado)
+
+# =============================================================================
+# SCRAPER COMPARTIDO
+# =============================================================================
+
+# Una sola instancia para /buscar y /ubicaciones (las conexiones HTTP se
+# comparten a nivel de proceso en transporte.py)
+scraper = InfocasasScraper()
+scraper_async = AsyncInfocasasScraper()
+
+# Catálogo del almacén local + índice espacial para /mapa (carga diferida)
+mapa = MapaPropiedades()
+
+# Precalentamiento de caches al arrancar (referencia para que no se pierda)
+precalentamiento: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def precalentar_caches():
+    """
+    Con INMO_PRECARGA=true vuelve a ejecutar en segundo plano las búsquedas
+    más populares del registro, sin demorar el arranque.
+    """
+    global precalentamiento
+    if PRECARGA_CONFIG['activa'] and PRECARGA_CONFIG['al_iniciar'] > 0:
+        registro = obtener_registro()
+        if not len(registro):
+            print(f"[PRECARGA] Registro de búsquedas vacío ({registro.ruta}): no hay nada que precalentar")
+            return
+        if registro.origen == 'semilla':
+            print(f"[PRECARGA] Sin registro guardado en {registro.ruta}: se precalienta la semilla "
+                  f"(el disco de Render gratuito no sobrevive los reinicios)")
+        precalentamiento = asyncio.create_task(scraper_async.precalentar())
+
+@app.on_event("shutdown")
+async def cerrar_conexiones():
+    """Guarda el registro de búsquedas y cierra el cliente HTTP asíncrono al apagar el servidor."""
+    if precalentamiento is not None:
+        precalentamiento.cancel()
+    if PRECARGA_CONFIG['activa']:
+        obtener_registro().guardar()
+    await cerrar_cliente_async()
+
 # =============================================================================
 # ALMACENAMIENTO DE SESIONES
 # =============================================================================
@@ -124,6 +194,7 @@ class BusquedaDirecta(BaseModel):
     dormitorios: Optional[int] = None
     banos: Optional[int] = None
     pagina: int = 1
+    usar_cache: bool = True
 
 # =============================================================================
 # ENDPOINTS DE LA API
@@ -140,7 +211,11 @@ async def root():
             "/chat": "POST - Enviar mensaje al agente",
             "/buscar": "POST - Búsqueda directa de propiedades",
             "/sesion/{session_id}": "DELETE - Reiniciar sesión",
-            "/ubicaciones": "GET - Lista de ubicaciones disponibles"
+            "/ubicaciones": "GET - Lista de ubicaciones disponibles",
+            "/mapa/area": "GET - Propiedades dentro de un rectángulo del mapa",
+            "/mapa/cercanas": "GET - Propiedades a menos de N km de un punto",
+            "/estadisticas": "GET - Estadísticas internas (conexiones HTTP, cascada, cache)",
+            "/metrics": "GET - Métricas en formato Prometheus"
         }
     }
 
@@ -157,8 +232,8 @@ async def chat(mensaje: MensajeChat):
     try:
         agente = obtener_agente(mensaje.session_id)
         
-        # Procesar mensaje
-        respuesta = agente.chat(mensaje.mensaje)
+        # Procesar mensaje (sin bloquear el event loop)
+        respuesta = await agente.chat_async(mensaje.mensaje)
         
         # Obtener datos adicionales
         filtros = agente.get_filtros_actuales()
@@ -174,6 +249,39 @@ async def chat(mensaje: MensajeChat):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error procesando mensaje: {str(e)}")
 
+def _formatear_busqueda(propiedades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Resumen de las primeras 10 propiedades para la respuesta de /buscar."""
+    resultados = []
+    for idx, prop in enumerate(propiedades[:10], 1):
+        monto = prop['precio']['monto']
+        precio_str = f"{prop['precio']['moneda']} {monto:,}" if monto else "Consultar"
+        
+        # Construir ubicación
+        partes = []
+        if prop['ubicacion']['barrio']:
+            partes.append(prop['ubicacion']['barrio'])
+        if prop['ubicacion']['ciudad']:
+            partes.append(prop['ubicacion']['ciudad'])
+        
+        resultados.append({
+            'numero': idx,
+            'id': prop['identificacion']['id'],
+            'titulo': prop['informacion_basica']['titulo'][:100],
+            'descripcion': prop['informacion_basica'].get('descripcion', '')[:300],
+            'precio': precio_str,
+            'precio_numerico': monto,
+            'moneda': prop['precio']['moneda'],
+            'ubicacion': ', '.join(partes) if partes else 'No especificada',
+            'dormitorios': prop['caracteristicas']['dormitorios'],
+            'banos': prop['caracteristicas']['banos'],
+            'm2': prop['caracteristicas']['metros_cuadrados'].get('m2_construidos'),
+            'tipo': prop['informacion_basica'].get('tipo_propiedad', 'Inmueble'),
+            'imagenes': prop.get('imagenes', []),
+            'coordenadas': prop['ubicacion'].get('coordenadas'),
+            'url': prop['enlaces'].get('url_propiedad'),
+        })
+    return resultados
+
 @app.post("/buscar")
 async def buscar_propiedades(busqueda: BusquedaDirecta):
     """
@@ -182,9 +290,7 @@ async def buscar_propiedades(busqueda: BusquedaDirecta):
     Útil para filtros visuales en el frontend.
     """
     try:
-        scraper = InfocasasScraper()
-        
-        propiedades = scraper.search_properties(
+        propiedades = await scraper_async.search_properties(
             operation=busqueda.operacion,
             prop_type=busqueda.tipo_propiedad,
             location=busqueda.ubicacion,
@@ -192,39 +298,11 @@ async def buscar_propiedades(busqueda: BusquedaDirecta):
             max_price=busqueda.precio_max,
             bedrooms=busqueda.dormitorios,
             bathrooms=busqueda.banos,
-            page=busqueda.pagina
+            page=busqueda.pagina,
+            usar_cache=busqueda.usar_cache
         )
         
-        # Formatear resultados
-        resultados = []
-        for idx, prop in enumerate(propiedades[:10], 1):
-            monto = prop['precio']['monto']
-            precio_str = f"{prop['precio']['moneda']} {monto:,}" if monto else "Consultar"
-            
-            # Construir ubicación
-            partes = []
-            if prop['ubicacion']['barrio']:
-                partes.append(prop['ubicacion']['barrio'])
-            if prop['ubicacion']['ciudad']:
-                partes.append(prop['ubicacion']['ciudad'])
-            
-            resultados.append({
-                'numero': idx,
-                'id': prop['identificacion']['id'],
-                'titulo': prop['informacion_basica']['titulo'][:100],
-                'descripcion': prop['informacion_basica'].get('descripcion', '')[:300],
-                'precio': precio_str,
-                'precio_numerico': monto,
-                'moneda': prop['precio']['moneda'],
-                'ubicacion': ', '.join(partes) if partes else 'No especificada',
-                'dormitorios': prop['caracteristicas']['dormitorios'],
-                'banos': prop['caracteristicas']['banos'],
-                'm2': prop['caracteristicas']['metros_cuadrados'].get('m2_construidos'),
-                'tipo': prop['informacion_basica'].get('tipo_propiedad', 'Inmueble'),
-                'imagenes': prop.get('imagenes', []),
-                'coordenadas': prop['ubicacion'].get('coordenadas'),
-                'url': prop['enlaces'].get('url_propiedad'),
-            })
+        resultados = _formatear_busqueda(propiedades)
         
         return {
             'total': len(propiedades),
@@ -235,6 +313,107 @@ async def buscar_propiedades(busqueda: BusquedaDirecta):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en búsqueda: {str(e)}")
 
+# =============================================================================
+# ENDPOINTS DE MAPA (ALMACÉN LOCAL + ÍNDICE ESPACIAL)
+# =============================================================================
+
+def _filtrar_catalogo(catalogo, filas, operacion, tipo_propiedad, precio_min, precio_max, dormitorios):
+    """Aplica los filtros opcionales de /mapa sobre las filas del índice."""
+    tipos = None
+    if tipo_propiedad:
+        slug = scraper.TIPOS_PROPIEDAD_URL.get(tipo_propiedad, tipo_propiedad + 's')
+        tipos = scraper.TIPOS_AGREGADOS.get(slug, [slug])
+    if not any([operacion, tipos, precio_min, precio_max, dormitorios]):
+        return filas
+    return catalogo.filtrar(
+        operacion=operacion, tipo=tipos, precio_min=precio_min,
+        precio_max=precio_max, dormitorios=dormitorios, filas=filas
+    )
+
+def _marcador(catalogo, fila: int, distancia: Optional[float] = None) -> Dict[str, Any]:
+    """Datos mínimos de una propiedad para dibujarla en el mapa."""
+    prop = catalogo.propiedades[fila]
+    imagenes = prop.imagenes
+    marcador = {
+        'id': prop.id,
+        'titulo': prop.titulo[:100],
+        'precio': f"{prop.moneda} {prop.monto:,}" if prop.monto else "Consultar",
+        'precio_numerico': prop.monto,
+        'moneda': prop.moneda,
+        'tipo': prop.tipo_propiedad,
+        'dormitorios': prop.dormitorios,
+        'coordenadas': prop.coordenadas,
+        'destacado': prop.destacado,
+        'imagen': imagenes[0]['thumbnail'] if imagenes else None,
+        'url': prop.url_propiedad,
+    }
+    if distancia is not None:
+        marcador['distancia_km'] = round(float(distancia), 3)
+    return marcador
+
+@app.get("/mapa/area")
+async def propiedades_en_area(lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                              operacion: Optional[str] = None,
+                              tipo_propiedad: Optional[str] = None,
+                              precio_min: Optional[int] = None,
+                              precio_max: Optional[int] = None,
+                              dormitorios: Optional[int] = None,
+                              limite: int = Query(200, ge=1)):
+    """
+    Propiedades del almacén local dentro del rectángulo visible del mapa.
+    
+    Si hay más que 'limite', se priorizan las destacadas.
+    """
+    try:
+        catalogo, indice = await asyncio.to_thread(mapa.obtener)
+        filas = indice.en_rectangulo(lat_min, lat_max, lng_min, lng_max)
+        filas = _filtrar_catalogo(catalogo, filas, operacion, tipo_propiedad, precio_min, precio_max, dormitorios)
+        
+        limite = min(limite, ESPACIAL_CONFIG['max_resultados'])
+        if len(filas) > limite:
+            filas_visibles = filas[np.argsort(~catalogo.destacado[filas], kind='stable')[:limite]]
+        else:
+            filas_visibles = filas
+        
+        return {
+            'total': int(len(filas)),
+            'propiedades': [_marcador(catalogo, int(fila)) for fila in filas_visibles]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en búsqueda por área: {str(e)}")
+
+@app.get("/mapa/cercanas")
+async def propiedades_cercanas(lat: float, lng: float,
+                               radio_km: float = Query(2.0, gt=0, le=100),
+                               operacion: Optional[str] = None,
+                               tipo_propiedad: Optional[str] = None,
+                               precio_min: Optional[int] = None,
+                               precio_max: Optional[int] = None,
+                               dormitorios: Optional[int] = None,
+                               limite: int = Query(200, ge=1)):
+    """
+    Propiedades del almacén local a menos de radio_km del punto, de la más
+    cercana a la más lejana.
+    """
+    try:
+        catalogo, indice = await asyncio.to_thread(mapa.obtener)
+        filas, distancias = indice.en_radio(lat, lng, radio_km)
+        filtradas = _filtrar_catalogo(catalogo, filas, operacion, tipo_propiedad, precio_min, precio_max, dormitorios)
+        if filtradas is not filas:
+            conservar = np.isin(filas, filtradas)
+            filas, distancias = filas[conservar], distancias[conservar]
+        
+        limite = min(limite, ESPACIAL_CONFIG['max_resultados'])
+        return {
+            'total': int(len(filas)),
+            'propiedades': [
+                _marcador(catalogo, int(fila), distancia)
+                for fila, distancia in zip(filas[:limite], distancias[:limite])
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en búsqueda por radio: {str(e)}")
+
 @app.delete("/sesion/{session_id}")
 async def reiniciar_sesion(session_id: str):
     """
@@ -250,8 +429,6 @@ async def obtener_ubicaciones():
     """
     Retorna las ubicaciones disponibles para búsqueda.
     """
-    scraper = InfocasasScraper()
-    
     return {
         'departamentos': [
             {'slug': d, 'nombre': d.replace('-', ' ').title()} 
@@ -283,6 +460,63 @@ async def obtener_tipos():
         ]
     }
 
+@app.get("/estadisticas")
+async def obtener_estadisticas():
+    """
+    Retorna estadísticas internas para monitoreo (reutilización de conexiones,
+    nivel ganador de la cascada de categorías, cache de resultados).
+    """
+    cache = InfocasasScraper.obtener_cache_resultados()
+    busquedas = InfocasasScraper.obtener_cache_busquedas()
+    return {
+        'http': estadisticas_conexiones(),
+        'trafico': estadisticas_trafico(),
+        'cobertura': estadisticas_cobertura(),
+        'vuelo_unico': {
+            'hilos': InfocasasScraper._vuelos.estadisticas(),
+            'async': AsyncInfocasasScraper._vuelos_async.estadisticas(),
+        },
+        'cascada': InfocasasScraper.estadisticas_cascada(),
+        'cache_resultados': cache.estadisticas() if cache else None,
+        'cache_busquedas': busquedas.estadisticas() if busquedas else None,
+        'parseo': estadisticas_parseo(),
+        'almacen': estadisticas_almacen(),
+        'destacados': estadisticas_destacado(),
+        'precarga': estadisticas_precarga(),
+        'sesiones_activas': len(sesiones),
+    }
+
+def _metricas_backend():
+    """Contadores que ya llevan los caches, la cascada y las sesiones, para /metrics."""
+    familias = [
+        ('inmo_sesiones_activas', 'gauge', 'Sesiones de chat en memoria', [({}, len(sesiones))]),
+    ]
+    consultas = []
+    for nombre, cache in (('resultados', InfocasasScraper.obtener_cache_resultados()),
+                          ('busquedas', InfocasasScraper.obtener_cache_busquedas())):
+        if cache is not None:
+            estadisticas = cache.estadisticas()
+            consultas.append(({'cache': nombre, 'resultado': 'acierto'}, estadisticas['aciertos']))
+            consultas.append(({'cache': nombre, 'resultado': 'fallo'}, estadisticas['fallos']))
+            if 'viejas' in estadisticas:
+                consultas.append(({'cache': nombre, 'resultado': 'vieja'}, estadisticas['viejas']))
+    familias.append(('inmo_cache_consultas_total', 'counter', 'Consultas a los caches por resultado', consultas))
+    cascada = InfocasasScraper.estadisticas_cascada()
+    familias.append(('inmo_cascada_busquedas_total', 'counter', 'Búsquedas que pasaron por la cascada de categorías',
+                     [({}, cascada['busquedas'])]))
+    familias.append(('inmo_cascada_ganadores_total', 'counter', 'Nivel de la cascada que dio el resultado',
+                     [({'nivel': str(nivel)}, cantidad) for nivel, cantidad in sorted(cascada['ganadores'].items())]))
+    return familias
+
+registrar_colector(_metricas_backend)
+
+@app.get("/metrics")
+async def metricas():
+    """Métricas en formato de texto de Prometheus (ver metricas.py)."""
+    if not METRICAS_CONFIG['activas']:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas (INMO_METRICAS=false)")
+    return PlainTextResponse(exponer(), media_type='text/plain; version=0.0.4')
+
 # =============================================================================
 # EJECUTAR SERVIDOR
 # =============================================================================
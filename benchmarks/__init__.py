@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de INMO.
+
+Se ejecutan desde la raíz del proyecto, por ejemplo:
+    python -m benchmarks.bench_next_data
+"""
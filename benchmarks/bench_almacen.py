@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: BÚSQUEDA EN EL ALMACÉN LOCAL
+=============================================================================
+Llena un almacén temporal con propiedades sintéticas (todas las
+combinaciones marcadas como recorridas) y mide la latencia de
+InfocasasScraper._fetch_properties respondiendo desde los índices locales,
+con filtros de operación, tipo, ubicación, precio y dormitorios al azar.
+
+Uso:
+    python -m benchmarks.bench_almacen [--propiedades N] [--consultas N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from almacen import AlmacenPropiedades
+from benchmarks.sinteticos import propiedades_crudas
+from scraper import InfocasasScraper
+
+
+# Tipo de las propiedades sintéticas -> slug de la combinación del crawler
+SLUG_POR_TIPO = {
+    'Casa': 'casas',
+    'Departamento': 'departamentos',
+    'Terreno': 'terrenos',
+    'Dúplex': 'duplex',
+    'Local comercial': 'locales',
+    'Oficina': 'oficinas',
+}
+UBICACIONES = ['asuncion', 'central', 'luque', 'san-lorenzo', 'lambare', 'encarnacion', 'villa-morra']
+TIPOS_CONSULTA = ['casa', 'departamento', 'terreno', 'inmuebles', 'casas-y-departamentos']
+
+
+def poblar(almacen: AlmacenPropiedades, scraper: InfocasasScraper, cantidad: int):
+    """Guarda 'cantidad' propiedades por operación y marca todas las combinaciones como completas."""
+    por_tipo = {}
+    for cruda in propiedades_crudas(cantidad, fotos=4):
+        prop = scraper._extract_property_data(cruda)
+        slug = SLUG_POR_TIPO[cruda['property_type']['name']]
+        por_tipo.setdefault(slug, []).append(prop)
+
+    slugs = [s for s in dict.fromkeys(scraper.TIPOS_PROPIEDAD_URL.values()) if s not in scraper.TIPOS_AGREGADOS]
+    unidades = [
+        {'clave': f"{op}/{slug}/{ubicacion}", 'operacion': op, 'tipo': slug, 'ubicacion': ubicacion}
+        for op in ('venta', 'alquiler')
+        for slug in slugs
+        for ubicacion in scraper.CONFIG['departamentos'] + scraper.CONFIG['ciudades']
+    ]
+    almacen.registrar_unidades(unidades)
+    for op in ('venta', 'alquiler'):
+        for slug, propiedades in por_tipo.items():
+            almacen.guardar_propiedades(op, slug, propiedades)
+    for unidad in unidades:
+        almacen.completar_unidad(unidad['clave'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--propiedades', type=int, default=20000)
+    parser.add_argument('--consultas', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenPropiedades(os.path.join(directorio, 'bench.db'))
+        scraper = InfocasasScraper()
+        scraper.almacen = almacen
+
+        inicio = time.perf_counter()
+        poblar(almacen, scraper, args.propiedades)
+        print(f"Almacén: {almacen.contar_propiedades()} filas en {time.perf_counter() - inicio:.1f} s")
+
+        rnd = random.Random(7)
+        tiempos = []
+        resultados = 0
+        for _ in range(args.consultas):
+            minimo = rnd.choice([None, 50000, 100000, 200000])
+            consulta = (
+                rnd.choice(['venta', 'alquiler']),
+                rnd.choice(TIPOS_CONSULTA),
+                rnd.choice(UBICACIONES),
+                minimo,
+                rnd.choice([None, 300000, 600000]),
+                rnd.choice([None, None, 2, 3]),
+                None,
+                rnd.choice([1, 1, 1, 2, 3]),
+            )
+            inicio = time.perf_counter()
+            propiedades = scraper._fetch_properties(*consulta)
+            tiempos.append(time.perf_counter() - inicio)
+            resultados += len(propiedades)
+
+        almacen.cerrar()
+
+    tiempos.sort()
+    print(f"Consultas: {len(tiempos)}  resultados medios: {resultados / len(tiempos):.1f}")
+    for nombre, q in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99)):
+        print(f"  {nombre}: {tiempos[int(q * (len(tiempos) - 1))] * 1000:.2f} ms")
+    print(f"  max: {tiempos[-1] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: FILTRADO EN LISTAS DE DICCIONARIOS VS. CATÁLOGO COLUMNAR
+=============================================================================
+Compara, sobre un catálogo sintético en memoria, las list comprehensions que
+usan hoy el agente y el scraper (presupuesto máximo, filtro casa/depto por
+subcadena, orden por precio) contra CatalogoColumnar (máscaras NumPy,
+argpartition para el top-k).
+
+Uso:
+    python -m benchmarks.bench_catalogo [--propiedades N] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import time
+
+from benchmarks.sinteticos import propiedades_crudas
+from catalogo import CatalogoColumnar
+from scraper import InfocasasScraper
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    """Milisegundos por ejecución (mejor de 'repeticiones')."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--propiedades', type=int, default=50000)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    scraper = InfocasasScraper()
+    propiedades = [scraper._extraer_propiedad(p) for p in propiedades_crudas(args.propiedades, fotos=2)]
+    diccionarios = [p.to_dict() for p in propiedades]
+
+    inicio = time.perf_counter()
+    catalogo = CatalogoColumnar(propiedades)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    presupuesto, dormitorios = 250000, 3
+
+    def con_listas():
+        filtradas = [
+            p for p in diccionarios
+            if p['precio']['monto'] and p['precio']['monto'] <= presupuesto
+            and 'casa' in p['informacion_basica']['tipo_propiedad'].lower()
+            and p['caracteristicas']['dormitorios'] == dormitorios
+        ]
+        return sorted(filtradas, key=lambda p: p['precio']['monto'])[:20]
+
+    def con_catalogo():
+        filas = catalogo.filtrar(precio_max=presupuesto, tipo_contiene=['casa'], dormitorios=dormitorios)
+        return catalogo.obtener(catalogo.ordenar(filas, por='precio', limite=20))
+
+    esperado = [p['identificacion']['id'] for p in con_listas()]
+    assert [p.id for p in con_catalogo()] == esperado
+
+    filas_todas = catalogo.filtrar()
+    print(f"Propiedades: {len(catalogo)}  (construcción del catálogo: {construccion_ms:.0f} ms)")
+    print(f"{'consulta':<34}{'listas ms':>12}{'catálogo ms':>14}")
+    print(f"{'presupuesto+tipo+dorm, top 20':<34}"
+          f"{cronometrar(con_listas, args.repeticiones):>12.2f}{cronometrar(con_catalogo, args.repeticiones):>14.2f}")
+    print(f"{'agregado por ciudad':<34}"
+          f"{'':>12}{cronometrar(lambda: catalogo.agregar(filas_todas, 'ciudad'), args.repeticiones):>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
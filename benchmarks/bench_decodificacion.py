@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: DECODIFICACIÓN COMPLETA VS. SELECTIVA DE __NEXT_DATA__
+=============================================================================
+Compara json.loads de todo el payload contra parseo.iterar_propiedades_crudas
+(solo se materializan las propiedades): tiempo y pico de memoria por página,
+incluyendo la extracción con _extract_property_data.
+
+Uso:
+    python -m benchmarks.bench_decodificacion [--paginas DIR] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.sinteticos import cargar_paginas
+from parseo import extraer_next_data
+from scraper import InfocasasScraper
+
+
+def medir(scraper: InfocasasScraper, payloads, repeticiones: int) -> dict:
+    """Tiempo medio y pico de memoria de _parsear_pagina con el modo del scraper."""
+    tiempos = []
+    for _ in range(repeticiones):
+        for payload in payloads:
+            inicio = time.perf_counter()
+            scraper._parsear_pagina(payload)
+            tiempos.append(time.perf_counter() - inicio)
+
+    picos = []
+    for payload in payloads:
+        tracemalloc.start()
+        scraper._parsear_pagina(payload)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        picos.append(pico)
+
+    tiempos.sort()
+    return {
+        'media_ms': sum(tiempos) / len(tiempos) * 1000,
+        'p50_ms': tiempos[len(tiempos) // 2] * 1000,
+        'pico_kb': max(picos) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', help='Directorio con páginas grabadas (*.html)')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    # Se mide sobre el <script> ya recortado, para aislar la decodificación
+    payloads = [
+        b'<script id="__NEXT_DATA__" type="application/json">' + extraer_next_data(p) + b'</script>'
+        for p in cargar_paginas(args.paginas)
+    ]
+
+    completa = InfocasasScraper()
+    completa.decodificacion = 'completa'
+    selectiva = InfocasasScraper()
+    selectiva.decodificacion = 'selectiva'
+
+    for payload in payloads:
+        assert completa._parsear_pagina(payload) == selectiva._parsear_pagina(payload)
+
+    resultados = {
+        'completa': medir(completa, payloads, args.repeticiones),
+        'selectiva': medir(selectiva, payloads, args.repeticiones),
+    }
+
+    print(f"Páginas: {len(payloads)}")
+    print(f"{'modo':<12}{'media ms':>10}{'p50 ms':>10}{'pico KB':>12}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<12}{r['media_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['pico_kb']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
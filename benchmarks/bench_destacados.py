@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: DETECCIÓN DE PROPIEDADES DESTACADAS
+=============================================================================
+Compara, sobre N propiedades crudas con señales variadas (campos booleanos,
+etiquetas como texto o {'name'}, plan como texto o {'name'}, sin señales):
+
+- anterior: los ocho chequeos encadenados que tenía _extract_property_data
+- tabla: el predicado compilado de destacados.py
+
+Verifica que ambos marquen exactamente las mismas propiedades y muestra
+cuántas marcó cada regla.
+
+Uso:
+    python -m benchmarks.bench_destacados [--propiedades N] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from benchmarks.sinteticos import propiedades_crudas
+from destacados import cargar_reglas, compilar_reglas
+
+
+def destacado_anterior(prop) -> bool:
+    """Copia de la detección anterior (ocho métodos, todos evaluados)."""
+    destacado = False
+    if prop.get('featured'):
+        destacado = True
+    if prop.get('is_featured'):
+        destacado = True
+    if prop.get('highlight') or prop.get('highlighted'):
+        destacado = True
+    if prop.get('premium'):
+        destacado = True
+    if prop.get('promoted') or prop.get('is_promoted'):
+        destacado = True
+    if prop.get('super') or prop.get('super_destacado'):
+        destacado = True
+    tags = prop.get('tags', []) or prop.get('labels', [])
+    if isinstance(tags, list):
+        for tag in tags:
+            if isinstance(tag, str):
+                tag_lower = tag.lower()
+                if any(x in tag_lower for x in ['destacad', 'premium', 'super', 'featured']):
+                    destacado = True
+                    break
+            elif isinstance(tag, dict):
+                tag_name = tag.get('name', '').lower()
+                if any(x in tag_name for x in ['destacad', 'premium', 'super', 'featured']):
+                    destacado = True
+                    break
+    plan = prop.get('plan') or prop.get('subscription') or {}
+    if isinstance(plan, dict):
+        plan_name = plan.get('name', '').lower()
+        if any(x in plan_name for x in ['premium', 'super', 'destacad', 'gold', 'platinum']):
+            destacado = True
+    elif isinstance(plan, str) and any(x in plan.lower() for x in ['premium', 'super', 'destacad']):
+        destacado = True
+    return destacado
+
+
+def variar_senales(props, semilla: int = 7):
+    """Reparte las distintas formas en que InfoCasas marca un destacado."""
+    rnd = random.Random(semilla)
+    for prop in props:
+        for campo in ('featured', 'tags', 'plan'):
+            prop.pop(campo, None)
+        forma = rnd.randrange(8)
+        if forma == 0:
+            prop[rnd.choice(['featured', 'is_featured', 'highlighted', 'is_promoted', 'super_destacado'])] = rnd.random() < 0.5
+        elif forma == 1:
+            prop['tags'] = [rnd.choice(['Nuevo', 'Oportunidad', 'SUPER Destacado', 'Financiación'])]
+        elif forma == 2:
+            prop['labels'] = [{'name': rnd.choice(['Featured', 'Reservado', 'Apto crédito'])}]
+        elif forma == 3:
+            prop['plan'] = {'name': rnd.choice(['Básico', 'Gold', 'Platinum', 'Gratis'])}
+        elif forma == 4:
+            prop['subscription'] = rnd.choice(['premium', 'gold', 'free'])
+        elif forma == 5:
+            prop['featured'] = False
+            prop['tags'] = [{'name': 'Nuevo'}, {'name': 'Dueño directo'}]
+            prop['plan'] = {'name': 'Básico'}
+        # 6 y 7: sin ninguna señal (lo más común en los listados)
+    return props
+
+
+def medir(funcion, props, repeticiones: int) -> float:
+    """Mejor tiempo (ms) de aplicar funcion a todas las propiedades."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for prop in props:
+            funcion(prop)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--propiedades', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    props = variar_senales(propiedades_crudas(args.propiedades, fotos=1))
+    detectar = compilar_reglas(cargar_reglas())
+
+    distintas = sum(destacado_anterior(p) != (detectar(p) is not None) for p in props)
+    if distintas:
+        raise SystemExit(f"La tabla difiere de la detección anterior en {distintas} propiedades")
+
+    ms_anterior = medir(destacado_anterior, props, args.repeticiones)
+    ms_tabla = medir(detectar, props, args.repeticiones)
+    reglas = Counter(detectar(p) or 'no_destacada' for p in props)
+
+    n = len(props)
+    print(f"Propiedades: {n} (resultados idénticos)")
+    print(f"{'método':<12}{'total ms':>10}{'µs/prop':>10}")
+    print(f"{'anterior':<12}{ms_anterior:>10.1f}{ms_anterior / n * 1000:>10.2f}")
+    print(f"{'tabla':<12}{ms_tabla:>10.1f}{ms_tabla / n * 1000:>10.2f}")
+    print(f"Aceleración: {ms_anterior / ms_tabla:.1f}x")
+    print("Reglas que se cumplieron:")
+    for regla, cantidad in reglas.most_common():
+        print(f"  {regla:<24}{cantidad:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: CONSULTAS DE MAPA CON EL ÍNDICE ESPACIAL
+=============================================================================
+Puntos sintéticos concentrados en el Gran Asunción más dispersos por el
+resto del país. Mide rectángulos (zoom de barrio, ciudad y país) y radios
+contra el barrido completo con NumPy, verificando que den lo mismo.
+
+Uso:
+    python -m benchmarks.bench_espacial [--puntos N] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from espacial import IndiceEspacial, distancia_km
+
+
+RECTANGULOS = {
+    'barrio': (-25.30, -25.27, -57.60, -57.56),
+    'ciudad': (-25.40, -25.20, -57.70, -57.50),
+    'pais': (-27.6, -19.2, -62.7, -54.2),
+}
+RADIOS_KM = (0.5, 2.0, 10.0)
+CENTRO = (-25.29, -57.58)
+
+
+def cronometrar(funcion, repeticiones: int) -> float:
+    """Milisegundos por ejecución (mejor de 'repeticiones')."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puntos', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = np.random.default_rng(42)
+    urbanos = int(args.puntos * 0.7)
+    lat = np.concatenate([rnd.normal(CENTRO[0], 0.06, urbanos), rnd.uniform(-27.5, -19.3, args.puntos - urbanos)])
+    lng = np.concatenate([rnd.normal(CENTRO[1], 0.06, urbanos), rnd.uniform(-62.6, -54.3, args.puntos - urbanos)])
+
+    inicio = time.perf_counter()
+    indice = IndiceEspacial(lat, lng)
+    print(f"Puntos: {args.puntos}  (construcción del índice: {(time.perf_counter() - inicio) * 1000:.0f} ms)")
+    print(f"{'consulta':<20}{'resultados':>12}{'índice ms':>12}{'barrido ms':>12}")
+
+    for nombre, (lat_min, lat_max, lng_min, lng_max) in RECTANGULOS.items():
+        def barrido():
+            return np.flatnonzero((lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) & (lng <= lng_max))
+        filas = indice.en_rectangulo(lat_min, lat_max, lng_min, lng_max)
+        assert np.array_equal(filas, barrido())
+        print(f"{'rect ' + nombre:<20}{len(filas):>12}"
+              f"{cronometrar(lambda: indice.en_rectangulo(lat_min, lat_max, lng_min, lng_max), args.repeticiones):>12.2f}"
+              f"{cronometrar(barrido, args.repeticiones):>12.2f}")
+
+    for radio in RADIOS_KM:
+        def barrido():
+            distancias = distancia_km(CENTRO[0], CENTRO[1], lat, lng)
+            filas = np.flatnonzero(distancias <= radio)
+            return filas[np.argsort(distancias[filas], kind='stable')]
+        filas, _ = indice.en_radio(CENTRO[0], CENTRO[1], radio)
+        assert set(filas.tolist()) == set(barrido().tolist())
+        print(f"{f'radio {radio} km':<20}{len(filas):>12}"
+              f"{cronometrar(lambda: indice.en_radio(CENTRO[0], CENTRO[1], radio), args.repeticiones):>12.2f}"
+              f"{cronometrar(barrido, args.repeticiones):>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: EXTRACCIÓN DE IMÁGENES EN GALERÍAS GRANDES
+=============================================================================
+Compara la extracción anterior (pertenencia con any() sobre la lista, O(n²))
+contra InfocasasScraper._extraer_imagenes (una pasada con set de claves
+normalizadas) en propiedades con galerías grandes, donde 'main_image' y
+'photos' repiten las fotos de 'images' en otras resoluciones del CDN.
+'fría' es la primera pasada, antes de tener las claves de las URLs en memoria.
+
+Uso:
+    python -m benchmarks.bench_imagenes [--fotos N] [--propiedades N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import time
+
+from scraper import InfocasasScraper
+
+
+def propiedad_galeria(indice: int, fotos: int) -> dict:
+    """Propiedad cruda con 'fotos' imágenes repetidas como variantes en photos/main_image."""
+    base = f"https://cdn2.infocasas.com.uy/repo/img/{indice:08d}"
+    return {
+        'id': indice,
+        'images': [
+            {'image': f"{base}_{j}.jpg", 'thumbnail': f"{base}_{j}.jpg?w=320", 'alt': f"Foto {j}"}
+            for j in range(fotos)
+        ],
+        'main_image': {'image': f"https://cdn2.infocasas.com.uy/repo/img/th.outside800x600.{indice:08d}_0.jpg"},
+        'photos': [
+            {'url': f"{base}_{j}.jpg?w=1024"} if j % 2 else {'url': f"{base}_{j}.jpg"}
+            for j in range(fotos)
+        ],
+    }
+
+
+def extraer_imagenes_anterior(prop: dict) -> list:
+    """Copia de la extracción previa a la de-duplicación por set (referencia)."""
+    imagenes = []
+    if 'images' in prop and prop['images']:
+        for img in prop['images']:
+            if isinstance(img, dict):
+                url = img.get('image') or img.get('url') or img.get('original')
+                if url:
+                    imagenes.append({
+                        'url': url,
+                        'thumbnail': img.get('thumbnail') or img.get('small') or url,
+                        'alt': img.get('alt', 'Imagen de propiedad')
+                    })
+            elif isinstance(img, str):
+                imagenes.append({'url': img, 'thumbnail': img, 'alt': 'Imagen de propiedad'})
+    if 'main_image' in prop and prop['main_image']:
+        main_img = prop['main_image']
+        if isinstance(main_img, dict):
+            url = main_img.get('image') or main_img.get('url')
+            if url and not any(i['url'] == url for i in imagenes):
+                imagenes.insert(0, {'url': url, 'thumbnail': main_img.get('thumbnail') or url, 'alt': 'Imagen principal'})
+    if 'photos' in prop and prop['photos']:
+        for foto in prop['photos']:
+            if isinstance(foto, dict):
+                url = foto.get('url') or foto.get('image')
+                if url and not any(i['url'] == url for i in imagenes):
+                    imagenes.append({'url': url, 'thumbnail': foto.get('thumbnail') or url, 'alt': 'Foto de propiedad'})
+    return imagenes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--propiedades', type=int, default=500)
+    parser.add_argument('--fotos', type=int, nargs='*', default=[12, 40, 100])
+    args = parser.parse_args()
+
+    scraper = InfocasasScraper()
+    print(f"{'fotos':>6}{'anterior µs':>14}{'nueva (fría) µs':>18}{'nueva µs':>12}{'entradas ant.':>15}{'entradas nueva':>16}")
+    for fotos in args.fotos:
+        props = [propiedad_galeria(i, fotos) for i in range(args.propiedades)]
+        InfocasasScraper._claves_imagen.clear()
+        resultados = {}
+        # 'fría': primera vez que se ven las URLs; luego con las claves ya calculadas
+        for nombre, funcion in (('anterior', extraer_imagenes_anterior),
+                                ('fria', scraper._extraer_imagenes),
+                                ('nueva', scraper._extraer_imagenes)):
+            inicio = time.perf_counter()
+            galerias = [funcion(p) for p in props]
+            resultados[nombre] = ((time.perf_counter() - inicio) / len(props) * 1e6, len(galerias[0]))
+        print(f"{fotos:>6}{resultados['anterior'][0]:>14.1f}{resultados['fria'][0]:>18.1f}{resultados['nueva'][0]:>12.1f}"
+              f"{resultados['anterior'][1]:>15}{resultados['nueva'][1]:>16}")
+
+if __name__ == '__main__':
+    main()
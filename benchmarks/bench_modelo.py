@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: MEMORIA POR PROPIEDAD (DICCIONARIOS VS. MODELO COMPACTO)
+=============================================================================
+Mide con tracemalloc cuántos bytes ocupa cada propiedad retenida en memoria
+(cache de resultados, almacén en memoria) en los dos formatos:
+
+- dict: la forma anidada de _extract_property_data
+- Propiedad: el modelo con __slots__ de modelo.py
+
+y el costo de reconstruir el diccionario con to_dict().
+
+Uso:
+    python -m benchmarks.bench_modelo [--propiedades N] [--fotos N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.sinteticos import propiedades_crudas
+from scraper import InfocasasScraper
+
+
+def medir_retenido(construir) -> int:
+    """Bytes que quedan retenidos por el resultado de construir()."""
+    gc.collect()
+    tracemalloc.start()
+    resultado = construir()
+    gc.collect()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--propiedades', type=int, default=5000)
+    parser.add_argument('--fotos', type=int, default=12)
+    args = parser.parse_args()
+
+    scraper = InfocasasScraper()
+    crudas = propiedades_crudas(args.propiedades, fotos=args.fotos)
+
+    bytes_dict = medir_retenido(lambda: [scraper._extract_property_data(p) for p in crudas])
+    bytes_modelo = medir_retenido(lambda: [scraper._extraer_propiedad(p) for p in crudas])
+
+    propiedades = [scraper._extraer_propiedad(p) for p in crudas]
+    inicio = time.perf_counter()
+    for prop in propiedades:
+        prop.to_dict()
+    to_dict_us = (time.perf_counter() - inicio) / len(propiedades) * 1e6
+
+    n = args.propiedades
+    print(f"Propiedades: {n} ({args.fotos} fotos c/u)")
+    print(f"{'formato':<12}{'bytes/prop':>12}{'total MB':>12}")
+    print(f"{'dict':<12}{bytes_dict / n:>12.0f}{bytes_dict / 1024 / 1024:>12.1f}")
+    print(f"{'Propiedad':<12}{bytes_modelo / n:>12.0f}{bytes_modelo / 1024 / 1024:>12.1f}")
+    print(f"Reducción: {1 - bytes_modelo / bytes_dict:.0%}   to_dict(): {to_dict_us:.1f} µs/prop")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: EXTRACCIÓN DE __NEXT_DATA__
+=============================================================================
+Compara el parseo completo con BeautifulSoup contra el recorte directo de
+bytes (parseo.extraer_next_data): tiempo por página y pico de memoria.
+
+Uso:
+    python -m benchmarks.bench_next_data [--paginas DIR] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from benchmarks.sinteticos import cargar_paginas
+from parseo import extraer_next_data
+
+
+def con_soup(contenido: bytes) -> dict:
+    """Camino original: árbol HTML completo + búsqueda del script."""
+    soup = BeautifulSoup(contenido, 'html.parser')
+    script = soup.find('script', id='__NEXT_DATA__', type='application/json')
+    return json.loads(script.string)
+
+
+def con_recorte(contenido: bytes) -> dict:
+    """Camino rápido: recorte directo sobre los bytes."""
+    return json.loads(extraer_next_data(contenido))
+
+
+def medir(funcion, paginas, repeticiones: int) -> dict:
+    """Mide tiempo medio por página y pico de memoria de una función de parseo."""
+    tiempos = []
+    for _ in range(repeticiones):
+        for pagina in paginas:
+            inicio = time.perf_counter()
+            funcion(pagina)
+            tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    for pagina in paginas:
+        funcion(pagina)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        'media_ms': sum(tiempos) / len(tiempos) * 1000,
+        'p50_ms': tiempos[len(tiempos) // 2] * 1000,
+        'pico_kb': pico / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paginas', help='Directorio con páginas grabadas (*.html)')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    paginas = cargar_paginas(args.paginas)
+    tamano_kb = sum(len(p) for p in paginas) / len(paginas) / 1024
+    print(f"Páginas: {len(paginas)} (promedio {tamano_kb:.0f} KB)")
+
+    # Ambos caminos deben producir exactamente el mismo JSON
+    for pagina in paginas:
+        assert con_soup(pagina) == con_recorte(pagina)
+
+    antes = medir(con_soup, paginas, args.repeticiones)
+    despues = medir(con_recorte, paginas, args.repeticiones)
+
+    print(f"{'camino':<14}{'media ms':>10}{'p50 ms':>10}{'pico KB':>12}")
+    for nombre, r in (('beautifulsoup', antes), ('recorte', despues)):
+        print(f"{nombre:<14}{r['media_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['pico_kb']:>12.0f}")
+    print(f"Aceleración: x{antes['media_ms'] / despues['media_ms']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: DETECCIÓN DE UBICACIÓN EN MENSAJES DEL CHAT
+=============================================================================
+Compara, sobre mensajes típicos del chat:
+
+- anterior: un re.search(rf'\\b...\\b') por variación, barrio, ciudad y
+  departamento en cada mensaje (copia de la implementación previa)
+- índice: DetectorUbicaciones de ubicaciones.py, armado una vez
+
+Verifica que ambos devuelvan la misma ubicación para cada mensaje.
+
+Uso:
+    python -m benchmarks.bench_ubicaciones [--mensajes N] [--repeticiones N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import random
+import re
+import time
+
+from scraper import InfocasasScraper
+from ubicaciones import DetectorUbicaciones
+
+
+MENSAJES = [
+    'busco casa en venta en asunción con 3 dormitorios',
+    'quiero alquilar un departamento en villa morra',
+    'departamento amoblado en las carmelitas hasta 800 dólares',
+    'terreno en luque o en san lorenzo',
+    'tenés algo en cde? casa con piscina',
+    'casas en fernando de la mora zona norte',
+    'busco en encarnación cerca de la costanera',
+    'algo barato en el área metropolitana',
+    'dúplex en mra cerca del shopping',
+    'necesito oficina en el centro, presupuesto 1500',
+    'casa en san bernardino para el verano',
+    'departamento en alto paraná',
+    'hola, qué opciones tienen?',
+    'quiero algo en lambaré o ñemby',
+    'casa en roberto l pettit con patio',
+    'busco terreno en itapúa, zona hohenau',
+]
+
+
+def detectar_anterior(config, query):
+    """Copia de _detectar_ubicacion antes del índice."""
+    query_norm = query.lower()
+    reemplazos = {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ñ': 'n'}
+    for acento, sin_acento in reemplazos.items():
+        query_norm = query_norm.replace(acento, sin_acento)
+    for slug, vars_list in config['variaciones'].items():
+        for var in vars_list:
+            if re.search(rf'\b{re.escape(var)}\b', query_norm):
+                return slug
+    for clave in ('barrios_asuncion', 'ciudades', 'departamentos'):
+        for nombre in config[clave]:
+            if re.search(rf'\b{re.escape(nombre.replace("-", " "))}\b', query_norm):
+                return nombre
+    return None
+
+
+def medir(funcion, mensajes, repeticiones: int) -> float:
+    """Mejor tiempo (ms) de procesar todos los mensajes."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for mensaje in mensajes:
+            funcion(mensaje)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensajes', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    config = InfocasasScraper.CONFIG
+    rnd = random.Random(42)
+    mensajes = [rnd.choice(MENSAJES) for _ in range(args.mensajes)]
+
+    inicio = time.perf_counter()
+    detector = DetectorUbicaciones(config)
+    armado_ms = (time.perf_counter() - inicio) * 1000
+
+    for mensaje in MENSAJES:
+        anterior, nuevo = detectar_anterior(config, mensaje), detector.detectar(mensaje)
+        if anterior != nuevo:
+            raise SystemExit(f"Difieren en {mensaje!r}: {anterior!r} vs {nuevo!r}")
+
+    ms_anterior = medir(lambda m: detectar_anterior(config, m), mensajes, args.repeticiones)
+    ms_indice = medir(detector.detectar, mensajes, args.repeticiones)
+
+    n = len(mensajes)
+    print(f"Mensajes: {n} (resultados idénticos, índice armado en {armado_ms:.2f} ms)")
+    print(f"{'método':<12}{'total ms':>10}{'µs/msj':>10}")
+    print(f"{'anterior':<12}{ms_anterior:>10.1f}{ms_anterior / n * 1000:>10.1f}")
+    print(f"{'índice':<12}{ms_indice:>10.1f}{ms_indice / n * 1000:>10.1f}")
+    print(f"Aceleración: {ms_anterior / ms_indice:.0f}x")
+    print("Ejemplo:", MENSAJES[2])
+    for c in detector.coincidencias(MENSAJES[2]):
+        print(f"  {c.slug:<16}{c.nivel:<14}[{c.inicio}:{c.fin}] prioridad {c.prioridad}")
+
+
+if __name__ == '__main__':
+    main()
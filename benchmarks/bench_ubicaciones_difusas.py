@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+BENCHMARK: UBICACIONES CON ERRORES DE TIPEO
+=============================================================================
+Recorre el corpus benchmarks/data/ubicaciones_errores.tsv (mensaje y slug
+esperado; vacío = sin ubicación) y mide:
+
+- aciertos: mensajes resueltos al slug esperado
+- sin resolver: mensajes con ubicación que quedaron en None
+- falsos positivos: mensajes sin ubicación que devolvieron algo
+- tiempo por mensaje de resolver() (exacta + aproximada)
+
+Uso:
+    python -m benchmarks.bench_ubicaciones_difusas [--corpus RUTA] [--confianza X] [--detalle]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import os
+import time
+
+from scraper import InfocasasScraper
+from ubicaciones import UBICACIONES_CONFIG
+
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'data', 'ubicaciones_errores.tsv')
+
+
+def cargar_corpus(ruta: str):
+    """Pares (mensaje, slug esperado o None) del TSV."""
+    casos = []
+    with open(ruta, encoding='utf-8') as archivo:
+        for linea in archivo:
+            if not linea.strip() or linea.startswith('#'):
+                continue
+            mensaje, _, esperado = linea.rstrip('\n').partition('\t')
+            casos.append((mensaje, esperado.strip() or None))
+    return casos
+
+
+def percentil(valores, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p), len(ordenados) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--confianza', type=float, default=None, help='confianza mínima (por defecto la de la config)')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--detalle', action='store_true', help='mostrar cada mensaje')
+    args = parser.parse_args()
+
+    if args.confianza is not None:
+        UBICACIONES_CONFIG['confianza_minima'] = args.confianza
+    detector = InfocasasScraper._detector_ubicaciones
+    casos = cargar_corpus(args.corpus)
+
+    aciertos = sin_resolver = falsos = errados = 0
+    tiempos = []
+    for mensaje, esperado in casos:
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            resultado = detector.resolver(mensaje)
+            tiempos.append(time.perf_counter() - inicio)
+        obtenido = resultado.slug if resultado else None
+
+        if obtenido == esperado:
+            aciertos += 1
+        elif esperado is None:
+            falsos += 1
+        elif obtenido is None:
+            sin_resolver += 1
+        else:
+            errados += 1
+        if args.detalle or obtenido != esperado:
+            marca = 'ok ' if obtenido == esperado else 'MAL'
+            confianza = f'{resultado.confianza:.2f}' if resultado else '-'
+            print(f"{marca} {mensaje:<40} esperado={esperado!s:<22} obtenido={obtenido!s:<22} {confianza}")
+
+    con_ubicacion = sum(1 for _, esperado in casos if esperado)
+    print(f"\nCorpus: {len(casos)} mensajes ({con_ubicacion} con ubicación), "
+          f"confianza mínima {UBICACIONES_CONFIG['confianza_minima']}")
+    print(f"Aciertos: {aciertos}/{len(casos)}   sin resolver: {sin_resolver}   "
+          f"ubicación equivocada: {errados}   falsos positivos: {falsos}")
+    print(f"resolver(): p50 {percentil(tiempos, 0.5) * 1e6:.0f} µs   p99 {percentil(tiempos, 0.99) * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+PRUEBA DE CARGA DE /chat Y /buscar
+=============================================================================
+Levanta el servidor suplente (benchmarks/servidor_replica.py) y el backend
+con uvicorn en modo INMO_REPLICA=reproducir, y lo recorre con usuarios
+virtuales concurrentes:
+
+- usuarios de chat: conversaciones de varios turnos de
+  benchmarks/data/conversaciones.json, cada una con su session_id
+- usuarios de /buscar: búsquedas directas con filtros al azar
+
+Al final reporta por endpoint pedidos, throughput, latencias p50/p90/p99 y
+errores, y la memoria residente (RSS) del backend y sus workers a lo largo de
+la prueba. Las variables INMO_* del entorno pasan al backend, así que
+cachés, cobertura, precarga, etc. se comparan corriendo la prueba con y sin
+ellas; --workers y --uvicorn comparan configuraciones del servidor.
+
+Con --url se prueba un backend ya levantado (sin RSS si no es local).
+
+Uso:
+    python -m benchmarks.carga [--usuarios 20] [--duracion 60] [--buscar 0.3]
+                               [--pausa 1] [--workers 1] [--uvicorn "--loop uvloop"]
+                               [--url http://host:puerto] [--json salida.json]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.servidor_replica import iniciar_servidor
+from replica import REPLICA_CONFIG
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONVERSACIONES = os.path.join(os.path.dirname(__file__), 'data', 'conversaciones.json')
+
+# Filtros de las búsquedas directas
+OPERACIONES = ['venta', 'alquiler']
+TIPOS = ['casa', 'apartamento', 'terreno', 'inmuebles']
+UBICACIONES = ['asuncion', 'luque', 'san-lorenzo', 'lambare', 'fernando-de-la-mora',
+               'encarnacion', 'ciudad-del-este', 'villa-morra', 'carmelitas', 'capiata']
+PRECIOS = [None, None, 80_000, 150_000, 300_000]
+
+
+class Resultados:
+    """Latencias y errores por endpoint."""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def anotar(self, endpoint: str, segundos: float, error: Optional[str] = None):
+        self.latencias[endpoint].append(segundos)
+        if error is not None:
+            self.errores[endpoint][error] += 1
+
+    def resumen(self, duracion: float) -> Dict[str, Dict[str, Any]]:
+        resumen = {}
+        for endpoint, latencias in sorted(self.latencias.items()):
+            orden = sorted(latencias)
+            percentil = lambda p: round(orden[min(int(len(orden) * p), len(orden) - 1)] * 1000, 1)
+            errores = sum(self.errores[endpoint].values())
+            resumen[endpoint] = {
+                'pedidos': len(orden),
+                'por_segundo': round(len(orden) / duracion, 2),
+                'p50_ms': percentil(0.5),
+                'p90_ms': percentil(0.9),
+                'p99_ms': percentil(0.99),
+                'max_ms': round(orden[-1] * 1000, 1),
+                'errores': errores,
+                'tasa_error': round(errores / len(orden), 4),
+                'detalle_errores': dict(self.errores[endpoint]),
+            }
+        return resumen
+
+
+async def _pedir(cliente: httpx.AsyncClient, resultados: Resultados, endpoint: str, cuerpo: Dict[str, Any]):
+    inicio = time.monotonic()
+    error = None
+    try:
+        respuesta = await cliente.post(endpoint, json=cuerpo)
+        if respuesta.status_code != 200:
+            error = str(respuesta.status_code)
+    except httpx.TimeoutException:
+        error = 'timeout'
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    resultados.anotar(endpoint, time.monotonic() - inicio, error)
+
+
+async def usuario_chat(cliente, resultados: Resultados, conversaciones: List[List[str]],
+                       rnd: random.Random, fin: float, pausa: float):
+    """Conversaciones completas, una detrás de otra, con una sesión nueva cada una."""
+    while time.monotonic() < fin:
+        session_id = uuid.uuid4().hex
+        for mensaje in rnd.choice(conversaciones):
+            if time.monotonic() >= fin:
+                return
+            await _pedir(cliente, resultados, '/chat', {'mensaje': mensaje, 'session_id': session_id})
+            await asyncio.sleep(rnd.expovariate(1 / pausa) if pausa > 0 else 0)
+
+
+async def usuario_buscar(cliente, resultados: Resultados, rnd: random.Random, fin: float, pausa: float):
+    """Búsquedas directas; a veces sigue con la página siguiente."""
+    while time.monotonic() < fin:
+        busqueda = {
+            'operacion': rnd.choice(OPERACIONES),
+            'tipo_propiedad': rnd.choice(TIPOS),
+            'ubicacion': rnd.choice(UBICACIONES),
+            'precio_max': rnd.choice(PRECIOS),
+            'pagina': 1,
+        }
+        while True:
+            await _pedir(cliente, resultados, '/buscar', busqueda)
+            await asyncio.sleep(rnd.expovariate(1 / pausa) if pausa > 0 else 0)
+            if time.monotonic() >= fin or busqueda['pagina'] >= 3 or rnd.random() < 0.6:
+                break
+            busqueda = dict(busqueda, pagina=busqueda['pagina'] + 1)
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    """RSS (KB) del proceso y todos sus descendientes, leído de /proc (Linux)."""
+    total = 0
+    pendientes = [pid]
+    try:
+        while pendientes:
+            actual = pendientes.pop()
+            with open(f'/proc/{actual}/status') as estado:
+                for linea in estado:
+                    if linea.startswith('VmRSS:'):
+                        total += int(linea.split()[1])
+                        break
+            for tarea in os.listdir(f'/proc/{actual}/task'):
+                with open(f'/proc/{actual}/task/{tarea}/children') as hijos:
+                    pendientes.extend(int(h) for h in hijos.read().split())
+    except (OSError, ValueError):
+        return total or None
+    return total
+
+
+async def muestrear_rss(pid: Optional[int], fin: float, inicio: float, muestras: List[tuple], intervalo: float = 1.0):
+    while pid is not None and time.monotonic() < fin:
+        rss = rss_kb(pid)
+        if rss is not None:
+            muestras.append((round(time.monotonic() - inicio, 1), rss))
+        await asyncio.sleep(intervalo)
+
+
+def levantar_backend(puerto: int, workers: int, extra: List[str], url_replica: str,
+                     log: Optional[str]) -> subprocess.Popen:
+    """Backend con uvicorn apuntando al servidor suplente."""
+    entorno = dict(os.environ)
+    entorno.update({
+        'INMO_REPLICA': 'reproducir',
+        'INMO_REPLICA_URL': url_replica,
+        'PYTHONPATH': RAIZ + os.pathsep + entorno.get('PYTHONPATH', ''),
+    })
+    entorno.setdefault('OPENROUTER_API_KEY', 'replica')
+    comando = [sys.executable, '-m', 'uvicorn', 'main:app', '--app-dir', os.path.join(RAIZ, 'backend'),
+               '--host', '127.0.0.1', '--port', str(puerto), '--workers', str(workers),
+               '--log-level', 'warning', *extra]
+    salida = open(log, 'w') if log else subprocess.DEVNULL
+    return subprocess.Popen(comando, env=entorno, stdout=salida, stderr=subprocess.STDOUT)
+
+
+def esperar_backend(url: str, proceso: Optional[subprocess.Popen], espera: float = 60):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError(f"El backend terminó al arrancar (código {proceso.returncode})")
+        try:
+            if httpx.get(f'{url}/', timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"El backend no respondió en {espera:.0f} s")
+
+
+async def correr(args, url: str, pid: Optional[int]) -> Dict[str, Any]:
+    with open(CONVERSACIONES, encoding='utf-8') as archivo:
+        conversaciones = json.load(archivo)
+
+    resultados = Resultados()
+    muestras: List[tuple] = []
+    rnd = random.Random(args.semilla)
+    limites = httpx.Limits(max_connections=args.usuarios, max_keepalive_connections=args.usuarios)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limites) as cliente:
+        inicio = time.monotonic()
+        fin = inicio + args.rampa + args.duracion
+        cantidad_buscar = round(args.usuarios * args.buscar)
+
+        async def arrancar(indice: int):
+            await asyncio.sleep(args.rampa * indice / max(args.usuarios, 1))
+            propio = random.Random(rnd.random())
+            if indice < cantidad_buscar:
+                await usuario_buscar(cliente, resultados, propio, fin, args.pausa)
+            else:
+                await usuario_chat(cliente, resultados, conversaciones, propio, fin, args.pausa)
+
+        await asyncio.gather(
+            muestrear_rss(pid, fin, inicio, muestras),
+            *(arrancar(i) for i in range(args.usuarios)),
+        )
+        duracion = time.monotonic() - inicio
+
+    return {
+        'usuarios': args.usuarios,
+        'duracion_s': round(duracion, 1),
+        'endpoints': resultados.resumen(duracion),
+        'rss_kb': muestras,
+    }
+
+
+def imprimir(reporte: Dict[str, Any]):
+    print(f"\n{reporte['usuarios']} usuarios, {reporte['duracion_s']} s")
+    print(f"{'endpoint':<10}{'pedidos':>9}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errores':>9}")
+    for endpoint, r in reporte['endpoints'].items():
+        print(f"{endpoint:<10}{r['pedidos']:>9}{r['por_segundo']:>8.1f}{r['p50_ms']:>9.0f}{r['p90_ms']:>9.0f}"
+              f"{r['p99_ms']:>9.0f}{r['max_ms']:>9.0f}{r['tasa_error']:>8.1%}")
+        if r['detalle_errores']:
+            print(f"{'':<10}errores: {r['detalle_errores']}")
+
+    muestras = reporte['rss_kb']
+    if muestras:
+        valores = [rss for _, rss in muestras]
+        print(f"\nRSS backend: inicio {valores[0] / 1024:.0f} MB, máximo {max(valores) / 1024:.0f} MB, "
+              f"final {valores[-1] / 1024:.0f} MB")
+        paso = max(len(muestras) // 12, 1)
+        print('  ' + '  '.join(f"{t:.0f}s:{rss / 1024:.0f}" for t, rss in muestras[::paso]))
+    if reporte.get('suplente'):
+        print(f"\nServidor suplente: {reporte['suplente']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=20, help='Usuarios virtuales concurrentes')
+    parser.add_argument('--duracion', type=float, default=60, help='Segundos de carga (después de la rampa)')
+    parser.add_argument('--rampa', type=float, default=5, help='Segundos para arrancar a todos los usuarios')
+    parser.add_argument('--buscar', type=float, default=0.3, help='Fracción de usuarios que usan /buscar')
+    parser.add_argument('--pausa', type=float, default=1.0, help='Pausa media entre pedidos de un usuario (s)')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--url', help='Backend ya levantado (no se levanta suplente ni uvicorn)')
+    parser.add_argument('--puerto', type=int, default=8100, help='Puerto del backend levantado')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--uvicorn', default='', help='Argumentos extra de uvicorn (ej. "--loop uvloop")')
+    parser.add_argument('--directorio', default=REPLICA_CONFIG['directorio'], help='Grabaciones del suplente')
+    parser.add_argument('--log', help='Archivo para la salida del backend')
+    parser.add_argument('--json', help='Guardar el reporte completo en JSON')
+    args = parser.parse_args()
+
+    suplente = proceso = None
+    try:
+        if args.url:
+            url, pid = args.url.rstrip('/'), None
+        else:
+            suplente = iniciar_servidor(0, args.directorio)
+            url_replica = f"http://127.0.0.1:{suplente.server_address[1]}"
+            print(f"Suplente en {url_replica} ({suplente.grabaciones})")
+            proceso = levantar_backend(args.puerto, args.workers, shlex.split(args.uvicorn), url_replica, args.log)
+            url, pid = f"http://127.0.0.1:{args.puerto}", proceso.pid
+        esperar_backend(url, proceso)
+        print(f"Backend en {url}: {args.usuarios} usuarios durante {args.duracion:.0f} s...")
+
+        reporte = asyncio.run(correr(args, url, pid))
+        if suplente is not None:
+            reporte['suplente'] = suplente.estadisticas()
+        imprimir(reporte)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as archivo:
+                json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            try:
+                proceso.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+        if suplente is not None:
+            suplente.shutdown()
+
+
+if __name__ == '__main__':
+    main()
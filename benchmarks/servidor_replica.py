@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+SERVIDOR SUPLENTE DE INFOCASAS, PROXYSCRAPE Y OPENROUTER
+=============================================================================
+Responde lo grabado con INMO_REPLICA=grabar (ver replica.py) para que el
+backend corra con INMO_REPLICA=reproducir sin red:
+
+    /infocasas/<ruta>?<query>   página de https://www.infocasas.com.py/<ruta>
+    /proxy?apikey=..&url=<url>  la misma página, como la devuelve ProxyScrape
+    /openrouter/api/v1/...      chat completions (POST)
+    /_estadisticas              contadores del servidor
+
+Una página que no se grabó se reemplaza por otra grabada (elegida por la
+URL, siempre la misma) o, si no hay ninguna, por una sintética; una
+conversación que no se grabó recibe una respuesta grabada cualquiera o
+una genérica. Con INMO_REPLICA_FALTANTES=404 se responde 404.
+
+Cada upstream tiene su latencia y sus errores (variables de entorno):
+
+    INMO_REPLICA_LATENCIA_INFOCASAS=lognormal:0.6:0.4   mediana 0.6 s
+    INMO_REPLICA_LATENCIA_PROXY=uniforme:0.5:3          entre 0.5 y 3 s
+    INMO_REPLICA_LATENCIA_OPENROUTER=fija:1.5
+    INMO_REPLICA_ERRORES_PROXY=429:0.05,503:0.02,timeout:0.01
+
+'timeout' retiene la conexión INMO_REPLICA_CUELGUE segundos sin responder.
+Para ejercitar la ruta proxy del scraper, PROXYSCRAPE_API_KEY debe tener
+cualquier valor.
+
+Uso:
+    python -m benchmarks.servidor_replica [--puerto 8765] [--directorio DIR]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.sinteticos import pagina_resultados
+from replica import REPLICA_CONFIG, clave_completado, clave_pagina
+
+
+SERVIDOR_CONFIG = {
+    'puerto': int(os.getenv('INMO_REPLICA_PUERTO', '8765')),
+    # 'reemplazar' (otra grabada o sintética) o '404'
+    'faltantes': os.getenv('INMO_REPLICA_FALTANTES', 'reemplazar').lower(),
+    'cuelgue': float(os.getenv('INMO_REPLICA_CUELGUE', '120')),
+    'semilla': os.getenv('INMO_REPLICA_SEMILLA'),
+    'latencia': {
+        'infocasas': os.getenv('INMO_REPLICA_LATENCIA_INFOCASAS', 'lognormal:0.6:0.4'),
+        'proxy': os.getenv('INMO_REPLICA_LATENCIA_PROXY', 'lognormal:1.2:0.5'),
+        'openrouter': os.getenv('INMO_REPLICA_LATENCIA_OPENROUTER', 'lognormal:1.5:0.4'),
+    },
+    'errores': {
+        'infocasas': os.getenv('INMO_REPLICA_ERRORES_INFOCASAS', ''),
+        'proxy': os.getenv('INMO_REPLICA_ERRORES_PROXY', ''),
+        'openrouter': os.getenv('INMO_REPLICA_ERRORES_OPENROUTER', ''),
+    },
+}
+
+_BASE_INFOCASAS = 'https://www.infocasas.com.py'
+
+_RESPUESTA_GENERICA = {
+    'id': 'replica',
+    'object': 'chat.completion',
+    'model': 'replica',
+    'choices': [{
+        'index': 0,
+        'finish_reason': 'stop',
+        'message': {
+            'role': 'assistant',
+            'content': 'Encontré algunas opciones que te pueden interesar. '
+                       '¿Querés que te cuente más de alguna o ajustamos la búsqueda?',
+        },
+    }],
+    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+}
+
+
+def perfil_latencia(especificacion: str) -> Callable[[random.Random], float]:
+    """
+    Convierte 'fija:S', 'uniforme:A:B' o 'lognormal:MEDIANA:SIGMA' (segundos)
+    en una función que sortea una latencia. '' o '0' = sin demora.
+    """
+    partes = especificacion.strip().split(':') if especificacion.strip() else ['0']
+    try:
+        valores = [float(p) for p in partes[1:]]
+        if partes[0] in ('0', 'ninguna'):
+            return lambda rnd: 0.0
+        if partes[0] == 'fija' and len(valores) == 1:
+            return lambda rnd: valores[0]
+        if partes[0] == 'uniforme' and len(valores) == 2:
+            return lambda rnd: rnd.uniform(valores[0], valores[1])
+        if partes[0] == 'lognormal' and len(valores) == 2:
+            mediana, sigma = valores
+            return lambda rnd: mediana * math.exp(sigma * rnd.gauss(0, 1))
+    except ValueError:
+        pass
+    raise ValueError(f"Latencia inválida: {especificacion!r} (fija:S, uniforme:A:B o lognormal:MEDIANA:SIGMA)")
+
+
+def perfil_errores(especificacion: str) -> List[Tuple[str, float]]:
+    """Convierte '429:0.05,503:0.02,timeout:0.01' en [(evento, probabilidad)]."""
+    errores = []
+    for parte in filter(None, (p.strip() for p in especificacion.split(','))):
+        evento, _, probabilidad = parte.partition(':')
+        if not (evento == 'timeout' or evento.isdigit()):
+            raise ValueError(f"Error inválido: {parte!r} (código HTTP o 'timeout')")
+        errores.append((evento, float(probabilidad)))
+    if sum(p for _, p in errores) > 1:
+        raise ValueError(f"Las probabilidades de error suman más de 1: {especificacion!r}")
+    return errores
+
+
+class Grabaciones:
+    """Páginas y respuestas grabadas de un directorio de replica.py."""
+
+    def __init__(self, directorio: str, max_sinteticas: int = 64):
+        self.directorio = directorio
+        self._paginas = sorted(glob.glob(os.path.join(directorio, 'infocasas', '*.html')))
+        self._nombres = {os.path.basename(p)[:-5]: p for p in self._paginas}
+        self._completados = sorted(glob.glob(os.path.join(directorio, 'openrouter', '*.json')))
+        self._contenidos: Dict[str, bytes] = {}
+        self._sinteticas: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._max_sinteticas = max_sinteticas
+        self._lock = threading.Lock()
+
+    def _leer(self, ruta: str) -> bytes:
+        contenido = self._contenidos.get(ruta)
+        if contenido is None:
+            with open(ruta, 'rb') as archivo:
+                contenido = archivo.read()
+            with self._lock:
+                self._contenidos[ruta] = contenido
+        return contenido
+
+    def pagina(self, url: str) -> Tuple[Optional[bytes], str]:
+        """Contenido para una URL de InfoCasas y su origen ('grabada', 'reemplazo', 'sintetica')."""
+        clave = clave_pagina(url)
+        ruta = self._nombres.get(clave)
+        if ruta is not None:
+            return self._leer(ruta), 'grabada'
+        if SERVIDOR_CONFIG['faltantes'] == '404':
+            return None, 'faltante'
+        if self._paginas:
+            return self._leer(self._paginas[int(clave, 16) % len(self._paginas)]), 'reemplazo'
+        with self._lock:
+            contenido = self._sinteticas.get(clave)
+            if contenido is not None:
+                self._sinteticas.move_to_end(clave)
+                return contenido, 'sintetica'
+        contenido = pagina_resultados(semilla=int(clave, 16) % 100_000)
+        with self._lock:
+            self._sinteticas[clave] = contenido
+            if len(self._sinteticas) > self._max_sinteticas:
+                self._sinteticas.popitem(last=False)
+        return contenido, 'sintetica'
+
+    def completado(self, data: Dict[str, Any]) -> Tuple[Optional[bytes], str]:
+        """Respuesta de chat completions para una petición y su origen."""
+        clave = clave_completado(data)
+        ruta = os.path.join(self.directorio, 'openrouter', f'{clave}.json')
+        if os.path.exists(ruta):
+            origen = 'grabada'
+        elif SERVIDOR_CONFIG['faltantes'] == '404':
+            return None, 'faltante'
+        elif self._completados:
+            ruta, origen = self._completados[int(clave, 16) % len(self._completados)], 'reemplazo'
+        else:
+            return json.dumps(_RESPUESTA_GENERICA, ensure_ascii=False).encode('utf-8'), 'generica'
+        grabacion = json.loads(self._leer(ruta))
+        return json.dumps(grabacion['respuesta'], ensure_ascii=False).encode('utf-8'), origen
+
+    def __repr__(self) -> str:
+        return f"Grabaciones({self.directorio!r}: {len(self._paginas)} páginas, {len(self._completados)} completados)"
+
+
+class ServidorReplica(ThreadingHTTPServer):
+    """ThreadingHTTPServer con las grabaciones, los perfiles y los contadores."""
+
+    daemon_threads = True
+
+    def __init__(self, direccion: Tuple[str, int], grabaciones: Grabaciones):
+        super().__init__(direccion, _Manejador)
+        self.grabaciones = grabaciones
+        self.latencias = {u: perfil_latencia(e) for u, e in SERVIDOR_CONFIG['latencia'].items()}
+        self.errores = {u: perfil_errores(e) for u, e in SERVIDOR_CONFIG['errores'].items()}
+        semilla = SERVIDOR_CONFIG['semilla']
+        self.rnd = random.Random(int(semilla) if semilla is not None else None)
+        self._lock = threading.Lock()
+        self.contadores: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def sortear(self, upstream: str) -> Tuple[float, Optional[str]]:
+        """Latencia y error inyectado (o None) para una petición."""
+        with self._lock:
+            latencia = max(self.latencias[upstream](self.rnd), 0.0)
+            azar = self.rnd.random()
+        acumulado = 0.0
+        for evento, probabilidad in self.errores[upstream]:
+            acumulado += probabilidad
+            if azar < acumulado:
+                return latencia, evento
+        return latencia, None
+
+    def contar(self, upstream: str, evento: str):
+        with self._lock:
+            self.contadores[upstream][evento] += 1
+
+    def estadisticas(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {u: dict(c) for u, c in self.contadores.items()}
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: ServidorReplica
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        if partes.path == '/_estadisticas':
+            return self._responder(200, json.dumps(self.server.estadisticas()).encode('utf-8'), 'application/json')
+        if partes.path.startswith('/infocasas/') or partes.path == '/infocasas':
+            url = _BASE_INFOCASAS + partes.path[len('/infocasas'):]
+            if partes.query:
+                url = f'{url}?{partes.query}'
+            return self._pagina('infocasas', url)
+        if partes.path.startswith('/proxy'):
+            url = parse_qs(partes.query).get('url', [''])[0]
+            return self._pagina('proxy', url)
+        self._responder(404, b'{"error": "ruta desconocida"}', 'application/json')
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length') or 0)
+        cuerpo = self.rfile.read(largo)
+        if not self.path.startswith('/openrouter/'):
+            return self._responder(404, b'{"error": "ruta desconocida"}', 'application/json')
+        if not self._demorar('openrouter'):
+            return
+        try:
+            data = json.loads(cuerpo or b'{}')
+        except ValueError:
+            return self._responder(400, b'{"error": "json invalido"}', 'application/json')
+        contenido, origen = self.server.grabaciones.completado(data)
+        self.server.contar('openrouter', origen)
+        if contenido is None:
+            return self._responder(404, b'{"error": "sin grabacion"}', 'application/json')
+        self._responder(200, contenido, 'application/json')
+
+    def _pagina(self, upstream: str, url: str):
+        if not self._demorar(upstream):
+            return
+        contenido, origen = self.server.grabaciones.pagina(url)
+        self.server.contar(upstream, origen)
+        if contenido is None:
+            return self._responder(404, b'<html><body>404</body></html>', 'text/html')
+        self._responder(200, contenido, 'text/html; charset=utf-8')
+
+    def _demorar(self, upstream: str) -> bool:
+        """Espera la latencia sorteada; False si ya se respondió un error inyectado."""
+        latencia, error = self.server.sortear(upstream)
+        self.server.contar(upstream, 'peticiones')
+        if error == 'timeout':
+            self.server.contar(upstream, 'timeout')
+            time.sleep(SERVIDOR_CONFIG['cuelgue'])
+            self.close_connection = True
+            return False
+        time.sleep(latencia)
+        if error is not None:
+            self.server.contar(upstream, error)
+            self._responder(int(error), b'{"error": "inyectado"}', 'application/json')
+            return False
+        return True
+
+    def _responder(self, estado: int, contenido: bytes, tipo: str):
+        try:
+            self.send_response(estado)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente ya se fue (timeout, carrera de cobertura perdida)
+            self.close_connection = True
+
+
+def iniciar_servidor(puerto: Optional[int] = None, directorio: Optional[str] = None,
+                     host: str = '127.0.0.1') -> ServidorReplica:
+    """
+    Levanta el servidor en un hilo de fondo y lo retorna (puerto=0 elige uno
+    libre: server_address[1]). Se detiene con shutdown().
+    """
+    grabaciones = Grabaciones(directorio or REPLICA_CONFIG['directorio'])
+    servidor = ServidorReplica((host, SERVIDOR_CONFIG['puerto'] if puerto is None else puerto), grabaciones)
+    threading.Thread(target=servidor.serve_forever, name='inmo-replica', daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--puerto', type=int, default=SERVIDOR_CONFIG['puerto'])
+    parser.add_argument('--directorio', default=REPLICA_CONFIG['directorio'])
+    parser.add_argument('--host', default='127.0.0.1')
+    args = parser.parse_args()
+
+    grabaciones = Grabaciones(args.directorio)
+    servidor = ServidorReplica((args.host, args.puerto), grabaciones)
+    print(f"{grabaciones} en http://{args.host}:{args.puerto}")
+    for upstream in ('infocasas', 'proxy', 'openrouter'):
+        errores = SERVIDOR_CONFIG['errores'][upstream] or 'sin errores'
+        print(f"  {upstream:<11} latencia {SERVIDOR_CONFIG['latencia'][upstream]}, {errores}")
+    print(f"Backend: INMO_REPLICA=reproducir INMO_REPLICA_URL=http://{args.host}:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
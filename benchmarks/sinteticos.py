@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+DATOS SINTÉTICOS PARA BENCHMARKS - INMO
+=============================================================================
+Genera propiedades crudas y páginas de resultados con la misma forma que
+devuelve InfoCasas (props.pageProps.fetchResult.searchFast.data, bloques de
+i18n y layout, HTML alrededor), y carga páginas grabadas si existen.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import glob
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+
+BARRIOS = ['Villa Morra', 'Carmelitas', 'Recoleta', 'Sajonia', 'Los Laureles', 'Mburucuyá', 'Herrera']
+CIUDADES = ['Asunción', 'Luque', 'San Lorenzo', 'Lambaré', 'Fernando de la Mora', 'Encarnación']
+DEPARTAMENTOS = ['Asunción', 'Central', 'Itapúa', 'Alto Paraná']
+TIPOS = ['Casa', 'Departamento', 'Terreno', 'Dúplex', 'Local comercial', 'Oficina']
+
+
+def propiedad_cruda(indice: int, fotos: int = 12, rnd: Optional[random.Random] = None) -> Dict[str, Any]:
+    """Genera un diccionario de propiedad con la forma cruda de InfoCasas."""
+    rnd = rnd or random.Random(indice)
+    base_img = f"https://cdn2.infocasas.com.uy/repo/img/{indice:08d}"
+    imagenes = [
+        {
+            'image': f"{base_img}_{j}.jpg",
+            'thumbnail': f"{base_img}_{j}.jpg?w=320",
+            'alt': f"Foto {j}",
+        }
+        for j in range(fotos)
+    ]
+    prop = {
+        'id': 190000000 + indice,
+        'title': f"{rnd.choice(TIPOS)} en {rnd.choice(BARRIOS)} con {rnd.randint(1, 5)} dormitorios",
+        'description': ' '.join(rnd.choice(['Hermosa', 'amplia', 'luminosa', 'propiedad', 'con', 'patio',
+                                            'quincho', 'piscina', 'cerca', 'de', 'shopping', 'y', 'colegios'])
+                                for _ in range(rnd.randint(40, 160))),
+        'property_type': {'id': rnd.randint(1, 9), 'name': rnd.choice(TIPOS)},
+        'price': {'amount': rnd.randint(30, 900) * 1000, 'currency': {'id': 2, 'name': rnd.choice(['U$S', 'Gs.'])}},
+        'locations': {
+            'state': [{'id': 1, 'name': rnd.choice(DEPARTAMENTOS)}],
+            'city': [{'id': 2, 'name': rnd.choice(CIUDADES)}],
+            'neighbourhood': [{'id': 3, 'name': rnd.choice(BARRIOS)}],
+        },
+        'bedrooms': rnd.randint(1, 5),
+        'bathrooms': rnd.randint(1, 4),
+        'm2': rnd.randint(80, 900),
+        'm2Built': rnd.randint(50, 400),
+        'garages': rnd.randint(0, 3),
+        'age': rnd.randint(0, 40),
+        'images': imagenes,
+        'main_image': {'image': imagenes[0]['image'] if imagenes else f"{base_img}_0.jpg"},
+        'photos': [{'url': img['image']} for img in imagenes[::2]],
+        'lat': -25.28 - rnd.random() * 0.1,
+        'lng': -57.63 + rnd.random() * 0.1,
+        'link': f"/propiedad-{indice}/{190000000 + indice}",
+        'owner': {'name': 'Inmobiliaria Demo', 'whatsapp_phone': '+595981000000'},
+        'published_at': '2024-05-01T12:00:00Z',
+        'tags': [{'name': rnd.choice(['Nuevo', 'Oportunidad', 'Destacado', 'Financiación'])}],
+        'plan': {'name': rnd.choice(['Básico', 'Premium', 'Gratis'])},
+        'featured': rnd.random() < 0.1,
+    }
+    return prop
+
+
+def propiedades_crudas(cantidad: int, fotos: int = 12, semilla: int = 42) -> List[Dict[str, Any]]:
+    """Genera una lista de propiedades crudas reproducible."""
+    rnd = random.Random(semilla)
+    return [propiedad_cruda(i, fotos=fotos, rnd=rnd) for i in range(cantidad)]
+
+
+def pagina_resultados(cantidad: int = 21, fotos: int = 12, relleno_kb: int = 250, semilla: int = 42) -> bytes:
+    """
+    Genera el HTML de una página de resultados con un __NEXT_DATA__ realista:
+    propiedades en fetchResult.searchFast.data más bloques grandes que el
+    scraper no usa (i18n, layout, filtros).
+    """
+    rnd = random.Random(semilla)
+    next_data = {
+        'props': {
+            'pageProps': {
+                'fetchResult': {
+                    'searchFast': {
+                        'data': [propiedad_cruda(i, fotos=fotos, rnd=rnd) for i in range(cantidad)],
+                        'total': cantidad * 20,
+                    },
+                },
+                'i18n': {f"clave_{i}": f"Texto traducido número {i} " * 3 for i in range(relleno_kb * 8)},
+                'layout': {'menu': [{'label': f"Item {i}", 'href': f"/item/{i}"} for i in range(relleno_kb * 4)]},
+            },
+            '__N_SSP': True,
+        },
+        'page': '/[...params]',
+        'query': {'params': ['venta', 'casas', 'asuncion']},
+        'buildId': 'sintetico',
+    }
+    cuerpo = ''.join(
+        f'<div class="card" data-i="{i}"><span>Tarjeta {i}</span><img src="/x/{i}.jpg"/></div>'
+        for i in range(relleno_kb * 6)
+    )
+    html = (
+        '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"/><title>InfoCasas</title>'
+        '<script src="/_next/static/chunks/main.js" defer=""></script></head><body>'
+        f'<div id="__next">{cuerpo}</div>'
+        '<script id="__NEXT_DATA__" type="application/json">'
+        + json.dumps(next_data, ensure_ascii=False).replace('<', '\\u003c')
+        + '</script></body></html>'
+    )
+    return html.encode('utf-8')
+
+
+def cargar_paginas(directorio: Optional[str]) -> List[bytes]:
+    """
+    Carga páginas grabadas (*.html) de un directorio. Si no hay ninguna,
+    retorna una página sintética para que el benchmark siempre pueda correr.
+    """
+    paginas = []
+    if directorio and os.path.isdir(directorio):
+        for ruta in sorted(glob.glob(os.path.join(directorio, '*.html'))):
+            with open(ruta, 'rb') as archivo:
+                paginas.append(archivo.read())
+    if not paginas:
+        paginas.append(pagina_resultados())
+    return paginas
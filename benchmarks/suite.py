@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+SUITE DE MICROBENCHMARKS CON REFERENCIA
+=============================================================================
+Mide los caminos calientes de una búsqueda y de un mensaje del chat:
+
+- extraccion        _extract_property_data sobre un lote de propiedades crudas
+- parseo_pagina     _parsear_propiedades de páginas grabadas (o sintéticas)
+- ubicacion         _detectar_ubicacion de un mensaje
+- extraer_filtros   AgenteInmoParaguay.extraer_filtros de un mensaje
+- system_prompt     _construir_system_prompt con 10 resultados
+- formato_buscar    formato de la respuesta de /buscar (21 propiedades)
+
+Para cada caso reporta operaciones por segundo, p50/p99 por operación y la
+memoria asignada (pico de tracemalloc) por operación, y la compara con la
+referencia guardada en benchmarks/data/referencia.json. Falla (código 1)
+si un caso pierde más del umbral de ops/s o crece más del umbral de
+memoria (una regresión se vuelve a medir antes de confirmarla). El umbral
+de un caso se puede fijar en la referencia, en "umbrales".
+
+Las ops/s se normalizan con una calibración (un bucle fijo de Python) medida
+junto con la referencia, para que una máquina más lenta no cuente como
+regresión. Igual conviene regenerar la referencia al cambiar de máquina o de
+versión de Python (--guardar).
+
+Uso:
+    python -m benchmarks.suite [--guardar] [--solo caso,caso] [--paginas DIR]
+                               [--tiempo S] [--umbral 0.25] [--umbral-memoria 0.5]
+                               [--reintentos N]
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.sinteticos import cargar_paginas, propiedades_crudas
+from parseo import extraer_next_data, iterar_propiedades_crudas
+
+
+REFERENCIA = os.path.join(os.path.dirname(__file__), 'data', 'referencia.json')
+
+# Mensajes típicos del chat (voseo, montos escritos, barrios y ciudades)
+MENSAJES = [
+    'hola, busco una casa en venta en luque',
+    'quiero alquilar un depto de 2 dormitorios en villa morra',
+    'tenés terrenos en san bernardino hasta 80 mil dólares?',
+    'busco departamento en alquiler cerca del shopping del sol',
+    'casa con piscina en lambaré, 3 dormitorios, hasta 250.000',
+    'algo en fernando de la mora para invertir',
+    'me interesa comprar un dúplex en san lorenzo',
+    'en encarnación hay casas de hasta un millon y medio?',
+    'y en ciudad del este?',
+    'mejor en alquiler, 1 dormitorio',
+    'busco en lamabre una casa barata',
+    'depto amoblado en carmelitas o recoleta',
+    'quiero un lote en capiatá, presupuesto 40 mil',
+    'tenés algo en asunción centro hasta 500 dólares por mes?',
+]
+
+Caso = Callable[[], Any]
+
+
+def _propiedades_de_paginas(paginas: List[bytes]) -> List[Dict[str, Any]]:
+    """Propiedades crudas de las páginas (grabadas o sintéticas)."""
+    crudas = []
+    for pagina in paginas:
+        payload = extraer_next_data(pagina)
+        if payload is not None:
+            crudas.extend(iterar_propiedades_crudas(payload))
+    return crudas
+
+
+def preparar_casos(paginas_dir: Optional[str]) -> Dict[str, Caso]:
+    """Arma los casos: cada uno es una función sin argumentos = una operación."""
+    from agente import AgenteInmoParaguay
+    from backend.main import _formatear_busqueda
+    from scraper import InfocasasScraper
+
+    scraper = InfocasasScraper()
+    paginas = cargar_paginas(paginas_dir)
+    crudas = _propiedades_de_paginas(paginas) if paginas_dir else []
+    if len(crudas) < 100:
+        crudas = crudas + propiedades_crudas(100 - len(crudas))
+    lote = crudas[:100]
+    propiedades = [scraper._extract_property_data(prop) for prop in lote[:21]]
+
+    agente = AgenteInmoParaguay(api_key='benchmark')
+    for mensaje in MENSAJES[:3]:
+        agente.extraer_filtros(mensaje)
+    resultados = agente._formatear_resultados(propiedades)
+
+    siguiente_pagina = itertools.cycle(paginas).__next__
+    siguiente_mensaje = itertools.cycle(MENSAJES).__next__
+
+    return {
+        'extraccion': lambda: [scraper._extract_property_data(prop) for prop in lote],
+        'parseo_pagina': lambda: scraper._parsear_propiedades(siguiente_pagina()),
+        'ubicacion': lambda: scraper._detectar_ubicacion(siguiente_mensaje()),
+        'extraer_filtros': lambda: agente.extraer_filtros(siguiente_mensaje()),
+        'system_prompt': lambda: agente._construir_system_prompt(resultados),
+        'formato_buscar': lambda: _formatear_busqueda(propiedades),
+    }
+
+
+def calibrar(repeticiones: int = 15) -> float:
+    """Iteraciones por segundo de un bucle fijo de Python (mejor de N)."""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        total = 0
+        for i in range(200_000):
+            total += i % 7
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return 200_000 / mejor
+
+
+def medir(caso: Caso, tiempo: float, rondas: int = 5, min_operaciones: int = 10) -> Dict[str, float]:
+    """
+    Ops/s (la mejor de varias rondas, como timeit: las demás tienen ruido de
+    la máquina), p50/p99 (µs) de todas las operaciones y memoria asignada
+    (KB) por operación de un caso.
+    """
+    for _ in range(3):
+        caso()
+
+    duraciones = []
+    mejor_ronda = 0.0
+    for _ in range(rondas):
+        ronda = []
+        limite = time.perf_counter() + tiempo / rondas
+        while len(ronda) < min_operaciones or time.perf_counter() < limite:
+            inicio = time.perf_counter_ns()
+            caso()
+            ronda.append(time.perf_counter_ns() - inicio)
+        mejor_ronda = max(mejor_ronda, len(ronda) * 1e9 / sum(ronda))
+        duraciones.extend(ronda)
+
+    picos = []
+    tracemalloc.start()
+    for _ in range(min(len(duraciones), 20)):
+        antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        caso()
+        _, pico = tracemalloc.get_traced_memory()
+        picos.append(pico - antes)
+    tracemalloc.stop()
+
+    duraciones.sort()
+    return {
+        'ops_s': round(mejor_ronda, 1),
+        'p50_us': round(duraciones[len(duraciones) // 2] / 1000, 1),
+        'p99_us': round(duraciones[min(int(len(duraciones) * 0.99), len(duraciones) - 1)] / 1000, 1),
+        'asignado_kb': round(sorted(picos)[len(picos) // 2] / 1024, 1),
+    }
+
+
+def comparar(nombre: str, actual: Dict[str, float], referencia: Dict[str, Any],
+             escala: float, umbral: float, umbral_memoria: float) -> List[str]:
+    """Regresiones de un caso respecto de la referencia (vacía = sin regresión)."""
+    base = referencia['casos'].get(nombre)
+    if base is None:
+        return []
+    umbral = referencia.get('umbrales', {}).get(nombre, umbral)
+    regresiones = []
+    esperadas = base['ops_s'] * escala
+    if actual['ops_s'] < esperadas * (1 - umbral):
+        regresiones.append(f"{nombre}: {actual['ops_s']:.0f} ops/s, esperado >= {esperadas * (1 - umbral):.0f}")
+    # Por debajo de 16 KB el pico de tracemalloc es ruido
+    if base['asignado_kb'] >= 16 and actual['asignado_kb'] > base['asignado_kb'] * (1 + umbral_memoria):
+        regresiones.append(f"{nombre}: {actual['asignado_kb']:.0f} KB por operación, referencia {base['asignado_kb']:.0f} KB")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como nueva referencia')
+    parser.add_argument('--solo', help='Casos a correr, separados por coma')
+    parser.add_argument('--paginas', help='Directorio con páginas grabadas (*.html)')
+    parser.add_argument('--tiempo', type=float, default=1.0, help='Segundos por caso')
+    parser.add_argument('--umbral', type=float, default=0.25, help='Pérdida de ops/s tolerada (0.25 = 25%%)')
+    parser.add_argument('--umbral-memoria', type=float, default=0.5, help='Aumento de memoria tolerado')
+    parser.add_argument('--reintentos', type=int, default=2, help='Mediciones extra antes de confirmar una regresión')
+    parser.add_argument('--referencia', default=REFERENCIA)
+    args = parser.parse_args()
+
+    casos = preparar_casos(args.paginas)
+    if args.solo:
+        pedidos = args.solo.split(',')
+        desconocidos = set(pedidos) - set(casos)
+        if desconocidos:
+            parser.error(f"Casos desconocidos: {', '.join(sorted(desconocidos))} (hay: {', '.join(casos)})")
+        casos = {nombre: casos[nombre] for nombre in pedidos}
+
+    referencia = None
+    if os.path.exists(args.referencia) and not args.guardar:
+        with open(args.referencia, encoding='utf-8') as archivo:
+            referencia = json.load(archivo)
+
+    calibracion = calibrar()
+    escala = calibracion / referencia['calibracion'] if referencia else 1.0
+
+    print(f"Python {platform.python_version()}, calibración {calibracion / 1e6:.1f} M it/s"
+          + (f" (x{escala:.2f} respecto de la referencia)" if referencia else ''))
+    print(f"{'caso':<18}{'ops/s':>11}{'p50 µs':>10}{'p99 µs':>10}{'KB/op':>9}{'vs ref':>9}")
+
+    resultados = {}
+    regresiones = []
+    for nombre, caso in casos.items():
+        r = medir(caso, args.tiempo)
+        delta = ''
+        if referencia and nombre in referencia['casos']:
+            encontradas = comparar(nombre, r, referencia, escala, args.umbral, args.umbral_memoria)
+            # Una regresión se confirma midiendo de nuevo: un pico de la
+            # máquina no debe hacer fallar la suite
+            for _ in range(args.reintentos if encontradas else 0):
+                otra = medir(caso, args.tiempo)
+                if otra['ops_s'] > r['ops_s']:
+                    r = otra
+                encontradas = comparar(nombre, r, referencia, escala, args.umbral, args.umbral_memoria)
+                if not encontradas:
+                    break
+            regresiones += encontradas
+            delta = f"{(r['ops_s'] / (referencia['casos'][nombre]['ops_s'] * escala) - 1) * 100:+.0f}%"
+        resultados[nombre] = r
+        print(f"{nombre:<18}{r['ops_s']:>11.0f}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+              f"{r['asignado_kb']:>9.1f}{delta:>9}")
+
+    if args.guardar:
+        anterior = {}
+        if os.path.exists(args.referencia):
+            with open(args.referencia, encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+        # Los casos que no se corrieron (--solo) se llevan a la calibración nueva
+        previos = {}
+        for nombre, base in anterior.get('casos', {}).items():
+            previos[nombre] = dict(base, ops_s=round(base['ops_s'] * calibracion / anterior['calibracion'], 1))
+        nueva = {
+            'python': platform.python_version(),
+            'calibracion': round(calibracion),
+            'umbrales': anterior.get('umbrales', {}),
+            'casos': {**previos, **resultados},
+        }
+        with open(args.referencia, 'w', encoding='utf-8') as archivo:
+            json.dump(nueva, archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+        print(f"Referencia guardada en {args.referencia}")
+    elif referencia is None:
+        print("Sin referencia: correr con --guardar para crearla")
+
+    if regresiones:
+        print("\nREGRESIONES:")
+        for regresion in regresiones:
+            print(f"  {regresion}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+CACHE EN MEMORIA - INMO
+=============================================================================
+Cache LRU con expiración (TTL) y límites por cantidad de entradas y por
+tamaño aproximado en bytes. Se usa para no volver a descargar y parsear la
+misma página de InfoCasas cuando varios usuarios repiten una búsqueda.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def estimar_tamano(valor: Any) -> int:
+    """
+    Estima el tamaño en bytes de un valor serializable a JSON.
+
+    No es el consumo exacto de memoria de Python, pero es proporcional y
+    estable, que es lo que importa para el límite de bytes.
+    """
+    try:
+        return len(json.dumps(valor, ensure_ascii=False, default=str))
+    except (TypeError, ValueError):
+        return len(repr(valor))
+
+
+class CacheTTL:
+    """
+    Cache LRU thread-safe con TTL, máximo de entradas y máximo de bytes.
+
+    Las entradas vencidas se descartan al leerlas; cuando se supera alguno de
+    los límites se desalojan primero las menos usadas recientemente.
+    """
+
+    def __init__(self, ttl: float = 300, max_entradas: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            ttl: Segundos de vida de cada entrada
+            max_entradas: Cantidad máxima de entradas
+            max_bytes: Tamaño total máximo (aproximado) de los valores
+        """
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._estadisticas = {
+            'aciertos': 0,
+            'fallos': 0,
+            'expiradas': 0,
+            'desalojadas': 0,
+            'rechazadas': 0,
+        }
+
+    # ==========================================================================
+    # OPERACIONES
+    # ==========================================================================
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        """Retorna el valor guardado o None si no existe o ya venció."""
+        with self._lock:
+            entrada = self._leer(clave, time.monotonic())
+            return entrada[2] if entrada is not None else None
+
+    def _leer(self, clave: Hashable, ahora: float) -> Optional[tuple]:
+        """Entrada vigente (expira_en, tamaño, valor) o None. Llamar con el lock."""
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            self._estadisticas['fallos'] += 1
+            return None
+
+        expira_en, tamano, _ = entrada
+        if expira_en <= ahora:
+            del self._datos[clave]
+            self._bytes -= tamano
+            self._estadisticas['expiradas'] += 1
+            self._estadisticas['fallos'] += 1
+            return None
+
+        self._datos.move_to_end(clave)
+        self._estadisticas['aciertos'] += 1
+        return entrada
+
+    def guardar(self, clave: Hashable, valor: Any, tamano: Optional[int] = None):
+        """
+        Guarda un valor. Si no se indica el tamaño, se estima con estimar_tamano.
+        """
+        if tamano is None:
+            tamano = estimar_tamano(valor)
+
+        with self._lock:
+            if tamano > self.max_bytes:
+                # Un valor más grande que todo el cache no se guarda
+                self._estadisticas['rechazadas'] += 1
+                return
+
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+
+            self._datos[clave] = (time.monotonic() + self.ttl, tamano, valor)
+            self._bytes += tamano
+
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamano_viejo, _) = self._datos.popitem(last=False)
+                self._bytes -= tamano_viejo
+                self._estadisticas['desalojadas'] += 1
+
+    def invalidar(self, clave: Optional[Hashable] = None):
+        """Elimina una entrada, o todo el cache si no se indica clave."""
+        with self._lock:
+            if clave is None:
+                self._datos.clear()
+                self._bytes = 0
+                return
+            entrada = self._datos.pop(clave, None)
+            if entrada is not None:
+                self._bytes -= entrada[1]
+
+    # ==========================================================================
+    # ESTADÍSTICAS
+    # ==========================================================================
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Retorna contadores de aciertos/fallos/desalojos y ocupación actual."""
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas['entradas'] = len(self._datos)
+            estadisticas['bytes'] = self._bytes
+        consultas = estadisticas['aciertos'] + estadisticas['fallos']
+        estadisticas['tasa_aciertos'] = round(estadisticas['aciertos'] / consultas, 4) if consultas else 0.0
+        estadisticas['ttl'] = self.ttl
+        estadisticas['max_entradas'] = self.max_entradas
+        estadisticas['max_bytes'] = self.max_bytes
+        return estadisticas
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._datos)
+
+
+class CacheSWR(CacheTTL):
+    """
+    CacheTTL con "stale-while-revalidate": cada entrada está fresca durante
+    'fresco' segundos y, durante 'gracia' segundos más, se sigue sirviendo
+    (vieja) mientras alguien la refresca en segundo plano. Pasada la gracia
+    se descarta como en CacheTTL.
+
+    El cache no ejecuta los refrescos: reservar_refresco() indica si quien
+    leyó una entrada vieja debe lanzarlo (uno por clave, y como máximo
+    max_refrescos a la vez) y terminar_refresco() lo libera.
+    """
+
+    def __init__(self, fresco: float = 60, gracia: float = 600, max_entradas: int = 256,
+                 max_bytes: int = 32 * 1024 * 1024, max_refrescos: int = 4):
+        """
+        Args:
+            fresco: Segundos en que una entrada se sirve sin refrescar
+            gracia: Segundos adicionales en que se sirve vieja y se refresca
+            max_entradas / max_bytes: Límites como en CacheTTL
+            max_refrescos: Refrescos en segundo plano simultáneos
+        """
+        super().__init__(ttl=fresco + gracia, max_entradas=max_entradas, max_bytes=max_bytes)
+        self.fresco = fresco
+        self.gracia = gracia
+        self.max_refrescos = max_refrescos
+        self._refrescando = set()
+        self._estadisticas.update({
+            'viejas': 0,
+            'refrescos': 0,
+            'refrescos_fallidos': 0,
+            'refrescos_descartados': 0,
+        })
+
+    def obtener_con_estado(self, clave: Hashable) -> Tuple[Optional[Any], bool]:
+        """
+        Retorna (valor, vieja): vieja=True si pasó el período fresco.
+        (None, False) si no existe o venció la gracia.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._leer(clave, ahora)
+            if entrada is None:
+                return None, False
+            vieja = entrada[0] - self.gracia <= ahora
+            if vieja:
+                self._estadisticas['viejas'] += 1
+            return entrada[2], vieja
+
+    def reservar_refresco(self, clave: Hashable) -> bool:
+        """True si quien llama debe refrescar la clave (y queda anotado)."""
+        with self._lock:
+            if clave in self._refrescando:
+                return False
+            if len(self._refrescando) >= self.max_refrescos:
+                self._estadisticas['refrescos_descartados'] += 1
+                return False
+            self._refrescando.add(clave)
+            self._estadisticas['refrescos'] += 1
+            return True
+
+    def terminar_refresco(self, clave: Hashable, exito: bool = True):
+        """Libera el refresco de la clave (guardar el valor nuevo antes)."""
+        with self._lock:
+            self._refrescando.discard(clave)
+            if not exito:
+                self._estadisticas['refrescos_fallidos'] += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        estadisticas = super().estadisticas()
+        with self._lock:
+            estadisticas['refrescando'] = len(self._refrescando)
+        estadisticas['fresco'] = self.fresco
+        estadisticas['gracia'] = self.gracia
+        return estadisticas
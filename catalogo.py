@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+CATÁLOGO COLUMNAR - INMO
+=============================================================================
+Representación en columnas (arreglos NumPy) de un catálogo de propiedades en
+memoria, para filtrar, ordenar y agregar decenas de miles de propiedades sin
+recorrer diccionarios en Python:
+
+- Numéricas: precio, dormitorios, baños, m2, latitud/longitud, destacado.
+- Categóricas (códigos enteros): moneda, ciudad, barrio, departamento, tipo,
+  operación y slug de tipo del crawler.
+- Cada fila apunta a su Propiedad completa (modelo.py).
+
+Uso típico:
+    catalogo = CatalogoColumnar.desde_almacen(AlmacenPropiedades())
+    filas = catalogo.filtrar(operacion='venta', ubicacion='luque', precio_max=150000)
+    filas = catalogo.ordenar(filas, por='precio', limite=20)
+    propiedades = catalogo.obtener(filas)
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import math
+
+import numpy as np
+
+from almacen import AlmacenPropiedades, _slug
+from modelo import Propiedad
+
+
+# Columnas numéricas por las que se puede ordenar
+COLUMNAS_ORDEN = ('precio', 'dormitorios', 'banos', 'm2_construidos', 'm2_terreno')
+
+# Entero usado como "sin dato" en las columnas categóricas
+SIN_DATO = -1
+
+
+def _numero(valor: Any, sin_dato: float) -> float:
+    """Convierte a número lo que venga de InfoCasas (None, texto, nan o inf -> sin_dato)."""
+    if valor is None:
+        return sin_dato
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError, OverflowError):
+        return sin_dato
+    return numero if math.isfinite(numero) else sin_dato
+
+
+class _Categorias:
+    """Vocabulario de una columna categórica: valor <-> código entero."""
+
+    def __init__(self):
+        self.valores: List[str] = []
+        self._codigos: Dict[str, int] = {}
+
+    def codificar(self, valores: Iterable[Optional[str]]) -> np.ndarray:
+        codigos = []
+        for valor in valores:
+            if valor is None:
+                codigos.append(SIN_DATO)
+                continue
+            codigo = self._codigos.get(valor)
+            if codigo is None:
+                codigo = self._codigos[valor] = len(self.valores)
+                self.valores.append(valor)
+            codigos.append(codigo)
+        return np.array(codigos, dtype=np.int32)
+
+    def codigos_donde(self, condicion: Callable[[str], bool]) -> np.ndarray:
+        """Códigos de los valores del vocabulario que cumplen la condición."""
+        return np.array([c for c, v in enumerate(self.valores) if condicion(v)], dtype=np.int32)
+
+    def nombre(self, codigo: int) -> Optional[str]:
+        return self.valores[codigo] if codigo != SIN_DATO else None
+
+
+class CatalogoColumnar:
+    """
+    Catálogo inmutable de propiedades en formato columnar.
+
+    Las consultas trabajan con arreglos de ids de fila (np.ndarray de enteros)
+    que se pueden encadenar: filtrar -> ordenar -> obtener.
+    """
+
+    def __init__(self,
+                 propiedades: Sequence[Propiedad],
+                 operaciones: Optional[Sequence[str]] = None,
+                 tipos: Optional[Sequence[str]] = None):
+        """
+        Args:
+            propiedades: Propiedades del catálogo (fila i = propiedades[i])
+            operaciones: Operación de cada fila ('venta'/'alquiler'), si se conoce
+            tipos: Slug de tipo del crawler de cada fila ('casas'...), si se conoce
+        """
+        self.propiedades = list(propiedades)
+        n = len(self.propiedades)
+
+        # Dormitorios y baños también van en float64 con NaN: un valor fuera
+        # de rango no debe romper la carga ni uno fraccionario truncarse
+        def flotantes(atributo: str) -> np.ndarray:
+            return np.array([_numero(getattr(p, atributo), np.nan) for p in self.propiedades], dtype=np.float64)
+
+        self.precio = flotantes('monto')
+        self.m2_construidos = flotantes('m2_construidos')
+        self.m2_terreno = flotantes('m2_terreno')
+        self.dormitorios = flotantes('dormitorios')
+        self.banos = flotantes('banos')
+        self.destacado = np.array([bool(p.destacado) for p in self.propiedades], dtype=bool)
+
+        # Coordenadas solo si vienen las dos (misma regla que Propiedad.coordenadas)
+        coordenadas = [p.coordenadas or {} for p in self.propiedades]
+        self.latitud = np.array([_numero(c.get('latitud'), np.nan) for c in coordenadas], dtype=np.float64)
+        self.longitud = np.array([_numero(c.get('longitud'), np.nan) for c in coordenadas], dtype=np.float64)
+
+        self.categorias = {nombre: _Categorias() for nombre in (
+            'moneda', 'ciudad', 'barrio', 'departamento', 'tipo_propiedad', 'operacion', 'tipo'
+        )}
+        self.moneda = self.categorias['moneda'].codificar(p.moneda for p in self.propiedades)
+        self.ciudad = self.categorias['ciudad'].codificar(p.ciudad for p in self.propiedades)
+        self.barrio = self.categorias['barrio'].codificar(p.barrio for p in self.propiedades)
+        self.departamento = self.categorias['departamento'].codificar(p.departamento for p in self.propiedades)
+        self.tipo_propiedad = self.categorias['tipo_propiedad'].codificar(p.tipo_propiedad for p in self.propiedades)
+        self.operacion = self.categorias['operacion'].codificar(operaciones or [None] * n)
+        self.tipo = self.categorias['tipo'].codificar(tipos or [None] * n)
+
+    @classmethod
+    def desde_almacen(cls, almacen: AlmacenPropiedades) -> 'CatalogoColumnar':
+        """Carga todo el almacén local como catálogo columnar."""
+        propiedades, operaciones, tipos = [], [], []
+        for operacion, tipo, datos in almacen.iterar_propiedades():
+            propiedades.append(Propiedad.desde_dict(datos))
+            operaciones.append(operacion)
+            tipos.append(tipo)
+        return cls(propiedades, operaciones, tipos)
+
+    def __len__(self) -> int:
+        return len(self.propiedades)
+
+    # ==========================================================================
+    # FILTRADO
+    # ==========================================================================
+
+    def filtrar(self,
+                operacion: Optional[str] = None,
+                tipo: Optional[Union[str, Sequence[str]]] = None,
+                tipo_contiene: Optional[Sequence[str]] = None,
+                ubicacion: Optional[str] = None,
+                precio_min: Optional[float] = None,
+                precio_max: Optional[float] = None,
+                moneda: Optional[str] = None,
+                dormitorios: Optional[int] = None,
+                dormitorios_min: Optional[int] = None,
+                banos: Optional[int] = None,
+                banos_min: Optional[int] = None,
+                m2_min: Optional[float] = None,
+                solo_destacados: bool = False,
+                filas: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Retorna los ids de fila que cumplen todos los criterios indicados.
+
+        Args:
+            tipo: Slug(s) de tipo del crawler ('casas', ['casas', 'departamentos'])
+            tipo_contiene: Subcadenas del nombre de tipo ('casa'), como _filtrar_por_tipo
+            ubicacion: Slug de ciudad, barrio o departamento
+            precio_min / precio_max: Las filas sin precio quedan afuera
+            dormitorios / banos: Cantidad exacta (como el filtro de InfoCasas)
+            filas: Restringir a estas filas (p. ej. el resultado de otra consulta)
+        """
+        mascara = np.ones(len(self), dtype=bool)
+
+        if operacion is not None:
+            mascara &= self._mascara_categoria('operacion', [operacion])
+        if tipo is not None:
+            mascara &= self._mascara_categoria('tipo', [tipo] if isinstance(tipo, str) else tipo)
+        if tipo_contiene:
+            subcadenas = [s.lower() for s in tipo_contiene]
+            codigos = self.categorias['tipo_propiedad'].codigos_donde(
+                lambda nombre: any(s in nombre.lower() for s in subcadenas)
+            )
+            mascara &= np.isin(self.tipo_propiedad, codigos)
+        if ubicacion is not None:
+            slug = _slug(ubicacion)
+            en_ubicacion = np.zeros(len(self), dtype=bool)
+            for columna in ('ciudad', 'barrio', 'departamento'):
+                codigos = self.categorias[columna].codigos_donde(lambda nombre: _slug(nombre) == slug)
+                en_ubicacion |= np.isin(getattr(self, columna), codigos)
+            mascara &= en_ubicacion
+        if precio_min is not None:
+            mascara &= self.precio >= precio_min
+        if precio_max is not None:
+            mascara &= self.precio <= precio_max
+        if moneda is not None:
+            mascara &= self._mascara_categoria('moneda', [moneda])
+        if dormitorios is not None:
+            mascara &= self.dormitorios == dormitorios
+        if dormitorios_min is not None:
+            mascara &= self.dormitorios >= dormitorios_min
+        if banos is not None:
+            mascara &= self.banos == banos
+        if banos_min is not None:
+            mascara &= self.banos >= banos_min
+        if m2_min is not None:
+            mascara &= self.m2_construidos >= m2_min
+        if solo_destacados:
+            mascara &= self.destacado
+
+        if filas is not None:
+            return filas[mascara[filas]]
+        return np.flatnonzero(mascara)
+
+    def _mascara_categoria(self, columna: str, valores: Sequence[str]) -> np.ndarray:
+        valores = set(valores)
+        codigos = self.categorias[columna].codigos_donde(lambda v: v in valores)
+        return np.isin(getattr(self, columna), codigos)
+
+    # ==========================================================================
+    # ORDEN Y MATERIALIZACIÓN
+    # ==========================================================================
+
+    def ordenar(self,
+                filas: np.ndarray,
+                por: str = 'precio',
+                descendente: bool = False,
+                limite: Optional[int] = None) -> np.ndarray:
+        """
+        Ordena las filas por una columna numérica; las que no tienen dato van
+        al final. Con 'limite' solo se ordenan los primeros k (argpartition).
+        """
+        if por not in COLUMNAS_ORDEN:
+            raise ValueError(f"No se puede ordenar por '{por}' (opciones: {', '.join(COLUMNAS_ORDEN)})")
+
+        columna = getattr(self, por)
+        valores = columna[filas].astype(np.float64)
+        if descendente:
+            valores = -valores
+        valores[np.isnan(valores)] = np.inf
+
+        if limite is not None and limite < len(filas):
+            if limite <= 0:
+                return filas[:0]
+            # Se toman todos los empatados con el k-ésimo para que el orden
+            # sea estable (igual que sorted()) y no dependa de la partición
+            corte = np.partition(valores, limite - 1)[limite - 1]
+            candidatos = np.flatnonzero(valores <= corte)
+            orden = candidatos[np.argsort(valores[candidatos], kind='stable')][:limite]
+        else:
+            orden = np.argsort(valores, kind='stable')
+        return filas[orden]
+
+    def obtener(self, filas: Iterable[int]) -> List[Propiedad]:
+        """Propiedades completas de las filas indicadas, en ese orden."""
+        return [self.propiedades[i] for i in filas]
+
+    # ==========================================================================
+    # AGREGACIÓN
+    # ==========================================================================
+
+    def agregar(self, filas: np.ndarray, por: str = 'ciudad') -> Dict[str, Dict[str, Any]]:
+        """
+        Cantidad y precio mínimo/promedio/máximo por valor de una columna
+        categórica (ciudad, barrio, departamento, tipo_propiedad, moneda...).
+        """
+        if por not in self.categorias:
+            raise ValueError(f"No se puede agrupar por '{por}' (opciones: {', '.join(self.categorias)})")
+
+        codigos = getattr(self, por)[filas]
+        precios = self.precio[filas]
+        validos = codigos != SIN_DATO
+        codigos, precios = codigos[validos], precios[validos]
+        grupos = len(self.categorias[por].valores)
+
+        cantidad = np.bincount(codigos, minlength=grupos)
+        con_precio = ~np.isnan(precios)
+        cantidad_precio = np.bincount(codigos[con_precio], minlength=grupos)
+        suma = np.bincount(codigos[con_precio], weights=precios[con_precio], minlength=grupos)
+        minimo = np.full(grupos, np.inf)
+        maximo = np.full(grupos, -np.inf)
+        np.minimum.at(minimo, codigos[con_precio], precios[con_precio])
+        np.maximum.at(maximo, codigos[con_precio], precios[con_precio])
+
+        resultado = {}
+        for codigo in np.flatnonzero(cantidad):
+            hay_precio = cantidad_precio[codigo] > 0
+            resultado[self.categorias[por].nombre(codigo)] = {
+                'cantidad': int(cantidad[codigo]),
+                'precio_min': float(minimo[codigo]) if hay_precio else None,
+                'precio_promedio': float(suma[codigo] / cantidad_precio[codigo]) if hay_precio else None,
+                'precio_max': float(maximo[codigo]) if hay_precio else None,
+            }
+        return resultado
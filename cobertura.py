@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+PETICIONES CUBIERTAS (HEDGING) ENTRE PROXY Y DIRECTO - INMO
+=============================================================================
+La mayoría de las páginas de InfoCasas llegan en menos de un segundo, pero
+algunas se cuelgan hasta el timeout. Con la cobertura activa, si la ruta
+principal (proxy) no respondió dentro de un retraso derivado de sus propias
+latencias (por defecto el p95), se lanza la misma petición por la otra ruta
+(directo): gana el primer 200 y la otra se cancela. Solo se cubre el proxy:
+la directa es la principal únicamente si el proxy está desactivado o su
+interruptor abierto, y entonces no hay otra ruta con la cual cubrirla.
+
+Este módulo lleva las latencias por ruta, calcula el retraso y cuenta
+cuántas coberturas se dispararon y cuántas ganaron; la carrera en sí está
+en InfocasasScraper._request_cubierto (hilos) y en su versión async.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+COBERTURA_CONFIG = {
+    'activo': os.getenv('INMO_COBERTURA', 'false').lower() == 'true',
+    # Percentil de la latencia de la ruta principal que se espera antes de cubrir
+    'percentil': float(os.getenv('INMO_COBERTURA_PERCENTIL', '0.95')),
+    # Límites del retraso (s) y retraso usado mientras haya pocas muestras
+    'retraso_min': float(os.getenv('INMO_COBERTURA_RETRASO_MIN', '0.3')),
+    'retraso_max': float(os.getenv('INMO_COBERTURA_RETRASO_MAX', '5')),
+    'retraso_inicial': float(os.getenv('INMO_COBERTURA_RETRASO_INICIAL', '2')),
+    'muestras_min': int(os.getenv('INMO_COBERTURA_MUESTRAS_MIN', '20')),
+    # Latencias recientes que se guardan por ruta
+    'ventana': int(os.getenv('INMO_COBERTURA_VENTANA', '500')),
+    # Hilos de cada pool (principales y cubiertas) del scraper sync; nunca
+    # menos del doble del pool de la cascada (0 = ese mínimo)
+    'max_hilos': int(os.getenv('INMO_COBERTURA_MAX_HILOS', '0')),
+}
+
+ESTADISTICAS_COBERTURA = {
+    # Veces que la principal no respondió a tiempo y se lanzó la otra ruta
+    'disparadas': 0,
+    # De esas, cuántas ganó la cubierta y cuántas igual ganó la principal
+    'ganadas': 0,
+    'ganadas_principal': 0,
+    # Ninguna de las dos devolvió un 200
+    'sin_respuesta': 0,
+}
+
+_latencias: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+
+
+def registrar_latencia(ruta: str, segundos: float):
+    """Agrega la latencia de una respuesta 200 de la ruta."""
+    with _lock:
+        ventana = _latencias.get(ruta)
+        if ventana is None:
+            ventana = _latencias[ruta] = deque(maxlen=COBERTURA_CONFIG['ventana'])
+        ventana.append(segundos)
+
+
+def percentil_latencia(ruta: str, percentil: float) -> Optional[float]:
+    """Percentil de las latencias recientes de la ruta (None sin muestras)."""
+    with _lock:
+        muestras = sorted(_latencias.get(ruta, ()))
+    if not muestras:
+        return None
+    return muestras[min(int(len(muestras) * percentil), len(muestras) - 1)]
+
+
+def retraso_cobertura(ruta: str) -> float:
+    """Segundos a esperar a la ruta principal antes de lanzar la cubierta."""
+    with _lock:
+        muestras = len(_latencias.get(ruta, ()))
+    if muestras < COBERTURA_CONFIG['muestras_min']:
+        return COBERTURA_CONFIG['retraso_inicial']
+    retraso = percentil_latencia(ruta, COBERTURA_CONFIG['percentil'])
+    return min(max(retraso, COBERTURA_CONFIG['retraso_min']), COBERTURA_CONFIG['retraso_max'])
+
+
+def contar_cobertura(evento: str):
+    """Suma uno al contador del evento ('disparadas', 'ganadas'...)."""
+    with _lock:
+        ESTADISTICAS_COBERTURA[evento] += 1
+
+
+def estadisticas_cobertura() -> Dict[str, Any]:
+    """Contadores, latencias por ruta y retraso actual."""
+    with _lock:
+        contadores = dict(ESTADISTICAS_COBERTURA)
+        rutas = list(_latencias)
+    latencias = {}
+    for ruta in rutas:
+        p50 = percentil_latencia(ruta, 0.5)
+        p95 = percentil_latencia(ruta, 0.95)
+        latencias[ruta] = {
+            'muestras': len(_latencias[ruta]),
+            'p50_ms': round(p50 * 1000) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000) if p95 is not None else None,
+            'retraso_ms': round(retraso_cobertura(ruta) * 1000),
+        }
+    return {
+        'activo': COBERTURA_CONFIG['activo'],
+        **contadores,
+        'latencias': latencias,
+    }
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+CRAWLER DEL CATÁLOGO COMPLETO - INMO
+=============================================================================
+Recorre todas las combinaciones operación × tipo × ubicación de InfoCasas,
+página por página, y guarda las propiedades en el almacén local.
+
+- Checkpoint por página: si el proceso se corta, la próxima ejecución
+  retoma cada combinación desde la última página guardada.
+- Hash de contenido: las propiedades que no cambiaron no se reescriben.
+- Al completar una combinación se retiran las propiedades que el recorrido
+  no vio (ya no están publicadas en InfoCasas).
+- Estadísticas por corrida: páginas, bytes, propiedades/s.
+
+Uso:
+    python crawler.py                 # retoma el recorrido en curso
+    python crawler.py --nuevo         # empieza un recorrido desde cero
+    python crawler.py --operaciones venta --tipos casas --ubicaciones luque
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from almacen import AlmacenPropiedades
+from scraper import InfocasasScraper
+
+
+# Categorías agregadas: repiten propiedades de las categorías específicas
+TIPOS_AGREGADOS = tuple(InfocasasScraper.TIPOS_AGREGADOS)
+OPERACIONES = ('venta', 'alquiler')
+
+
+class CrawlerInfocasas:
+    """
+    Crawler incremental y reanudable del catálogo de InfoCasas Paraguay.
+    """
+
+    def __init__(self,
+                 almacen: AlmacenPropiedades,
+                 scraper: Optional[InfocasasScraper] = None,
+                 hilos: int = 4,
+                 max_paginas: int = 200,
+                 pausa: float = 0.0):
+        """
+        Args:
+            almacen: Almacén donde se guardan propiedades y checkpoints
+            scraper: Scraper a usar (por defecto uno nuevo)
+            hilos: Combinaciones que se recorren en paralelo
+            max_paginas: Tope de páginas por combinación
+            pausa: Segundos de espera entre páginas de una misma combinación
+        """
+        self.almacen = almacen
+        self.scraper = scraper or InfocasasScraper()
+        self.hilos = hilos
+        self.max_paginas = max_paginas
+        self.pausa = pausa
+
+        # Clave de búsqueda para cada slug de URL ('casas' -> 'casa')
+        self._tipo_por_slug = {}
+        for tipo, slug in self.scraper.TIPOS_PROPIEDAD_URL.items():
+            self._tipo_por_slug.setdefault(slug, tipo)
+
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self.estadisticas = {
+            'unidades': 0,
+            'paginas': 0,
+            'bytes': 0,
+            'propiedades': 0,
+            'nuevas': 0,
+            'actualizadas': 0,
+            'sin_cambios': 0,
+            'retiradas': 0,
+            'errores': 0,
+        }
+
+    # ==========================================================================
+    # ENUMERACIÓN DEL ESPACIO DE BÚSQUEDA
+    # ==========================================================================
+
+    def enumerar_unidades(self,
+                          operaciones: Optional[List[str]] = None,
+                          tipos: Optional[List[str]] = None,
+                          ubicaciones: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """
+        Genera las combinaciones operación × tipo × ubicación a recorrer.
+
+        Por defecto: venta/alquiler × slugs específicos de TIPOS_PROPIEDAD_URL
+        × departamentos y ciudades de CONFIG.
+        """
+        config = self.scraper.CONFIG
+        if not operaciones:
+            operaciones = list(OPERACIONES)
+        if not tipos:
+            tipos = []
+            for slug in self.scraper.TIPOS_PROPIEDAD_URL.values():
+                if slug not in TIPOS_AGREGADOS and slug not in tipos:
+                    tipos.append(slug)
+        if not ubicaciones:
+            ubicaciones = list(dict.fromkeys(config['departamentos'] + config['ciudades']))
+
+        return [
+            {
+                'clave': f"{operacion}/{tipo}/{ubicacion}",
+                'operacion': operacion,
+                'tipo': tipo,
+                'ubicacion': ubicacion,
+            }
+            for operacion in operaciones
+            for tipo in tipos
+            for ubicacion in ubicaciones
+        ]
+
+    # ==========================================================================
+    # RECORRIDO
+    # ==========================================================================
+
+    def ejecutar(self, unidades: List[Dict[str, str]], nuevo: bool = False) -> Dict[str, Any]:
+        """
+        Recorre las unidades pendientes y retorna las estadísticas de la corrida.
+
+        Args:
+            unidades: Combinaciones a recorrer (ver enumerar_unidades)
+            nuevo: Si es True se descarta el progreso anterior
+        """
+        if nuevo:
+            self.almacen.reiniciar_unidades()
+        self.almacen.registrar_unidades(unidades)
+        pendientes = self.almacen.unidades_pendientes([u['clave'] for u in unidades])
+
+        corrida_id = self.almacen.iniciar_corrida()
+        inicio = time.time()
+        print(f"[CRAWLER] {len(pendientes)} de {len(unidades)} combinaciones pendientes")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='crawler') as ejecutor:
+                futuros = [ejecutor.submit(self._recorrer_unidad, unidad) for unidad in pendientes]
+                try:
+                    for futuro in futuros:
+                        futuro.result()
+                except BaseException:
+                    # Ctrl+C: los hilos terminan la página en curso y se detienen
+                    self._detener.set()
+                    for futuro in futuros:
+                        futuro.cancel()
+                    raise
+        finally:
+            estadisticas = self._resumen(time.time() - inicio)
+            self.almacen.finalizar_corrida(corrida_id, estadisticas)
+
+        return estadisticas
+
+    def _recorrer_unidad(self, unidad: Dict[str, Any]):
+        """Recorre una combinación desde la página siguiente al último checkpoint."""
+        clave = unidad['clave']
+        tipo_busqueda = self._tipo_por_slug.get(unidad['tipo'], unidad['tipo'])
+        vistos = set()
+        pagina = unidad['ultima_pagina'] + 1
+        # Con el tope de páginas quedan propiedades sin ver que siguen publicadas
+        retirar = True
+
+        try:
+            self.almacen.iniciar_pasada(clave)
+            while pagina <= self.max_paginas:
+                if self._detener.is_set():
+                    return
+                url = self.scraper._construir_url_busqueda(
+                    unidad['operacion'], tipo_busqueda, unidad['ubicacion'], page=pagina
+                )
+                response = self.scraper._hacer_request(url)
+                if not response:
+                    # Sin respuesta: se deja la unidad en curso para reintentar luego
+                    self._sumar({'errores': 1})
+                    return
+
+                propiedades = self.scraper._parsear_pagina(response.content)
+                ids = {p['identificacion']['id'] for p in propiedades}
+                if not propiedades or ids <= vistos:
+                    break
+                vistos |= ids
+
+                contadores = self.almacen.guardar_propiedades(unidad['operacion'], unidad['tipo'], propiedades)
+                self.almacen.marcar_pagina(clave, pagina, len(propiedades))
+                contadores.update({
+                    'paginas': 1,
+                    'bytes': len(response.content),
+                    'propiedades': len(propiedades),
+                })
+                self._sumar(contadores)
+
+                pagina += 1
+                if self.pausa:
+                    time.sleep(self.pausa)
+            else:
+                retirar = False
+
+            retiradas = self.almacen.completar_unidad(clave, retirar)
+            self._sumar({'unidades': 1, 'retiradas': retiradas})
+
+        except Exception as e:
+            print(f"[CRAWLER] Error en {clave} (página {pagina}): {e}")
+            self._sumar({'errores': 1})
+
+    # ==========================================================================
+    # ESTADÍSTICAS
+    # ==========================================================================
+
+    def _sumar(self, contadores: Dict[str, int]):
+        with self._lock:
+            for clave, valor in contadores.items():
+                self.estadisticas[clave] += valor
+
+    def _resumen(self, duracion: float) -> Dict[str, Any]:
+        """Estadísticas acumuladas más throughput de la corrida."""
+        with self._lock:
+            resumen = dict(self.estadisticas)
+        resumen['duracion_s'] = round(duracion, 2)
+        resumen['paginas_por_s'] = round(resumen['paginas'] / duracion, 2) if duracion else 0.0
+        resumen['propiedades_por_s'] = round(resumen['propiedades'] / duracion, 2) if duracion else 0.0
+        resumen['mb_por_s'] = round(resumen['bytes'] / 1024 / 1024 / duracion, 3) if duracion else 0.0
+        return resumen
+
+
+# =============================================================================
+# FUNCIÓN PRINCIPAL (CLI)
+# =============================================================================
+
+def main():
+    """Ejecuta el crawler desde la línea de comandos."""
+    parser = argparse.ArgumentParser(description='Crawler del catálogo de InfoCasas Paraguay')
+    parser.add_argument('--db', help='Archivo SQLite del almacén (por defecto INMO_DB_PATH)')
+    parser.add_argument('--nuevo', action='store_true', help='Descartar el progreso y empezar de cero')
+    parser.add_argument('--operaciones', nargs='*', help='venta y/o alquiler')
+    parser.add_argument('--tipos', nargs='*', help='Slugs de tipo (casas, departamentos, terrenos...)')
+    parser.add_argument('--ubicaciones', nargs='*', help='Slugs de departamento o ciudad')
+    parser.add_argument('--hilos', type=int, default=4)
+    parser.add_argument('--max-paginas', type=int, default=200)
+    parser.add_argument('--pausa', type=float, default=0.0, help='Segundos entre páginas')
+    args = parser.parse_args()
+
+    almacen = AlmacenPropiedades(args.db)
+    crawler = CrawlerInfocasas(almacen, hilos=args.hilos, max_paginas=args.max_paginas, pausa=args.pausa)
+    unidades = crawler.enumerar_unidades(args.operaciones, args.tipos, args.ubicaciones)
+
+    try:
+        estadisticas = crawler.ejecutar(unidades, nuevo=args.nuevo)
+    except KeyboardInterrupt:
+        print("\n[CRAWLER] Interrumpido: el progreso quedó guardado, volvé a ejecutar para retomar")
+        return
+    finally:
+        almacen.cerrar()
+
+    print("\n[CRAWLER] Corrida terminada:")
+    for clave, valor in estadisticas.items():
+        print(f"  {clave}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
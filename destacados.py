@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+DETECCIÓN DE PROPIEDADES DESTACADAS - INMO
+=============================================================================
+InfoCasas marca las propiedades destacadas de varias formas según el listado
+(campos booleanos, etiquetas, plan del anunciante). Las reglas están en una
+tabla declarativa que se compila una sola vez en un predicado; para sumar o
+cambiar señales alcanza con un JSON (INMO_REGLAS_DESTACADO), sin tocar código:
+
+    {
+        "campos": ["featured", "is_featured", "sponsored"],
+        "etiquetas": {"campos": ["tags", "labels"], "palabras": ["destacad", "premium"]},
+        "plan": {"campos": ["plan", "subscription"], "palabras": ["gold"], "palabras_texto": ["premium"]}
+    }
+
+Las claves del JSON reemplazan a las de REGLAS_DESTACADO; las que falten
+quedan con su valor por defecto. El predicado retorna el nombre de la regla
+que se cumplió ('campo:featured', 'etiqueta:premium', 'plan:gold'...) y se
+lleva la cuenta para ver qué señales está mandando InfoCasas.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+REGLAS_DESTACADO = {
+    # Campos que, si son verdaderos, marcan la propiedad como destacada
+    'campos': [
+        'featured', 'is_featured', 'highlight', 'highlighted', 'premium',
+        'promoted', 'is_promoted', 'super', 'super_destacado',
+    ],
+    # Etiquetas (texto o {'name': ...}) que contienen alguna de las palabras
+    'etiquetas': {
+        'campos': ['tags', 'labels'],
+        'palabras': ['destacad', 'premium', 'super', 'featured'],
+    },
+    # Plan del anunciante: {'name': ...} con 'palabras', o texto con 'palabras_texto'
+    'plan': {
+        'campos': ['plan', 'subscription'],
+        'palabras': ['premium', 'super', 'destacad', 'gold', 'platinum'],
+        'palabras_texto': ['premium', 'super', 'destacad'],
+    },
+}
+
+# Cantidad de propiedades marcadas por cada regla (y cuántas no)
+ESTADISTICAS_DESTACADO: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def cargar_reglas(ruta: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retorna REGLAS_DESTACADO con lo que defina el JSON indicado (o el de
+    INMO_REGLAS_DESTACADO) encima.
+    """
+    reglas = json.loads(json.dumps(REGLAS_DESTACADO))
+    ruta = ruta or os.getenv('INMO_REGLAS_DESTACADO')
+    if not ruta:
+        return reglas
+
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            personalizadas = json.load(archivo)
+    except (OSError, ValueError) as e:
+        print(f"[DESTACADOS] No se pudo leer {ruta}: {e}, usando reglas por defecto")
+        return reglas
+
+    for clave, valor in personalizadas.items():
+        if isinstance(valor, dict) and isinstance(reglas.get(clave), dict):
+            reglas[clave].update(valor)
+        else:
+            reglas[clave] = valor
+    return reglas
+
+
+def _patron(palabras) -> Optional['re.Pattern']:
+    """Alternación sin distinguir mayúsculas (None si no hay palabras)."""
+    if not palabras:
+        return None
+    return re.compile('|'.join(re.escape(p) for p in palabras), re.IGNORECASE)
+
+
+def compilar_reglas(reglas: Dict[str, Any]) -> Callable[[Dict[str, Any]], Optional[str]]:
+    """
+    Compila la tabla de reglas en un predicado prop -> nombre de la regla
+    que se cumplió, o None si la propiedad no es destacada.
+
+    Orden de evaluación: campos, etiquetas, plan (gana la primera).
+    """
+    campos = tuple(reglas.get('campos') or ())
+    conjunto_campos = frozenset(campos)
+
+    etiquetas = reglas.get('etiquetas') or {}
+    campos_etiquetas = tuple(etiquetas.get('campos') or ())
+    patron_etiquetas = _patron(etiquetas.get('palabras'))
+
+    plan = reglas.get('plan') or {}
+    campos_plan = tuple(plan.get('campos') or ())
+    patron_plan = _patron(plan.get('palabras'))
+    patron_plan_texto = _patron(plan.get('palabras_texto'))
+
+    def detectar(prop: Dict[str, Any]) -> Optional[str]:
+        # Campos booleanos: solo se miran los que la propiedad trae
+        presentes = conjunto_campos.intersection(prop)
+        if presentes:
+            for campo in campos:
+                if campo in presentes and prop[campo]:
+                    return f'campo:{campo}'
+
+        if patron_etiquetas is not None:
+            # El primer campo de etiquetas no vacío (como 'tags' or 'labels')
+            for campo in campos_etiquetas:
+                tags = prop.get(campo)
+                if tags:
+                    break
+            else:
+                tags = None
+            if isinstance(tags, list):
+                for tag in tags:
+                    if isinstance(tag, dict):
+                        tag = tag.get('name')
+                    if isinstance(tag, str):
+                        encontrada = patron_etiquetas.search(tag)
+                        if encontrada:
+                            return f'etiqueta:{encontrada.group(0).lower()}'
+
+        for campo in campos_plan:
+            valor = prop.get(campo)
+            if not valor:
+                continue
+            if isinstance(valor, dict):
+                nombre, patron = valor.get('name'), patron_plan
+            else:
+                nombre, patron = valor, patron_plan_texto
+            if patron is not None and isinstance(nombre, str):
+                encontrada = patron.search(nombre)
+                if encontrada:
+                    return f'plan:{encontrada.group(0).lower()}'
+            break
+
+        return None
+
+    return detectar
+
+
+# =============================================================================
+# ESTADÍSTICAS
+# =============================================================================
+
+def contar_destacado(regla: Optional[str]):
+    """Registra qué regla marcó una propiedad (None = no destacada)."""
+    clave = regla or 'no_destacada'
+    with _lock:
+        ESTADISTICAS_DESTACADO[clave] = ESTADISTICAS_DESTACADO.get(clave, 0) + 1
+
+
+def estadisticas_destacado() -> Dict[str, int]:
+    """Retorna una copia de los contadores por regla."""
+    with _lock:
+        return dict(ESTADISTICAS_DESTACADO)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+ÍNDICE ESPACIAL DE PROPIEDADES - INMO
+=============================================================================
+Índice de grilla sobre las coordenadas del catálogo para responder consultas
+de mapa sin recorrer todas las propiedades:
+
+- Rectángulo (viewport del mapa): lat/lng mínimos y máximos.
+- Radio: "a menos de 2 km de este punto", ordenado por distancia.
+
+Las filas se ordenan por celda (clave = fila_grilla * ancho + columna), así
+cada franja horizontal del rectángulo es un rango contiguo que se ubica con
+np.searchsorted; solo se verifican con precisión las filas de esas celdas.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from almacen import AlmacenPropiedades
+from catalogo import CatalogoColumnar
+
+
+ESPACIAL_CONFIG = {
+    # Lado de cada celda de la grilla en grados (~1,1 km)
+    'celda_grados': float(os.getenv('INMO_MAPA_CELDA', '0.01')),
+    # Cada cuántos segundos se recarga el catálogo desde el almacén
+    'recarga': float(os.getenv('INMO_MAPA_RECARGA', '600')),
+    # Máximo de propiedades por respuesta de mapa
+    'max_resultados': int(os.getenv('INMO_MAPA_MAX', '500')),
+}
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = np.pi * RADIO_TIERRA_KM / 180
+
+
+def distancia_km(lat: float, lng: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Distancia haversine (km) desde un punto a cada par de coordenadas."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class IndiceEspacial:
+    """
+    Grilla regular sobre (latitud, longitud). Las consultas retornan ids de
+    fila del catálogo con el que se construyó.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, celda_grados: Optional[float] = None):
+        """
+        Args:
+            latitudes / longitudes: Coordenadas por fila (NaN = sin coordenadas)
+            celda_grados: Lado de la celda (por defecto ESPACIAL_CONFIG['celda_grados'])
+        """
+        self.celda = celda_grados or ESPACIAL_CONFIG['celda_grados']
+
+        validas = np.flatnonzero(
+            np.isfinite(latitudes) & np.isfinite(longitudes)
+            & (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+        )
+        lat, lng = latitudes[validas], longitudes[validas]
+        # Para rectángulos grandes conviene el barrido completo (ver en_rectangulo)
+        self._latitudes = latitudes
+        self._longitudes = longitudes
+
+        self.lat_origen = float(lat.min()) if len(validas) else 0.0
+        self.lng_origen = float(lng.min()) if len(validas) else 0.0
+        columnas = self._columna(lng)
+        filas_grilla = self._fila(lat)
+        self.ancho = int(columnas.max()) + 1 if len(validas) else 1
+        self.alto = int(filas_grilla.max()) + 1 if len(validas) else 0
+
+        claves = filas_grilla * self.ancho + columnas
+        orden = np.argsort(claves, kind='stable')
+        self._claves = claves[orden]
+        self._filas = validas[orden]
+        self._lat = lat[orden]
+        self._lng = lng[orden]
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def _columna(self, lng) -> np.ndarray:
+        return np.floor((np.asarray(lng) - self.lng_origen) / self.celda).astype(np.int64)
+
+    def _fila(self, lat) -> np.ndarray:
+        return np.floor((np.asarray(lat) - self.lat_origen) / self.celda).astype(np.int64)
+
+    # ==========================================================================
+    # CONSULTAS
+    # ==========================================================================
+
+    def _rangos(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Rangos (inicios, largos) del orden interno que cubren el rectángulo."""
+        vacio = np.empty(0, dtype=np.int64)
+        if not len(self) or lat_min > lat_max or lng_min > lng_max:
+            return vacio, vacio
+
+        col_desde = max(int(self._columna(lng_min)), 0)
+        col_hasta = min(int(self._columna(lng_max)), self.ancho - 1)
+        fila_desde = max(int(self._fila(lat_min)), 0)
+        fila_hasta = min(int(self._fila(lat_max)), self.alto - 1)
+        if col_desde > col_hasta or fila_desde > fila_hasta:
+            return vacio, vacio
+
+        # Un rango contiguo de claves por franja de la grilla
+        franjas = np.arange(fila_desde, fila_hasta + 1, dtype=np.int64) * self.ancho
+        inicios = np.searchsorted(self._claves, franjas + col_desde, side='left')
+        fines = np.searchsorted(self._claves, franjas + col_hasta, side='right')
+        return inicios, fines - inicios
+
+    def _posiciones_rectangulo(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                               rangos: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        """Posiciones (en el orden interno) de las filas dentro del rectángulo."""
+        inicios, largos = rangos or self._rangos(lat_min, lat_max, lng_min, lng_max)
+        total = int(largos.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        posiciones = np.arange(total) - np.repeat(np.cumsum(largos) - largos, largos) + np.repeat(inicios, largos)
+
+        # Las celdas del borde pueden tener puntos fuera del rectángulo
+        lat, lng = self._lat[posiciones], self._lng[posiciones]
+        dentro = (lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) & (lng <= lng_max)
+        return posiciones[dentro]
+
+    def en_rectangulo(self, lat_min: float, lat_max: float, lng_min: float, lng_max: float) -> np.ndarray:
+        """Ids de fila con coordenadas dentro del rectángulo (bordes incluidos)."""
+        rangos = self._rangos(lat_min, lat_max, lng_min, lng_max)
+        if int(rangos[1].sum()) * 8 > len(self):
+            # Zoom alejado: las celdas cubren buena parte del catálogo y cuatro
+            # comparaciones vectorizadas sobre todo es más barato que juntarlas
+            lat, lng = self._latitudes, self._longitudes
+            return np.flatnonzero((lat >= lat_min) & (lat <= lat_max) & (lng >= lng_min) & (lng <= lng_max))
+        return np.sort(self._filas[self._posiciones_rectangulo(lat_min, lat_max, lng_min, lng_max, rangos)])
+
+    def en_radio(self, lat: float, lng: float, radio_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Filas a menos de radio_km del punto, ordenadas por distancia.
+
+        Returns:
+            Tupla (ids de fila, distancias en km)
+        """
+        # Rectángulo que contiene al círculo (el grado de longitud se achica
+        # hacia los polos: se usa la latitud más alejada del ecuador)
+        delta_lat = radio_km / KM_POR_GRADO
+        lat_extrema = min(abs(lat) + delta_lat, 90.0)
+        delta_lng = radio_km / (KM_POR_GRADO * max(np.cos(np.radians(lat_extrema)), 1e-6))
+        posiciones = self._posiciones_rectangulo(lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng)
+
+        distancias = distancia_km(lat, lng, self._lat[posiciones], self._lng[posiciones])
+        cerca = distancias <= radio_km
+        posiciones, distancias = posiciones[cerca], distancias[cerca]
+        orden = np.argsort(distancias, kind='stable')
+        return self._filas[posiciones[orden]], distancias[orden]
+
+
+class MapaPropiedades:
+    """
+    Catálogo del almacén local más su índice espacial, recargados cada
+    ESPACIAL_CONFIG['recarga'] segundos. Thread-safe.
+    """
+
+    def __init__(self, ruta_almacen: Optional[str] = None):
+        self.ruta_almacen = ruta_almacen
+        self._lock = threading.Lock()
+        self._cargado_en = 0.0
+        self._datos: Optional[Tuple[CatalogoColumnar, IndiceEspacial]] = None
+
+    def obtener(self) -> Tuple[CatalogoColumnar, IndiceEspacial]:
+        """Retorna (catálogo, índice), recargando si están vencidos."""
+        if self._datos is not None and time.monotonic() - self._cargado_en < ESPACIAL_CONFIG['recarga']:
+            return self._datos
+        with self._lock:
+            if self._datos is None or time.monotonic() - self._cargado_en >= ESPACIAL_CONFIG['recarga']:
+                self._datos = self._cargar()
+                self._cargado_en = time.monotonic()
+        return self._datos
+
+    def _cargar(self) -> Tuple[CatalogoColumnar, IndiceEspacial]:
+        inicio = time.perf_counter()
+        almacen = AlmacenPropiedades(self.ruta_almacen)
+        try:
+            catalogo = CatalogoColumnar.desde_almacen(almacen)
+        finally:
+            almacen.cerrar()
+        indice = IndiceEspacial(catalogo.latitud, catalogo.longitud)
+        print(f"[MAPA] Catálogo cargado: {len(catalogo)} propiedades, {len(indice)} con coordenadas "
+              f"({time.perf_counter() - inicio:.1f} s)")
+        return catalogo, indice
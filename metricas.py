@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+MÉTRICAS EN FORMATO PROMETHEUS - INMO
+=============================================================================
+Histogramas y contadores con etiquetas, expuestos por GET /metrics en el
+formato de texto de Prometheus (sin depender de prometheus_client):
+
+- inmo_upstream_segundos{ruta}              petición a InfoCasas (proxy/directo)
+- inmo_upstream_respuestas_total{ruta,estado}  códigos HTTP, 'error', 'rechazada'
+- inmo_parseo_html_segundos{camino}         ubicar __NEXT_DATA__ (recorte/beautifulsoup)
+- inmo_decodificacion_json_segundos{modo}   JSON de la página (selectiva/completa)
+- inmo_extraccion_propiedad_segundos        una propiedad cruda -> Propiedad
+- inmo_llm_segundos / inmo_llm_respuestas_total{estado}   llamadas a OpenRouter
+- inmo_pedido_segundos{endpoint} / inmo_pedidos_total{endpoint,estado}
+
+Los contadores que ya llevan otros módulos (caches, cascada, sesiones) se
+leen al momento de exponer, con colectores registrados por el backend.
+
+Cada proceso tiene sus propias métricas: con varios workers de uvicorn cada
+scrape ve solo el worker que lo atendió.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+METRICAS_CONFIG = {
+    'activas': os.getenv('INMO_METRICAS', 'true').lower() == 'true',
+}
+
+# Límites (s) de los buckets según la escala de cada medición
+BUCKETS_RED = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+BUCKETS_CPU = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+BUCKETS_PROPIEDAD = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)
+
+Etiquetas = Tuple[str, ...]
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: str = '') -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador con etiquetas (thread-safe)."""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores: Dict[Etiquetas, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1, **etiquetas: str):
+        if not METRICAS_CONFIG['activas']:
+            return
+        clave = tuple(str(etiquetas[n]) for n in self.etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + valor
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            yield f'{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {_numero(valor)}'
+
+
+class Histograma:
+    """Histograma con etiquetas y buckets fijos (thread-safe)."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_RED):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [cuentas por bucket (sin acumular, + la de +Inf), suma]
+        self._series: Dict[Etiquetas, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float, **etiquetas: str):
+        if not METRICAS_CONFIG['activas']:
+            return
+        clave = tuple(str(etiquetas[n]) for n in self.etiquetas)
+        posicion = bisect_left(self.buckets, segundos)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][posicion] += 1
+            serie[1] += segundos
+
+    @contextmanager
+    def cronometrar(self, **etiquetas: str):
+        """Observa la duración del bloque (también si termina con excepción)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def lineas(self) -> Iterable[str]:
+        with self._lock:
+            series = sorted((clave, (list(cuentas), suma)) for clave, (cuentas, suma) in self._series.items())
+        for clave, (cuentas, suma) in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.buckets + (float('inf'),), cuentas):
+                acumulado += cuenta
+                le = f'le="{_numero(limite)}"'
+                yield f'{self.nombre}_bucket{_formatear_etiquetas(self.etiquetas, clave, le)} {acumulado}'
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            yield f'{self.nombre}_sum{etiquetas} {_numero(suma)}'
+            yield f'{self.nombre}_count{etiquetas} {acumulado}'
+
+
+# Un colector retorna [(nombre, tipo, ayuda, [(etiquetas, valor)])] al exponer
+Colector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+_metricas: List = []
+_colectores: List[Colector] = []
+
+
+def _registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+
+def registrar_colector(colector: Colector):
+    """Agrega una función que se consulta en cada exposición."""
+    _colectores.append(colector)
+
+
+def exponer() -> str:
+    """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)."""
+    salida = []
+    for metrica in _metricas:
+        salida.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        salida.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        salida.extend(metrica.lineas())
+    for colector in _colectores:
+        try:
+            familias = colector()
+        except Exception as e:
+            print(f"[METRICAS] Error en un colector: {e}")
+            continue
+        for nombre, tipo, ayuda, muestras in familias:
+            salida.append(f'# HELP {nombre} {ayuda}')
+            salida.append(f'# TYPE {nombre} {tipo}')
+            for etiquetas, valor in muestras:
+                salida.append(f'{nombre}{_formatear_etiquetas(list(etiquetas), list(etiquetas.values()))} {_numero(valor)}')
+    return '\n'.join(salida) + '\n'
+
+
+# =============================================================================
+# MÉTRICAS DEL SCRAPER, EL AGENTE Y EL BACKEND
+# =============================================================================
+
+UPSTREAM_SEGUNDOS = _registrar(Histograma(
+    'inmo_upstream_segundos', 'Latencia de las peticiones a InfoCasas por ruta', ('ruta',)))
+UPSTREAM_RESPUESTAS = _registrar(Contador(
+    'inmo_upstream_respuestas_total', 'Respuestas de InfoCasas por ruta y estado HTTP', ('ruta', 'estado')))
+PARSEO_HTML_SEGUNDOS = _registrar(Histograma(
+    'inmo_parseo_html_segundos', 'Tiempo para ubicar __NEXT_DATA__ en la página', ('camino',), BUCKETS_CPU))
+DECODIFICACION_SEGUNDOS = _registrar(Histograma(
+    'inmo_decodificacion_json_segundos', 'Tiempo de decodificación del JSON de la página', ('modo',), BUCKETS_CPU))
+EXTRACCION_SEGUNDOS = _registrar(Histograma(
+    'inmo_extraccion_propiedad_segundos', 'Tiempo de extracción de una propiedad', (), BUCKETS_PROPIEDAD))
+LLM_SEGUNDOS = _registrar(Histograma(
+    'inmo_llm_segundos', 'Latencia de las llamadas a OpenRouter'))
+LLM_RESPUESTAS = _registrar(Contador(
+    'inmo_llm_respuestas_total', 'Respuestas de OpenRouter por estado HTTP', ('estado',)))
+PEDIDO_SEGUNDOS = _registrar(Histograma(
+    'inmo_pedido_segundos', 'Duración de los pedidos al backend por endpoint', ('endpoint',)))
+PEDIDOS = _registrar(Contador(
+    'inmo_pedidos_total', 'Pedidos al backend por endpoint y estado HTTP', ('endpoint', 'estado')))
+
+
+def registrar_upstream(ruta: str, estado, segundos: Optional[float] = None):
+    """Una petición a InfoCasas: estado HTTP (o 'error'/'rechazada') y su latencia si hubo respuesta."""
+    UPSTREAM_RESPUESTAS.inc(ruta=ruta, estado=estado)
+    if segundos is not None:
+        UPSTREAM_SEGUNDOS.observar(segundos, ruta=ruta)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+MODELO COMPACTO DE PROPIEDAD - INMO
+=============================================================================
+Representación en memoria de una propiedad con __slots__ en lugar de los
+diccionarios anidados de _extract_property_data:
+
+- Un solo objeto plano por propiedad (sin los 9 diccionarios intermedios).
+- Cadenas repetidas (ciudad, barrio, departamento, tipo, moneda) internadas.
+- Descripción comprimida e imágenes en una tupla plana; se materializan
+  recién cuando se piden.
+
+to_dict() reconstruye exactamente la forma que devuelve hoy la API.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Descripciones más cortas que esto no se comprimen (no vale la pena)
+_MIN_COMPRIMIR = 256
+
+
+def _internar(valor: Any) -> Any:
+    """Interna las cadenas (una sola copia por valor en todo el proceso)."""
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+
+class Propiedad:
+    """
+    Propiedad de InfoCasas en formato compacto.
+
+    Los atributos son planos; 'descripcion' e 'imagenes' son propiedades
+    que se decodifican en cada acceso.
+    """
+
+    __slots__ = (
+        'id', 'titulo', 'tipo_propiedad',
+        'monto', 'moneda',
+        'ciudad', 'barrio', 'departamento', 'direccion', 'latitud', 'longitud',
+        'dormitorios', 'banos', 'm2_construidos', 'm2_terreno', 'antiguedad', 'garages',
+        'destacado', 'propietario', 'whatsapp', 'url_propiedad', 'fecha_publicacion',
+        '_descripcion', '_imagenes',
+    )
+
+    def __init__(self,
+                 id: Any = None,
+                 titulo: str = '',
+                 descripcion: str = '',
+                 tipo_propiedad: Optional[str] = 'Inmueble',
+                 monto: Any = None,
+                 moneda: Optional[str] = 'Gs.',
+                 ciudad: Optional[str] = None,
+                 barrio: Optional[str] = None,
+                 departamento: Optional[str] = None,
+                 direccion: Optional[str] = None,
+                 latitud: Any = None,
+                 longitud: Any = None,
+                 dormitorios: Any = None,
+                 banos: Any = None,
+                 m2_construidos: Any = None,
+                 m2_terreno: Any = None,
+                 antiguedad: Any = None,
+                 garages: Any = None,
+                 imagenes: Optional[List[Dict[str, str]]] = None,
+                 destacado: bool = False,
+                 propietario: Optional[str] = None,
+                 whatsapp: Optional[str] = None,
+                 url_propiedad: Optional[str] = None,
+                 fecha_publicacion: Optional[str] = None):
+        self.id = id
+        self.titulo = titulo
+        self.tipo_propiedad = _internar(tipo_propiedad)
+        self.monto = monto
+        self.moneda = _internar(moneda)
+        self.ciudad = _internar(ciudad)
+        self.barrio = _internar(barrio)
+        self.departamento = _internar(departamento)
+        self.direccion = direccion
+        self.latitud = latitud
+        self.longitud = longitud
+        self.dormitorios = dormitorios
+        self.banos = banos
+        self.m2_construidos = m2_construidos
+        self.m2_terreno = m2_terreno
+        self.antiguedad = antiguedad
+        self.garages = garages
+        self.destacado = destacado
+        self.propietario = _internar(propietario)
+        self.whatsapp = _internar(whatsapp)
+        self.url_propiedad = url_propiedad
+        self.fecha_publicacion = fecha_publicacion
+        self.descripcion = descripcion
+        self.imagenes = imagenes or []
+
+    # ==========================================================================
+    # CAMPOS DE MATERIALIZACIÓN DIFERIDA
+    # ==========================================================================
+
+    @property
+    def descripcion(self) -> str:
+        if isinstance(self._descripcion, bytes):
+            return zlib.decompress(self._descripcion).decode('utf-8')
+        return self._descripcion
+
+    @descripcion.setter
+    def descripcion(self, texto: str):
+        if len(texto) >= _MIN_COMPRIMIR:
+            self._descripcion = zlib.compress(texto.encode('utf-8'), 1)
+        else:
+            self._descripcion = texto
+
+    @property
+    def imagenes(self) -> List[Dict[str, str]]:
+        """Lista de imágenes {'url', 'thumbnail', 'alt'} (se arma en cada acceso)."""
+        datos = self._imagenes
+        return [
+            {'url': datos[i], 'thumbnail': datos[i + 1], 'alt': datos[i + 2]}
+            for i in range(0, len(datos), 3)
+        ]
+
+    @imagenes.setter
+    def imagenes(self, imagenes: List[Dict[str, str]]):
+        plana: List[str] = []
+        for img in imagenes:
+            plana.append(img['url'])
+            plana.append(img['thumbnail'])
+            plana.append(_internar(img['alt']))
+        self._imagenes: Tuple[str, ...] = tuple(plana)
+
+    @property
+    def cantidad_imagenes(self) -> int:
+        return len(self._imagenes) // 3
+
+    @property
+    def coordenadas(self) -> Optional[Dict[str, Any]]:
+        if self.latitud and self.longitud:
+            return {'latitud': self.latitud, 'longitud': self.longitud}
+        return None
+
+    # ==========================================================================
+    # CONVERSIÓN
+    # ==========================================================================
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna la propiedad con la forma de _extract_property_data."""
+        return {
+            'identificacion': {
+                'id': self.id
+            },
+            'informacion_basica': {
+                'titulo': self.titulo,
+                'descripcion': self.descripcion,
+                'tipo_propiedad': self.tipo_propiedad,
+            },
+            'precio': {
+                'monto': self.monto,
+                'moneda': self.moneda,
+            },
+            'ubicacion': {
+                'ciudad': self.ciudad,
+                'barrio': self.barrio,
+                'departamento': self.departamento,
+                'direccion': self.direccion,
+                'coordenadas': self.coordenadas,
+            },
+            'caracteristicas': {
+                'dormitorios': self.dormitorios,
+                'banos': self.banos,
+                'metros_cuadrados': {
+                    'm2_construidos': self.m2_construidos,
+                    'm2_terreno': self.m2_terreno,
+                },
+                'antiguedad': self.antiguedad,
+                'garages': self.garages,
+            },
+            'imagenes': self.imagenes,
+            'destacado': self.destacado,
+            'propietario': {
+                'nombre': self.propietario,
+                'whatsapp': self.whatsapp,
+            },
+            'enlaces': {
+                'url_propiedad': self.url_propiedad,
+            },
+            'metadata': {
+                'fecha_publicacion': self.fecha_publicacion,
+                'destacada': self.destacado,
+            }
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> 'Propiedad':
+        """Construye una Propiedad desde la forma de to_dict (p. ej. del almacén)."""
+        basica = datos['informacion_basica']
+        ubicacion = datos['ubicacion']
+        coordenadas = ubicacion.get('coordenadas') or {}
+        caracteristicas = datos['caracteristicas']
+        metros = caracteristicas.get('metros_cuadrados') or {}
+        propietario = datos.get('propietario') or {}
+        return cls(
+            id=datos['identificacion']['id'],
+            titulo=basica['titulo'],
+            descripcion=basica['descripcion'],
+            tipo_propiedad=basica['tipo_propiedad'],
+            monto=datos['precio']['monto'],
+            moneda=datos['precio']['moneda'],
+            ciudad=ubicacion['ciudad'],
+            barrio=ubicacion['barrio'],
+            departamento=ubicacion['departamento'],
+            direccion=ubicacion.get('direccion'),
+            latitud=coordenadas.get('latitud'),
+            longitud=coordenadas.get('longitud'),
+            dormitorios=caracteristicas['dormitorios'],
+            banos=caracteristicas['banos'],
+            m2_construidos=metros.get('m2_construidos'),
+            m2_terreno=metros.get('m2_terreno'),
+            antiguedad=caracteristicas.get('antiguedad'),
+            garages=caracteristicas.get('garages'),
+            imagenes=datos.get('imagenes'),
+            destacado=datos.get('destacado', False),
+            propietario=propietario.get('nombre'),
+            whatsapp=propietario.get('whatsapp'),
+            url_propiedad=(datos.get('enlaces') or {}).get('url_propiedad'),
+            fecha_publicacion=(datos.get('metadata') or {}).get('fecha_publicacion'),
+        )
+
+    def tamano_aproximado(self) -> int:
+        """Bytes aproximados que ocupa la propiedad (objeto + cadenas propias)."""
+        tamano = sys.getsizeof(self) + sys.getsizeof(self._imagenes) + sys.getsizeof(self._descripcion)
+        for nombre in ('titulo', 'direccion', 'url_propiedad', 'fecha_publicacion'):
+            tamano += sys.getsizeof(getattr(self, nombre))
+        # URLs de imágenes (url y thumbnail; el alt está internado)
+        for i in range(0, len(self._imagenes), 3):
+            tamano += sys.getsizeof(self._imagenes[i])
+            if self._imagenes[i + 1] is not self._imagenes[i]:
+                tamano += sys.getsizeof(self._imagenes[i + 1])
+        return tamano
+
+    def __repr__(self) -> str:
+        return f"Propiedad(id={self.id!r}, titulo={self.titulo!r}, monto={self.monto!r} {self.moneda})"
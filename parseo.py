@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+PARSEO DE PÁGINAS DE INFOCASAS - INMO
+=============================================================================
+Extracción del bloque <script id="__NEXT_DATA__"> directamente desde los
+bytes de la respuesta, sin construir el árbol HTML completo. Es el camino
+rápido; InfocasasScraper vuelve a BeautifulSoup solo si este falla.
+
+También incluye la decodificación selectiva: en lugar de json.loads sobre
+todo el payload (i18n, layout, filtros...), se recorre el texto saltando los
+subárboles que no se usan y solo se materializan las propiedades, una por vez.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import json
+import re
+import sys
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+
+_MARCADORES_ID = (b'id="__NEXT_DATA__"', b"id='__NEXT_DATA__'", b'id=__NEXT_DATA__')
+
+# Contadores de uso del camino rápido vs. respaldo con BeautifulSoup
+ESTADISTICAS_PARSEO = {
+    'rapido': 0,
+    'selectivo': 0,
+    'respaldo': 0,
+}
+_lock = threading.Lock()
+
+
+def extraer_next_data(contenido: Union[bytes, str]) -> Optional[bytes]:
+    """
+    Retorna el contenido JSON crudo del script __NEXT_DATA__, o None si no
+    se pudo ubicar con seguridad.
+
+    Next.js escapa '<' dentro del JSON (\\u003c), así que el primer
+    '</script>' después de la etiqueta de apertura es siempre su cierre.
+
+    Args:
+        contenido: Cuerpo de la respuesta (bytes, o str que se codifica en UTF-8)
+    """
+    if isinstance(contenido, str):
+        contenido = contenido.encode('utf-8')
+
+    for marcador in _MARCADORES_ID:
+        posicion = contenido.find(marcador)
+        if posicion >= 0:
+            break
+    else:
+        return None
+
+    # La etiqueta de apertura debe ser un <script ...> de tipo JSON
+    inicio_tag = contenido.rfind(b'<', 0, posicion)
+    fin_tag = contenido.find(b'>', posicion)
+    if inicio_tag < 0 or fin_tag < 0:
+        return None
+    etiqueta = contenido[inicio_tag:fin_tag]
+    if not etiqueta[:7].lower() == b'<script' or b'application/json' not in etiqueta:
+        return None
+
+    cierre = contenido.find(b'</script>', fin_tag)
+    if cierre < 0:
+        return None
+
+    return contenido[fin_tag + 1:cierre].strip()
+
+
+# =============================================================================
+# DECODIFICACIÓN SELECTIVA
+# =============================================================================
+
+# Subárboles de __NEXT_DATA__ que usa el scraper (hoja = nombre del bloque)
+_RUTA_PROPIEDADES = {
+    'props': {
+        'pageProps': {
+            'fetchResult': {
+                'property': 'propiedad',
+                'searchFast': {'data': 'busqueda_rapida'},
+            },
+            'properties': 'propiedades',
+        },
+    },
+}
+
+# Avanza hasta el próximo corchete/llave fuera de cadenas. Desde Python 3.11
+# los cuantificadores posesivos evitan el backtracking y lo hacen ~2x más rápido.
+if sys.version_info >= (3, 11):
+    _HASTA_ESTRUCTURA = re.compile(r'[^"\[\]{}]*+(?:"[^"\\]*+(?:\\.[^"\\]*+)*+"[^"\[\]{}]*+)*+([\[\]{}])')
+else:
+    _HASTA_ESTRUCTURA = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+_CADENA = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_ESCALAR = re.compile(r'[^,\]}\s]+')
+_ESPACIOS = re.compile(r'\s*')
+_DECODIFICADOR = json.JSONDecoder()
+
+
+def _saltar_espacios(texto: str, i: int) -> int:
+    return _ESPACIOS.match(texto, i).end()
+
+
+def _fin_valor(texto: str, i: int) -> int:
+    """Retorna la posición siguiente al valor JSON que empieza en i, sin decodificarlo."""
+    c = texto[i]
+    if c == '"':
+        m = _CADENA.match(texto, i)
+    elif c not in '[{':
+        m = _ESCALAR.match(texto, i)
+    else:
+        profundidad = 0
+        buscar = _HASTA_ESTRUCTURA.match
+        while True:
+            m = buscar(texto, i)
+            if m is None:
+                raise ValueError('JSON truncado')
+            i = m.end()
+            if m.group(1) in '[{':
+                profundidad += 1
+            else:
+                profundidad -= 1
+                if profundidad == 0:
+                    return i
+    if m is None:
+        raise ValueError(f'Valor JSON inválido en posición {i}')
+    return m.end()
+
+
+def _ubicar(texto: str, i: int, ruta: Dict[str, Any], destino: Dict[str, Tuple[int, int]]) -> int:
+    """
+    Recorre el objeto que empieza en i siguiendo 'ruta'. Registra en 'destino'
+    la posición (inicio, fin) de cada hoja y retorna el fin del objeto.
+    """
+    i = _saltar_espacios(texto, i + 1)
+    if texto[i] == '}':
+        return i + 1
+
+    while True:
+        m = _CADENA.match(texto, i)
+        if m is None:
+            raise ValueError(f'Se esperaba una clave en posición {i}')
+        crudo = m.group()
+        clave = json.loads(crudo) if '\\' in crudo else crudo[1:-1]
+
+        i = _saltar_espacios(texto, m.end())
+        if texto[i] != ':':
+            raise ValueError(f'Se esperaba ":" en posición {i}')
+        i = _saltar_espacios(texto, i + 1)
+
+        subruta = ruta.get(clave)
+        if isinstance(subruta, dict) and texto[i] == '{':
+            fin = _ubicar(texto, i, subruta, destino)
+        else:
+            fin = _fin_valor(texto, i)
+            if isinstance(subruta, str):
+                # Ante claves repetidas gana la última, igual que json.loads
+                destino[subruta] = (i, fin)
+
+        i = _saltar_espacios(texto, fin)
+        if texto[i] == ',':
+            i = _saltar_espacios(texto, i + 1)
+        elif texto[i] == '}':
+            return i + 1
+        else:
+            raise ValueError(f'Se esperaba "," o "}}" en posición {i}')
+
+
+def _iterar_arreglo(texto: str, inicio: int) -> Iterator[Any]:
+    """Decodifica uno por uno los elementos del arreglo que empieza en inicio."""
+    if texto[inicio] != '[':
+        # No es un arreglo: mismo comportamiento que iterar el valor completo
+        valor, _ = _DECODIFICADOR.raw_decode(texto, inicio)
+        yield from valor
+        return
+
+    i = _saltar_espacios(texto, inicio + 1)
+    if texto[i] == ']':
+        return
+    while True:
+        elemento, i = _DECODIFICADOR.raw_decode(texto, i)
+        yield elemento
+        i = _saltar_espacios(texto, i)
+        if texto[i] == ',':
+            i = _saltar_espacios(texto, i + 1)
+        elif texto[i] == ']':
+            return
+        else:
+            raise ValueError(f'Se esperaba "," o "]" en posición {i}')
+
+
+def iterar_propiedades_crudas(payload: Union[bytes, str]) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre el JSON de __NEXT_DATA__ y entrega las propiedades crudas una por
+    una, en el mismo orden que el parseo completo:
+    fetchResult.property (+ duplicated), properties, fetchResult.searchFast.data.
+
+    Lanza ValueError si el payload no es JSON válido.
+    """
+    texto = payload.decode('utf-8') if isinstance(payload, bytes) else payload
+    i = _saltar_espacios(texto, 0)
+    if not texto.startswith('{', i):
+        raise ValueError('__NEXT_DATA__ no es un objeto JSON')
+
+    bloques = {}
+    _ubicar(texto, i, _RUTA_PROPIEDADES, bloques)
+
+    if 'propiedad' in bloques:
+        prop, _ = _DECODIFICADOR.raw_decode(texto, bloques['propiedad'][0])
+        yield prop
+        if 'duplicated' in prop and prop['duplicated']:
+            yield from prop['duplicated']
+
+    for nombre in ('propiedades', 'busqueda_rapida'):
+        if nombre in bloques:
+            yield from _iterar_arreglo(texto, bloques[nombre][0])
+
+
+# =============================================================================
+# ESTADÍSTICAS
+# =============================================================================
+
+def contar_parseo(camino: str):
+    """Registra si una página se resolvió por el camino rápido o el respaldo."""
+    with _lock:
+        ESTADISTICAS_PARSEO[camino] += 1
+
+
+def estadisticas_parseo() -> Dict[str, int]:
+    """Retorna una copia de los contadores de parseo."""
+    with _lock:
+        return dict(ESTADISTICAS_PARSEO)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+REGISTRO DE BÚSQUEDAS, PRECALENTAMIENTO Y PRECARGA - INMO
+=============================================================================
+En el plan gratuito de Render el servicio se duerme, y después de cada
+arranque en frío los primeros usuarios esperan las mismas búsquedas
+populares en vivo. Este módulo:
+
+- Lleva un registro compacto de las búsquedas ejecutadas, agrupadas por
+  operación / tipo / ubicación / rango de precio (con los filtros exactos
+  de la última vez), que se guarda en disco (datos/busquedas.json).
+- Al arrancar, las más populares se vuelven a ejecutar para calentar los
+  caches (precalentar() de los scrapers).
+- Mientras el usuario lee la página N, precarga en segundo plano la página
+  N+1 y la misma búsqueda con la otra operación (venta <-> alquiler).
+
+Las precargas tienen un presupuesto por minuto (balde de tokens), un máximo
+simultáneo y no se repiten dentro del TTL del cache.
+
+El plan gratuito de Render no tiene disco persistente: el registro se pierde
+en cada arranque en frío. Si no hay registro guardado se parte de una
+semilla (BUSQUEDAS_SEMILLA, o un registro versionado en
+INMO_REGISTRO_SEMILLA), y para conservar el registro real hay que apuntar
+INMO_REGISTRO_BUSQUEDAS a un disco que sobreviva los reinicios.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from cache import CacheTTL
+from trafico import BaldeTokens
+
+
+PRECARGA_CONFIG = {
+    # Precargar página siguiente y búsquedas vecinas en segundo plano
+    'activa': os.getenv('INMO_PRECARGA', 'false').lower() == 'true',
+    # Precargas por minuto como máximo y simultáneas
+    'presupuesto': float(os.getenv('INMO_PRECARGA_PRESUPUESTO', '30')),
+    'max_simultaneas': int(os.getenv('INMO_PRECARGA_SIMULTANEAS', '2')),
+    # No repetir la precarga de una misma búsqueda antes de N segundos
+    'ttl': float(os.getenv('INMO_PRECARGA_TTL', '300')),
+    # Búsquedas populares que se ejecutan al arrancar el backend (0 = ninguna)
+    'al_iniciar': int(os.getenv('INMO_PRECARGA_INICIO', '20')),
+    # Registro de búsquedas
+    'registro': os.getenv(
+        'INMO_REGISTRO_BUSQUEDAS',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos', 'busquedas.json')
+    ),
+    # Registro (mismo formato) del que se parte si no hay uno guardado
+    'semilla': os.getenv('INMO_REGISTRO_SEMILLA', ''),
+    'max_registro': int(os.getenv('INMO_REGISTRO_MAX', '2000')),
+    # Cada cuántas búsquedas nuevas se escribe el registro a disco
+    'guardar_cada': int(os.getenv('INMO_REGISTRO_GUARDAR_CADA', '50')),
+}
+
+# Búsquedas de partida si no hay registro guardado (operación, tipo,
+# ubicación, precio mínimo, precio máximo, dormitorios, baños)
+BUSQUEDAS_SEMILLA = [
+    ('venta', 'casa', 'asuncion', None, None, None, None),
+    ('alquiler', 'departamento', 'asuncion', None, None, None, None),
+    ('venta', 'departamento', 'asuncion', None, None, None, None),
+    ('alquiler', 'casa', 'asuncion', None, None, None, None),
+    ('venta', 'casa', 'luque', None, None, None, None),
+    ('venta', 'casa', 'san-lorenzo', None, None, None, None),
+    ('venta', 'casa', 'lambare', None, None, None, None),
+    ('venta', 'casa', 'fernando-de-la-mora', None, None, None, None),
+    ('venta', 'terreno', 'san-bernardino', None, None, None, None),
+    ('alquiler', 'departamento', 'villa-morra', None, None, None, None),
+]
+
+# Límites superiores (en la moneda de la búsqueda) de los rangos de precio
+_RANGOS_PRECIO = (50_000, 100_000, 200_000, 500_000, 1_000_000)
+
+# Índices dentro de la clave de búsqueda del scraper (ver _clave_busqueda)
+_OPERACION, _PAGINA = 0, 7
+_OTRA_OPERACION = {'venta': 'alquiler', 'alquiler': 'venta'}
+
+
+def rango_precio(precio_maximo: Optional[int]) -> str:
+    """Rango de precio de una búsqueda ('sin_tope', 'hasta_100000', 'mas_de_1000000')."""
+    if not precio_maximo:
+        return 'sin_tope'
+    for limite in _RANGOS_PRECIO:
+        if precio_maximo <= limite:
+            return f'hasta_{limite}'
+    return f'mas_de_{_RANGOS_PRECIO[-1]}'
+
+
+class RegistroBusquedas:
+    """
+    Búsquedas ejecutadas agrupadas por operación/tipo/ubicación/rango de
+    precio: cantidad, última vez y filtros exactos de la última. Thread-safe.
+    """
+
+    def __init__(self, ruta: Optional[str] = None, max_entradas: Optional[int] = None):
+        self.ruta = ruta or PRECARGA_CONFIG['registro']
+        self.max_entradas = max_entradas or PRECARGA_CONFIG['max_registro']
+        self._entradas: Dict[str, Dict[str, Any]] = {}
+        self._sin_guardar = 0
+        self._lock = threading.Lock()
+        # 'archivo', 'semilla' o '' (vacío)
+        self.origen = ''
+        self.cargar()
+
+    @staticmethod
+    def _grupo(clave: tuple) -> str:
+        operacion, tipo, ubicacion, _, precio_maximo = clave[:5]
+        return f'{operacion}/{tipo}/{ubicacion}/{rango_precio(precio_maximo)}'
+
+    def registrar(self, clave: tuple):
+        """Anota una búsqueda (clave de _clave_busqueda); las páginas siguientes no cuentan."""
+        if clave[_PAGINA] != 1:
+            return
+        grupo = self._grupo(clave)
+        guardar = False
+        with self._lock:
+            entrada = self._entradas.get(grupo)
+            if entrada is None:
+                entrada = self._entradas[grupo] = {'cantidad': 0}
+            entrada['cantidad'] += 1
+            entrada['ultima'] = time.time()
+            entrada['clave'] = list(clave[:_PAGINA]) + [1]
+            if len(self._entradas) > self.max_entradas:
+                self._recortar()
+            self._sin_guardar += 1
+            if self._sin_guardar >= PRECARGA_CONFIG['guardar_cada']:
+                guardar = True
+        if guardar:
+            self.guardar()
+
+    def _recortar(self):
+        """Descarta el 10% menos usado (llamar con el lock)."""
+        orden = sorted(self._entradas, key=lambda g: (self._entradas[g]['cantidad'], self._entradas[g]['ultima']))
+        for grupo in orden[:max(len(orden) // 10, 1)]:
+            del self._entradas[grupo]
+
+    def populares(self, cantidad: int) -> List[tuple]:
+        """Claves de búsqueda de los grupos más usados (los más recientes primero si empatan)."""
+        with self._lock:
+            orden = sorted(self._entradas.values(), key=lambda e: (e['cantidad'], e['ultima']), reverse=True)
+            return [tuple(e['clave']) for e in orden[:cantidad]]
+
+    def cargar(self):
+        """Lee el registro guardado; si no existe, parte de la semilla."""
+        datos = self._leer(self.ruta)
+        if datos is not None:
+            self._usar(datos)
+            self.origen = 'archivo' if self._entradas else ''
+            if self._entradas:
+                return
+        self.sembrar()
+
+    def sembrar(self):
+        """Carga la semilla (INMO_REGISTRO_SEMILLA o BUSQUEDAS_SEMILLA) con cantidad 0."""
+        if PRECARGA_CONFIG['semilla']:
+            datos = self._leer(PRECARGA_CONFIG['semilla']) or {}
+        else:
+            datos = {}
+            for busqueda in BUSQUEDAS_SEMILLA:
+                clave = tuple(busqueda) + (1,)
+                datos[self._grupo(clave)] = {'cantidad': 0, 'ultima': 0, 'clave': list(clave)}
+        self._usar(datos)
+        self.origen = 'semilla' if self._entradas else ''
+
+    @staticmethod
+    def _leer(ruta: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[PRECARGA] No se pudo leer el registro {ruta}: {e}")
+            return None
+
+    def _usar(self, datos: Dict[str, Any]):
+        with self._lock:
+            self._entradas = {
+                grupo: entrada for grupo, entrada in datos.items()
+                if isinstance(entrada, dict) and len(entrada.get('clave') or ()) == _PAGINA + 1
+            }
+
+    def guardar(self):
+        """Escribe el registro a disco (archivo temporal + rename)."""
+        with self._lock:
+            datos = json.dumps(self._entradas, ensure_ascii=False)
+            self._sin_guardar = 0
+        try:
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            temporal = f'{self.ruta}.tmp'
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                archivo.write(datos)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            print(f"[PRECARGA] No se pudo guardar el registro {self.ruta}: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entradas)
+
+
+class Precarga:
+    """Presupuesto, deduplicación y contadores de las precargas."""
+
+    def __init__(self):
+        presupuesto = PRECARGA_CONFIG['presupuesto']
+        self._balde = BaldeTokens(presupuesto / 60, max(presupuesto / 6, 1))
+        self._recientes = CacheTTL(ttl=PRECARGA_CONFIG['ttl'], max_entradas=4096)
+        self._en_curso = 0
+        self._lock = threading.Lock()
+        self._estadisticas = {
+            'lanzadas': 0,
+            'exitosas': 0,
+            'sin_presupuesto': 0,
+            'repetidas': 0,
+            'precalentadas': 0,
+        }
+
+    @staticmethod
+    def vecinas(clave: tuple) -> List[tuple]:
+        """Búsquedas probables después de clave: página siguiente y la otra operación."""
+        siguientes = [clave[:_PAGINA] + (clave[_PAGINA] + 1,)]
+        otra = _OTRA_OPERACION.get(clave[_OPERACION])
+        if otra is not None:
+            siguientes.append((otra,) + clave[_OPERACION + 1:_PAGINA] + (1,))
+        return siguientes
+
+    def reservar(self, clave: tuple) -> bool:
+        """True si la precarga de clave entra en el presupuesto (y queda anotada)."""
+        if self._recientes.obtener(clave) is not None:
+            self._contar('repetidas')
+            return False
+        with self._lock:
+            if self._en_curso >= PRECARGA_CONFIG['max_simultaneas']:
+                self._estadisticas['sin_presupuesto'] += 1
+                return False
+            if self._balde.reservar() > 0:
+                self._balde.devolver()
+                self._estadisticas['sin_presupuesto'] += 1
+                return False
+            self._en_curso += 1
+            self._estadisticas['lanzadas'] += 1
+        self._recientes.guardar(clave, True, tamano=1)
+        return True
+
+    def iniciar_precalentamiento(self):
+        """Anota una búsqueda del precalentamiento (fuera del presupuesto)."""
+        with self._lock:
+            self._en_curso += 1
+            self._estadisticas['precalentadas'] += 1
+
+    def terminar(self, exito: bool):
+        with self._lock:
+            self._en_curso -= 1
+            if exito:
+                self._estadisticas['exitosas'] += 1
+
+    def _contar(self, campo: str):
+        with self._lock:
+            self._estadisticas[campo] += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+            estadisticas['en_curso'] = self._en_curso
+        estadisticas['activa'] = PRECARGA_CONFIG['activa']
+        estadisticas['presupuesto_por_minuto'] = PRECARGA_CONFIG['presupuesto']
+        return estadisticas
+
+
+_registro: Optional[RegistroBusquedas] = None
+_precarga: Optional[Precarga] = None
+_lock = threading.Lock()
+
+
+def obtener_registro() -> RegistroBusquedas:
+    """Registro de búsquedas compartido del proceso (se carga de disco una vez)."""
+    global _registro
+    if _registro is None:
+        with _lock:
+            if _registro is None:
+                _registro = RegistroBusquedas()
+    return _registro
+
+
+def obtener_precarga() -> Precarga:
+    """Control de precargas compartido del proceso."""
+    global _precarga
+    if _precarga is None:
+        with _lock:
+            if _precarga is None:
+                _precarga = Precarga()
+    return _precarga
+
+
+def estadisticas_precarga() -> Dict[str, Any]:
+    estadisticas = obtener_precarga().estadisticas()
+    registro = obtener_registro()
+    estadisticas['registro'] = len(registro)
+    estadisticas['registro_origen'] = registro.origen
+    return estadisticas
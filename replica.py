@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+GRABACIÓN Y REPRODUCCIÓN DE INFOCASAS Y OPENROUTER - INMO
+=============================================================================
+Para medir el backend sin golpear infocasas.com.py ni pagar OpenRouter:
+
+- INMO_REPLICA=grabar: el scraper guarda cada página 200 que descarga
+  (infocasas/<hash>.html, el mismo formato que usan los benchmarks con
+  --paginas) y el agente cada respuesta de chat completions
+  (openrouter/<hash>.json) en INMO_REPLICA_DIR.
+- INMO_REPLICA=reproducir: las peticiones a InfoCasas, ProxyScrape y
+  OpenRouter se mandan al servidor suplente (INMO_REPLICA_URL), que
+  responde con lo grabado, con latencias y errores configurables (ver
+  benchmarks/servidor_replica.py).
+
+Las URLs no cambian (enlaces de las propiedades, claves de los caches,
+límites por host de trafico.py): solo se redirige la petición HTTP.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+
+REPLICA_CONFIG = {
+    # '' (desactivada), 'grabar' o 'reproducir'
+    'modo': os.getenv('INMO_REPLICA', '').lower(),
+    'directorio': os.getenv(
+        'INMO_REPLICA_DIR',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos', 'replica')
+    ),
+    # Servidor suplente usado en modo reproducir
+    'url': os.getenv('INMO_REPLICA_URL', 'http://127.0.0.1:8765').rstrip('/'),
+}
+
+# Host real -> prefijo de ruta en el servidor suplente
+UPSTREAMS = {
+    'www.infocasas.com.py': '/infocasas',
+    'api.proxyscrape.com': '/proxy',
+    'openrouter.ai': '/openrouter',
+}
+
+_lock = threading.Lock()
+
+
+def grabando() -> bool:
+    """True con INMO_REPLICA=grabar."""
+    return REPLICA_CONFIG['modo'] == 'grabar'
+
+
+def redirigir(url: str) -> str:
+    """
+    En modo reproducir, la URL equivalente en el servidor suplente (misma
+    ruta y query bajo el prefijo del upstream); si no, la misma URL.
+    """
+    if REPLICA_CONFIG['modo'] != 'reproducir':
+        return url
+    partes = urlsplit(url)
+    prefijo = UPSTREAMS.get(partes.netloc)
+    if prefijo is None:
+        return url
+    destino = f"{REPLICA_CONFIG['url']}{prefijo}{partes.path}"
+    return f"{destino}?{partes.query}" if partes.query else destino
+
+
+def clave_pagina(url: str) -> str:
+    """Nombre (sin extensión) de la grabación de una URL de InfoCasas."""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+
+
+def clave_completado(data: Dict[str, Any]) -> str:
+    """Nombre (sin extensión) de la grabación de una llamada a chat completions."""
+    peticion = json.dumps(
+        {'model': data.get('model'), 'messages': data.get('messages')},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha1(peticion.encode('utf-8')).hexdigest()[:20]
+
+
+def _escribir(ruta: str, contenido: bytes):
+    """Escritura atómica (archivo temporal + rename)."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f'{ruta}.{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def grabar_pagina(url: str, response) -> Optional[str]:
+    """
+    Guarda una página 200 de InfoCasas (requests o httpx) y la anota en
+    infocasas/indice.jsonl. Retorna la ruta del archivo, o None.
+    """
+    if response is None or response.status_code != 200:
+        return None
+    directorio = os.path.join(REPLICA_CONFIG['directorio'], 'infocasas')
+    ruta = os.path.join(directorio, f'{clave_pagina(url)}.html')
+    try:
+        _escribir(ruta, response.content)
+        linea = json.dumps({'url': url, 'archivo': os.path.basename(ruta), 'fecha': time.time()})
+        with _lock, open(os.path.join(directorio, 'indice.jsonl'), 'a', encoding='utf-8') as indice:
+            indice.write(linea + '\n')
+    except OSError as e:
+        print(f"[REPLICA] No se pudo grabar {url}: {e}")
+        return None
+    return ruta
+
+
+def grabar_completado(data: Dict[str, Any], response) -> Optional[str]:
+    """Guarda la petición y la respuesta 200 de una llamada a OpenRouter."""
+    if response is None or response.status_code != 200:
+        return None
+    ruta = os.path.join(REPLICA_CONFIG['directorio'], 'openrouter', f'{clave_completado(data)}.json')
+    try:
+        grabacion = {'peticion': data, 'respuesta': response.json(), 'fecha': time.time()}
+        _escribir(ruta, json.dumps(grabacion, ensure_ascii=False).encode('utf-8'))
+    except (OSError, ValueError) as e:
+        print(f"[REPLICA] No se pudo grabar la respuesta de OpenRouter: {e}")
+        return None
+    return ruta
@@ -17,10 +17,29 @@ import requests
 from bs4 import BeautifulSoup
 import json
 from datetime import datetime
-from typing import Dict, List, Optional, Any
-import re
+from typing import Dict, List, Iterator, Optional, Any, Union
 import random
 import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from almacen import ALMACEN_CONFIG, AlmacenPropiedades, contar_busqueda
+from cache import CacheSWR, CacheTTL
+from cobertura import COBERTURA_CONFIG, contar_cobertura, registrar_latencia, retraso_cobertura
+from destacados import cargar_reglas, compilar_reglas, contar_destacado
+from metricas import (DECODIFICACION_SEGUNDOS, EXTRACCION_SEGUNDOS, PARSEO_HTML_SEGUNDOS,
+                      registrar_upstream)
+from modelo import Propiedad
+from parseo import extraer_next_data, iterar_propiedades_crudas, contar_parseo
+from precarga import PRECARGA_CONFIG, obtener_precarga, obtener_registro
+from replica import grabando, grabar_pagina, redirigir
+from trafico import TraficoRechazado, controlar, host_de, interruptor, respuesta_sana
+from transporte import obtener_sesion
+from ubicaciones import Coincidencia, DetectorUbicaciones
+from vuelo_unico import VueloUnico
 
 
 class InfocasasScraper:
@@ -29,6 +48,7 @@ class InfocasasScraper:
     
     Características:
     - Soporte para proxies residenciales rotativos (ProxyScrape)
+    - Pool de conexiones keep-alive compartido por todo el proceso
     - Extracción de imágenes de propiedades
     - Extracción de coordenadas para mapas
     - Detección automática de propiedades destacadas
@@ -195,6 +215,9 @@ class InfocasasScraper:
         ]
     }
     
+    # Índice de los nombres de CONFIG para _detectar_ubicacion (se arma una vez)
+    _detector_ubicaciones = DetectorUbicaciones(CONFIG)
+    
     # Mapeo de tipos de propiedad a slugs de URL
     TIPOS_PROPIEDAD_URL = {
         'apartamento': 'departamentos',
@@ -215,6 +238,12 @@ class InfocasasScraper:
         'casas-y-departamentos': 'casas-y-departamentos',
     }
     
+    # Categorías agregadas y los slugs específicos que abarcan (None = todos)
+    TIPOS_AGREGADOS = {
+        'inmuebles': None,
+        'casas-y-departamentos': ('casas', 'departamentos'),
+    }
+    
     # ==========================================================================
     # CONFIGURACIÓN DE PROXYSCRAPE
     # ==========================================================================
@@ -225,9 +254,119 @@ class InfocasasScraper:
         'enabled': bool(os.getenv('PROXYSCRAPE_API_KEY')),
     }
     
-    def __init__(self):
-        """Inicializa el scraper con la configuración base."""
+    # ==========================================================================
+    # CONFIGURACIÓN DE LA CASCADA DE CATEGORÍAS
+    # ==========================================================================
+    
+    CASCADA_CONFIG = {
+        # 'secuencial': un nivel por vez (menos tráfico hacia InfoCasas)
+        # 'especulativo': todos los niveles en paralelo desde el inicio
+        # 'escalonado': el siguiente nivel arranca si el actual tarda más de 'retraso'
+        'modo': os.getenv('INMO_MODO_CASCADA', 'secuencial'),
+        'retraso': float(os.getenv('INMO_CASCADA_RETRASO', '0.5')),
+        'max_hilos': int(os.getenv('INMO_CASCADA_MAX_HILOS', '16')),
+    }
+    
+    # Estadísticas compartidas: qué nivel de la cascada termina respondiendo
+    ESTADISTICAS_CASCADA = {
+        'busquedas': 0,
+        'ganadores': {},
+        'niveles_lanzados': 0,
+        'niveles_cancelados': 0,
+    }
+    _lock_cascada = threading.Lock()
+    _ejecutor_hilos = None
+    # Pools de las peticiones cubiertas: 'principal' y 'cubierta'
+    _ejecutores_cobertura: Dict[str, ThreadPoolExecutor] = {}
+    
+    # ==========================================================================
+    # CONFIGURACIÓN DEL CACHE DE RESULTADOS
+    # ==========================================================================
+    
+    CACHE_CONFIG = {
+        'habilitado': os.getenv('INMO_CACHE_HABILITADO', 'true').lower() == 'true',
+        'ttl': float(os.getenv('INMO_CACHE_TTL', '300')),
+        'max_entradas': int(os.getenv('INMO_CACHE_MAX_ENTRADAS', '512')),
+        'max_bytes': int(os.getenv('INMO_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        # Cache de búsquedas completas con stale-while-revalidate (ver CacheSWR):
+        # fresco N s, después se sirve vieja y se refresca en segundo plano
+        'swr': os.getenv('INMO_CACHE_SWR', 'false').lower() == 'true',
+        'swr_fresco': float(os.getenv('INMO_CACHE_SWR_FRESCO', '60')),
+        'swr_gracia': float(os.getenv('INMO_CACHE_SWR_GRACIA', '600')),
+        'swr_max_entradas': int(os.getenv('INMO_CACHE_SWR_MAX_ENTRADAS', '256')),
+        'swr_max_refrescos': int(os.getenv('INMO_CACHE_SWR_REFRESCOS', '4')),
+    }
+    
+    # Cache compartido por todas las instancias, clave = URL final de búsqueda
+    _cache_resultados = None
+    
+    # Cache de búsquedas (resultado de la cascada), clave = filtros normalizados
+    _cache_busquedas = None
+    _ejecutor_refrescos = None
+    
+    # Precargas en segundo plano (página siguiente y búsquedas vecinas)
+    _ejecutor_precarga = None
+    
+    # ==========================================================================
+    # CONFIGURACIÓN DE PAGINACIÓN (iter_properties)
+    # ==========================================================================
+    
+    PAGINACION_CONFIG = {
+        # Páginas que se descargan por adelantado mientras se consume la actual
+        'ventana': int(os.getenv('INMO_PAGINAS_VENTANA', '3')),
+        # Tope de seguridad de páginas por recorrido
+        'max_paginas': int(os.getenv('INMO_PAGINAS_MAX', '100')),
+    }
+    
+    # ==========================================================================
+    # CONFIGURACIÓN DEL PARSEO
+    # ==========================================================================
+    
+    PARSEO_CONFIG = {
+        # 'completa': json.loads de todo __NEXT_DATA__
+        # 'selectiva': solo se materializan las propiedades (menos memoria por página)
+        'decodificacion': os.getenv('INMO_DECODIFICACION', 'completa'),
+    }
+    
+    # ==========================================================================
+    # VARIANTES DE URL DE IMÁGENES (CDN)
+    # ==========================================================================
+    
+    # Marcas de tamaño que el CDN agrega a la misma foto; se quitan para que
+    # las distintas resoluciones cuenten como una sola imagen:
+    #   .../640x480/foto.jpg   .../th.outside600x400.foto.jpg   .../foto_800x600.jpg
+    _MARCAS_TAMANO = frozenset(('thumb', 'thumbnail', 'small', 'medium', 'large', 'big'))
+    _PREFIJOS_TAMANO = ('outside', 'inside', 'crop', 'fit', 'resize')
+    
+    # Claves ya calculadas por URL: las mismas fotos vuelven en cada búsqueda
+    # que devuelve la propiedad (se vacía al llegar al máximo)
+    _claves_imagen: Dict[str, str] = {}
+    _MAX_CLAVES_IMAGEN = 50000
+    
+    # Almacén local compartido (ver almacen.py), solo si INMO_BUSQUEDA_LOCAL=true
+    _almacen = None
+    
+    # Descargas en curso por URL (ver vuelo_unico.py)
+    _vuelos = VueloUnico()
+    
+    # Predicado de propiedad destacada: retorna la regla que se cumplió o None
+    # (tabla en destacados.py, ampliable con el JSON de INMO_REGLAS_DESTACADO)
+    _detectar_destacado = staticmethod(compilar_reglas(cargar_reglas()))
+    
+    def __init__(self, modo_cascada: Optional[str] = None):
+        """
+        Inicializa el scraper con la configuración base.
+        
+        Args:
+            modo_cascada: 'secuencial', 'especulativo' o 'escalonado'
+                          (por defecto CASCADA_CONFIG['modo'])
+        """
         self.base_url = self.CONFIG['url']
+        self.modo_cascada = modo_cascada or self.CASCADA_CONFIG['modo']
+        self.cache_resultados = self.obtener_cache_resultados()
+        self.cache_busquedas = self.obtener_cache_busquedas()
+        self.almacen = self.obtener_almacen()
+        self.decodificacion = self.PARSEO_CONFIG['decodificacion']
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -242,14 +381,33 @@ class InfocasasScraper:
     def _hacer_request(self, url: str, timeout: int = 20) -> Optional[requests.Response]:
         """
         Realiza una petición HTTP usando proxies rotativos o conexión directa.
+        
+        Si el interruptor de la ruta proxy está abierto (ProxyScrape caído)
+        se va directo sin esperar su timeout (ver trafico.py). Con
+        INMO_COBERTURA=true el proxy se cubre con una petición directa si
+        tarda más de lo habitual (ver cobertura.py). Con INMO_REPLICA=grabar
+        las páginas descargadas se guardan (ver replica.py).
         """
-        if self.PROXY_CONFIG['enabled']:
-            return self._request_con_proxy(url, timeout)
+        if self.PROXY_CONFIG['enabled'] and interruptor('proxy').permite():
+            if COBERTURA_CONFIG['activo']:
+                response = self._request_cubierto(url, timeout)
+            else:
+                response = self._request_con_proxy(url, timeout)
         else:
-            return self._request_directo(url, timeout)
+            response = self._request_directo(url, timeout)
+        if grabando():
+            grabar_pagina(url, response)
+        return response
     
     def _request_con_proxy(self, url: str, timeout: int = 20) -> Optional[requests.Response]:
-        """Realiza petición usando ProxyScrape."""
+        """Realiza petición usando ProxyScrape (y directo si falla)."""
+        response = self._intentar_proxy(url, timeout)
+        if response is not None:
+            return response
+        return self._request_directo(url, timeout)
+    
+    def _intentar_proxy(self, url: str, timeout: int = 20) -> Optional[requests.Response]:
+        """Una petición por ProxyScrape, sin respaldo: la respuesta 200 o None."""
         try:
             proxy_url = (
                 f"{self.PROXY_CONFIG['proxy_url']}"
@@ -257,28 +415,101 @@ class InfocasasScraper:
                 f"&url={requests.utils.quote(url)}"
             )
             
-            response = requests.get(proxy_url, headers=self.headers, timeout=timeout)
+            with controlar(host_de(proxy_url)) as pase:
+                inicio = time.monotonic()
+                response = obtener_sesion().get(redirigir(proxy_url), headers=self.headers, timeout=timeout)
+                pase.estado = response.status_code
+            registrar_upstream('proxy', response.status_code, time.monotonic() - inicio)
+            interruptor('proxy').registrar(respuesta_sana(response.status_code))
             
             if response.status_code == 200:
+                registrar_latencia('proxy', time.monotonic() - inicio)
                 return response
             else:
                 print(f"[PROXY] Error {response.status_code}, intentando directo...")
-                return self._request_directo(url, timeout)
-                
+                return None
+        
+        except TraficoRechazado as e:
+            registrar_upstream('proxy', 'rechazada')
+            print(f"[PROXY] {e}, intentando directo...")
+            return None
         except Exception as e:
+            interruptor('proxy').registrar(False)
+            registrar_upstream('proxy', 'error')
             print(f"[PROXY] Excepción: {e}, intentando directo...")
-            return self._request_directo(url, timeout)
+            return None
     
     def _request_directo(self, url: str, timeout: int = 15) -> Optional[requests.Response]:
         """Realiza petición directa sin proxy."""
+        if not interruptor('directo').permite():
+            return None
         try:
-            response = requests.get(url, headers=self.headers, timeout=timeout)
+            with controlar(host_de(url)) as pase:
+                inicio = time.monotonic()
+                response = obtener_sesion().get(redirigir(url), headers=self.headers, timeout=timeout)
+                pase.estado = response.status_code
+            registrar_upstream('directo', response.status_code, time.monotonic() - inicio)
+            interruptor('directo').registrar(respuesta_sana(response.status_code))
             if response.status_code == 200:
+                registrar_latencia('directo', time.monotonic() - inicio)
                 return response
             return None
+        except TraficoRechazado:
+            registrar_upstream('directo', 'rechazada')
+            return None
         except Exception:
+            interruptor('directo').registrar(False)
+            registrar_upstream('directo', 'error')
             return None
     
+    def _request_cubierto(self, url: str, timeout: int = 20) -> Optional[requests.Response]:
+        """
+        Petición por proxy cubierta con una directa: si el proxy no respondió
+        dentro de retraso_cobertura('proxy'), se lanza la directa y gana el
+        primer 200. Si el proxy falla antes del retraso se va directo, como
+        en _request_con_proxy.
+        
+        Una petición de requests no se puede interrumpir: la perdedora se
+        descarta cuando termina y su conexión vuelve al pool. El retraso
+        cuenta desde que la principal arranca, no desde que entra en cola,
+        y la cubierta corre en su propio pool para no quedar detrás de las
+        principales.
+        """
+        arranco = threading.Event()
+        
+        def intentar_proxy() -> Optional[requests.Response]:
+            arranco.set()
+            return self._intentar_proxy(url, timeout)
+        
+        principal = self._obtener_ejecutor_cobertura('principal').submit(intentar_proxy)
+        arranco.wait()
+        hechos, _ = wait([principal], timeout=retraso_cobertura('proxy'))
+        if hechos:
+            response = principal.result()
+            return response if response is not None else self._request_directo(url, timeout)
+        
+        contar_cobertura('disparadas')
+        cubierta = self._obtener_ejecutor_cobertura('cubierta').submit(self._request_directo, url, timeout)
+        pendientes = {principal, cubierta}
+        while pendientes:
+            hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                response = futuro.result()
+                if response is not None:
+                    contar_cobertura('ganadas' if futuro is cubierta else 'ganadas_principal')
+                    for perdedor in pendientes:
+                        if not perdedor.cancel():
+                            perdedor.add_done_callback(self._descartar_respuesta)
+                    return response
+        contar_cobertura('sin_respuesta')
+        return None
+    
+    @staticmethod
+    def _descartar_respuesta(futuro):
+        """Cierra la respuesta de una petición que perdió la carrera."""
+        if not futuro.cancelled() and futuro.result() is not None:
+            futuro.result().close()
+    
     # ==========================================================================
     # MÉTODOS DE BÚSQUEDA
     # ==========================================================================
@@ -291,47 +522,387 @@ class InfocasasScraper:
                           max_price: Optional[int] = None,
                           bedrooms: Optional[int] = None,
                           bathrooms: Optional[int] = None,
-                          page: int = 1) -> List[Dict[str, Any]]:
+                          page: int = 1,
+                          usar_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Busca propiedades según los filtros especificados.
+        
+        Con usar_cache=False se ignora el cache de resultados y se consulta
+        InfoCasas en vivo (el resultado nuevo igual actualiza el cache).
+        
+        Con INMO_CACHE_SWR=true, una búsqueda repetida dentro de la gracia se
+        responde al instante desde el cache de búsquedas; si ya estaba vieja
+        se refresca en segundo plano.
+        """
+        clave = self._clave_busqueda(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, page
+        )
+        if usar_cache and self.cache_busquedas is not None:
+            guardadas, vieja = self.cache_busquedas.obtener_con_estado(clave)
+            if guardadas is not None:
+                if vieja and self.cache_busquedas.reservar_refresco(clave):
+                    self._obtener_ejecutor_refrescos().submit(self._refrescar_busqueda, clave)
+                self._programar_precarga(clave)
+                return [prop.to_dict() for prop in guardadas]
+        
+        _, properties = self._buscar_con_cascada(*clave, usar_cache)
+        self._guardar_busqueda(clave, properties)
+        if properties:
+            self._programar_precarga(clave)
+        return properties
+    
+    def _clave_busqueda(self, operation: str, prop_type: str, location: str,
+                        min_price: Optional[int], max_price: Optional[int],
+                        bedrooms: Optional[int], bathrooms: Optional[int], page: int) -> tuple:
+        """Clave del cache de búsquedas (y argumentos de _buscar_con_cascada)."""
+        return (operation, prop_type, self._normalizar_ubicacion(location),
+                min_price, max_price, bedrooms, bathrooms, page)
+    
+    def _guardar_busqueda(self, clave: tuple, properties: List[Dict[str, Any]]) -> bool:
+        """
+        Guarda el resultado de una búsqueda en el cache de búsquedas. Las
+        vacías no se guardan: también es lo que devuelve una falla de
+        InfoCasas, y no deben tapar un resultado anterior.
+        """
+        if self.cache_busquedas is None or not properties:
+            return False
+        propiedades = tuple(Propiedad.desde_dict(prop) for prop in properties)
+        self.cache_busquedas.guardar(
+            clave, propiedades,
+            tamano=sum(prop.tamano_aproximado() for prop in propiedades)
+        )
+        return True
+    
+    def _refrescar_busqueda(self, clave: tuple):
+        """Vuelve a ejecutar una búsqueda en vivo (en segundo plano) y la guarda."""
+        exito = False
+        try:
+            _, properties = self._buscar_con_cascada(*clave, False)
+            exito = self._guardar_busqueda(clave, properties)
+        except Exception as e:
+            print(f"[CACHE] Error al refrescar {clave}: {e}")
+        finally:
+            self.cache_busquedas.terminar_refresco(clave, exito)
+    
+    def _programar_precarga(self, clave: tuple):
+        """
+        Con INMO_PRECARGA=true anota la búsqueda en el registro y lanza en segundo plano las vecinas que entren en el
+        presupuesto (ver precarga.py).
+        """
+        if not PRECARGA_CONFIG['activa']:
+            return
+        obtener_registro().registrar(clave)
+        precarga = obtener_precarga()
+        for vecina in precarga.vecinas(clave):
+            if precarga.reservar(vecina):
+                self._obtener_ejecutor_precarga().submit(self._precargar, vecina)
+    
+    def _precargar(self, clave: tuple) -> bool:
+        """Ejecuta una búsqueda para dejarla en los caches, sin registrarla ni encadenar precargas."""
+        exito = False
+        try:
+            _, properties = self._buscar_con_cascada(*clave, True)
+            self._guardar_busqueda(clave, properties)
+            exito = bool(properties)
+        except Exception as e:
+            print(f"[PRECARGA] Error al precargar {clave}: {e}")
+        finally:
+            obtener_precarga().terminar(exito)
+        return exito
+    
+    def precalentar(self, cantidad: Optional[int] = None) -> int:
+        """
+        Ejecuta (una por una) las búsquedas más populares del registro para
+        calentar los caches después de un arranque. Retorna cuántas trajeron
+        resultados.
+        """
+        if cantidad is None:
+            cantidad = PRECARGA_CONFIG['al_iniciar']
+        if not PRECARGA_CONFIG['activa'] or cantidad <= 0:
+            return 0
+        precarga = obtener_precarga()
+        exitosas = 0
+        for clave in obtener_registro().populares(cantidad):
+            precarga.iniciar_precalentamiento()
+            exitosas += self._precargar(clave)
+        return exitosas
+    
+    def _buscar_con_cascada(self,
+                            operation: str,
+                            prop_type: str,
+                            location: str,
+                            min_price: Optional[int] = None,
+                            max_price: Optional[int] = None,
+                            bedrooms: Optional[int] = None,
+                            bathrooms: Optional[int] = None,
+                            page: int = 1,
+                            usar_cache: bool = True) -> tuple:
+        """
+        Ejecuta la cascada de categorías y retorna (nivel ganador, propiedades).
         """
         # Normalizar ubicación
         location = self._normalizar_ubicacion(location)
         
-        # Intentar primero con el tipo específico
-        properties = self._fetch_properties(
-            operation, prop_type, location, 
-            min_price, max_price, bedrooms, bathrooms, page
-        )
+        niveles = self._niveles_cascada(prop_type)
         
-        # Si no hay resultados y buscamos casas o apartamentos, probar categoría combinada
-        if len(properties) == 0 and prop_type in ['casa', 'apartamento', 'departamento']:
+        def buscar_nivel(tipo_nivel: str) -> List[Dict[str, Any]]:
             properties = self._fetch_properties(
-                operation, 'casas-y-departamentos', location,
-                min_price, max_price, bedrooms, bathrooms, page
+                operation, tipo_nivel, location,
+                min_price, max_price, bedrooms, bathrooms, page,
+                usar_cache=usar_cache
             )
-            
-            # Filtrar por tipo específico
-            if prop_type == 'casa':
-                properties = [
-                    p for p in properties 
-                    if 'casa' in p['informacion_basica']['tipo_propiedad'].lower()
-                ]
-            elif prop_type in ['apartamento', 'departamento']:
-                properties = [
-                    p for p in properties 
-                    if any(x in p['informacion_basica']['tipo_propiedad'].lower() 
-                           for x in ['apartamento', 'departamento', 'depto'])
-                ]
+            # Filtrar la categoría combinada por el tipo específico pedido
+            if tipo_nivel == 'casas-y-departamentos' and prop_type != tipo_nivel:
+                properties = self._filtrar_por_tipo(properties, prop_type)
+            return properties
         
-        # Si sigue sin resultados, intentar búsqueda general "inmuebles"
-        if len(properties) == 0 and prop_type not in ['inmuebles', 'casas-y-departamentos']:
-            properties = self._fetch_properties(
-                operation, 'inmuebles', location,
-                min_price, max_price, bedrooms, bathrooms, page
+        nivel, properties = self._ejecutar_cascada(niveles, buscar_nivel)
+        self._registrar_ganador(nivel, prop_type)
+        return nivel, properties
+    
+    def iter_properties(self,
+                        operation: str = "venta",
+                        prop_type: str = "inmuebles",
+                        location: str = "asuncion",
+                        min_price: Optional[int] = None,
+                        max_price: Optional[int] = None,
+                        bedrooms: Optional[int] = None,
+                        bathrooms: Optional[int] = None,
+                        max_resultados: Optional[int] = None,
+                        ventana: Optional[int] = None,
+                        usar_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todas las páginas de una búsqueda como generador.
+        
+        La primera página pasa por la cascada de categorías; las siguientes
+        usan la categoría que ganó. Mientras se consume una página, las
+        próximas 'ventana' páginas ya se están descargando en paralelo.
+        Termina al recibir una página vacía (o sin propiedades nuevas), al
+        llegar a max_resultados o a PAGINACION_CONFIG['max_paginas'].
+        Las propiedades repetidas entre páginas (mismo id) se entregan una vez.
+        
+        Args:
+            max_resultados: Cantidad máxima de propiedades a entregar
+            ventana: Páginas a descargar por adelantado (por defecto PAGINACION_CONFIG)
+        """
+        ventana = max(1, ventana or self.PAGINACION_CONFIG['ventana'])
+        location = self._normalizar_ubicacion(location)
+        nivel, primera = self._buscar_con_cascada(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, 1, usar_cache
+        )
+        if nivel is None:
+            return
+        
+        def descargar(pagina: int) -> List[Dict[str, Any]]:
+            return self._fetch_properties(
+                operation, nivel, location,
+                min_price, max_price, bedrooms, bathrooms, pagina,
+                usar_cache=usar_cache
             )
         
-        return properties
+        ejecutor = self._obtener_ejecutor()
+        pendientes = deque()
+        siguiente = 2
+        vistos = set()
+        entregados = 0
+        
+        try:
+            pagina_actual = primera
+            while True:
+                # Mantener la ventana de descargas anticipadas llena
+                while len(pendientes) < ventana and siguiente <= self.PAGINACION_CONFIG['max_paginas']:
+                    pendientes.append(ejecutor.submit(descargar, siguiente))
+                    siguiente += 1
+                
+                if nivel == 'casas-y-departamentos':
+                    pagina_actual = self._filtrar_por_tipo(pagina_actual, prop_type)
+                
+                for prop in pagina_actual:
+                    prop_id = prop['identificacion']['id']
+                    if prop_id is not None:
+                        if prop_id in vistos:
+                            continue
+                        vistos.add(prop_id)
+                    yield prop
+                    entregados += 1
+                    if max_resultados is not None and entregados >= max_resultados:
+                        return
+                
+                if not pendientes:
+                    return
+                pagina_actual = pendientes.popleft().result()
+                # Página vacía o que solo repite propiedades ya vistas: fin del listado
+                if not pagina_actual or all(p['identificacion']['id'] in vistos for p in pagina_actual):
+                    return
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()
+    
+    def _niveles_cascada(self, prop_type: str) -> List[str]:
+        """
+        Retorna las categorías a consultar, en orden de prioridad.
+        """
+        # Intentar primero con el tipo específico
+        niveles = [prop_type]
+        
+        # Si no hay resultados y buscamos casas o apartamentos, probar categoría combinada
+        if prop_type in ['casa', 'apartamento', 'departamento']:
+            niveles.append('casas-y-departamentos')
+        
+        # Si sigue sin resultados, intentar búsqueda general "inmuebles"
+        if prop_type not in ['inmuebles', 'casas-y-departamentos']:
+            niveles.append('inmuebles')
+        
+        return niveles
+    
+    def _ejecutar_cascada(self, niveles: List[str], buscar_nivel) -> tuple:
+        """
+        Ejecuta los niveles de la cascada según self.modo_cascada.
+        
+        Siempre gana el primer nivel (en orden de prioridad) con resultados,
+        sin importar cuál responde antes. Los niveles que ya no hacen falta se
+        cancelan; los que ya estaban en vuelo terminan en segundo plano y su
+        resultado se descarta.
+        
+        Returns:
+            Tupla (nivel ganador o None, propiedades)
+        """
+        if self.modo_cascada not in ('especulativo', 'escalonado') or len(niveles) == 1:
+            for nivel in niveles:
+                self._contar_cascada('niveles_lanzados')
+                properties = buscar_nivel(nivel)
+                if properties:
+                    return nivel, properties
+            return None, []
+        
+        ejecutor = self._obtener_ejecutor()
+        futuros = []
+        
+        def lanzar():
+            self._contar_cascada('niveles_lanzados')
+            futuros.append(ejecutor.submit(buscar_nivel, niveles[len(futuros)]))
+        
+        if self.modo_cascada == 'especulativo':
+            while len(futuros) < len(niveles):
+                lanzar()
+        else:
+            lanzar()
+        
+        actual = 0
+        try:
+            while actual < len(niveles):
+                pendiente_lanzar = self.modo_cascada == 'escalonado' and len(futuros) < len(niveles)
+                hechos, _ = wait(
+                    [futuros[actual]],
+                    timeout=self.CASCADA_CONFIG['retraso'] if pendiente_lanzar else None,
+                    return_when=FIRST_COMPLETED
+                )
+                if not hechos:
+                    # El nivel actual tarda: lanzar el siguiente en paralelo
+                    lanzar()
+                    continue
+                
+                properties = futuros[actual].result()
+                if properties:
+                    return niveles[actual], properties
+                
+                actual += 1
+                if actual < len(niveles) and len(futuros) <= actual:
+                    lanzar()
+            return None, []
+        finally:
+            for futuro in futuros[actual + 1:]:
+                if futuro.cancel():
+                    self._contar_cascada('niveles_cancelados')
+    
+    @classmethod
+    def _obtener_ejecutor(cls) -> ThreadPoolExecutor:
+        """Pool de hilos compartido (cascada especulativa/escalonada y paginación)."""
+        if InfocasasScraper._ejecutor_hilos is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._ejecutor_hilos is None:
+                    InfocasasScraper._ejecutor_hilos = ThreadPoolExecutor(
+                        max_workers=cls.CASCADA_CONFIG['max_hilos'],
+                        thread_name_prefix='inmo'
+                    )
+        return InfocasasScraper._ejecutor_hilos
+    
+    @classmethod
+    def _obtener_ejecutor_refrescos(cls) -> ThreadPoolExecutor:
+        """
+        Pool de los refrescos en segundo plano del cache de búsquedas. Tiene
+        tantos hilos como refrescos simultáneos permite el cache: nunca encola.
+        """
+        if InfocasasScraper._ejecutor_refrescos is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._ejecutor_refrescos is None:
+                    InfocasasScraper._ejecutor_refrescos = ThreadPoolExecutor(
+                        max_workers=cls.CACHE_CONFIG['swr_max_refrescos'],
+                        thread_name_prefix='inmo-refresco'
+                    )
+        return InfocasasScraper._ejecutor_refrescos
+    
+    @classmethod
+    def _obtener_ejecutor_precarga(cls) -> ThreadPoolExecutor:
+        """Pool de las precargas; Precarga.reservar() ya limita las simultáneas."""
+        if InfocasasScraper._ejecutor_precarga is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._ejecutor_precarga is None:
+                    InfocasasScraper._ejecutor_precarga = ThreadPoolExecutor(
+                        max_workers=PRECARGA_CONFIG['max_simultaneas'],
+                        thread_name_prefix='inmo-precarga'
+                    )
+        return InfocasasScraper._ejecutor_precarga
+    
+    @classmethod
+    def _obtener_ejecutor_cobertura(cls, rol: str) -> ThreadPoolExecutor:
+        """
+        Pool de hilos de las peticiones cubiertas ('principal' o 'cubierta').
+        Son aparte del compartido: esas peticiones se lanzan desde tareas que
+        ya corren en ese pool. Cada uno tiene al menos el doble de hilos que
+        el compartido, porque también llaman el precargador y los refrescos.
+        """
+        ejecutor = InfocasasScraper._ejecutores_cobertura.get(rol)
+        if ejecutor is None:
+            with cls._lock_cascada:
+                ejecutor = InfocasasScraper._ejecutores_cobertura.get(rol)
+                if ejecutor is None:
+                    ejecutor = InfocasasScraper._ejecutores_cobertura[rol] = ThreadPoolExecutor(
+                        max_workers=max(COBERTURA_CONFIG['max_hilos'], 2 * cls.CASCADA_CONFIG['max_hilos']),
+                        thread_name_prefix=f'inmo-cobertura-{rol}'
+                    )
+        return ejecutor
+    
+    @classmethod
+    def _contar_cascada(cls, clave: str, cantidad: int = 1):
+        """Incrementa un contador de ESTADISTICAS_CASCADA."""
+        with cls._lock_cascada:
+            cls.ESTADISTICAS_CASCADA[clave] += cantidad
+    
+    @classmethod
+    def _registrar_ganador(cls, nivel: Optional[str], prop_type: str):
+        """Registra qué nivel de la cascada respondió la búsqueda."""
+        if nivel is None:
+            nombre = 'sin_resultados'
+        elif nivel == prop_type:
+            nombre = 'especifico'
+        else:
+            nombre = nivel
+        with cls._lock_cascada:
+            cls.ESTADISTICAS_CASCADA['busquedas'] += 1
+            ganadores = cls.ESTADISTICAS_CASCADA['ganadores']
+            ganadores[nombre] = ganadores.get(nombre, 0) + 1
+    
+    @classmethod
+    def estadisticas_cascada(cls) -> Dict[str, Any]:
+        """Retorna una copia de las estadísticas de la cascada."""
+        with cls._lock_cascada:
+            estadisticas = dict(cls.ESTADISTICAS_CASCADA)
+            estadisticas['ganadores'] = dict(estadisticas['ganadores'])
+        estadisticas['modo'] = cls.CASCADA_CONFIG['modo']
+        return estadisticas
     
     def _normalizar_ubicacion(self, location: str) -> str:
         """
@@ -354,6 +925,24 @@ class InfocasasScraper:
         
         return location
     
+    def _filtrar_por_tipo(self, properties: List[Dict[str, Any]], prop_type: str) -> List[Dict[str, Any]]:
+        """
+        Filtra resultados de la categoría combinada 'casas-y-departamentos'
+        por el tipo específico pedido.
+        """
+        if prop_type == 'casa':
+            return [
+                p for p in properties 
+                if 'casa' in p['informacion_basica']['tipo_propiedad'].lower()
+            ]
+        elif prop_type in ['apartamento', 'departamento']:
+            return [
+                p for p in properties 
+                if any(x in p['informacion_basica']['tipo_propiedad'].lower() 
+                       for x in ['apartamento', 'departamento', 'depto'])
+            ]
+        return properties
+    
     def _construir_url(self, operation: str, prop_type_slug: str, location: str) -> str:
         """
         Construye la URL correcta según la estructura de InfoCasas.
@@ -383,17 +972,17 @@ class InfocasasScraper:
         # Intentar como ubicación directa
         return f"{self.base_url}/{operation}/{prop_type_slug}/{location}"
 
-    def _fetch_properties(self,
-                         operation: str,
-                         prop_type: str,
-                         location: str,
-                         min_price: Optional[int] = None,
-                         max_price: Optional[int] = None,
-                         bedrooms: Optional[int] = None,
-                         bathrooms: Optional[int] = None,
-                         page: int = 1) -> List[Dict[str, Any]]:
+    def _construir_url_busqueda(self,
+                                operation: str,
+                                prop_type: str,
+                                location: str,
+                                min_price: Optional[int] = None,
+                                max_price: Optional[int] = None,
+                                bedrooms: Optional[int] = None,
+                                bathrooms: Optional[int] = None,
+                                page: int = 1) -> str:
         """
-        Método interno que ejecuta la búsqueda real y parsea los resultados.
+        Construye la URL final de búsqueda (ruta + parámetros de filtro).
         """
         # Convertir tipo de propiedad a slug de URL
         prop_type_slug = self.TIPOS_PROPIEDAD_URL.get(prop_type, prop_type + 's')
@@ -418,48 +1007,266 @@ class InfocasasScraper:
             query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
             url += f"?{query_string}"
         
-        print(f"[SCRAPER] Buscando en: {url}")
+        return url
+
+    def _fetch_properties(self,
+                         operation: str,
+                         prop_type: str,
+                         location: str,
+                         min_price: Optional[int] = None,
+                         max_price: Optional[int] = None,
+                         bedrooms: Optional[int] = None,
+                         bathrooms: Optional[int] = None,
+                         page: int = 1,
+                         usar_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Método interno que ejecuta la búsqueda real y parsea los resultados.
+        
+        Si el almacén local tiene la combinación recorrida dentro de la ventana
+        de frescura, responde desde ahí sin ir a InfoCasas.
+        """
+        if usar_cache:
+            locales = self._buscar_en_almacen(
+                operation, prop_type, location,
+                min_price, max_price, bedrooms, bathrooms, page
+            )
+            if locales is not None:
+                return locales
+        
+        url = self._construir_url_busqueda(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, page
+        )
+        
+        if usar_cache and self.cache_resultados is not None:
+            en_cache = self.cache_resultados.obtener(url)
+            if en_cache is not None:
+                return [prop.to_dict() for prop in en_cache]
         
         try:
-            response = self._hacer_request(url)
-            if not response:
-                return []
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            script = soup.find('script', id='__NEXT_DATA__', type='application/json')
-            if not script:
-                return []
-            
-            data = json.loads(script.string)
-            props_data = data.get('props', {}).get('pageProps', {})
-            
-            properties = []
-            
-            # Estructura 1: Propiedad individual con duplicados
-            if 'fetchResult' in props_data and 'property' in props_data['fetchResult']:
-                prop = props_data['fetchResult']['property']
-                properties.append(self._extract_property_data(prop))
-                if 'duplicated' in prop and prop['duplicated']:
-                    for dup in prop['duplicated']:
-                        properties.append(self._extract_property_data(dup))
-            
-            # Estructura 2: Lista de propiedades directa
-            if 'properties' in props_data:
-                for prop in props_data['properties']:
-                    properties.append(self._extract_property_data(prop))
-            
-            # Estructura 3: Resultados de búsqueda rápida
-            if 'fetchResult' in props_data and 'searchFast' in props_data['fetchResult']:
-                search_data = props_data['fetchResult']['searchFast'].get('data', [])
-                for prop in search_data:
-                    properties.append(self._extract_property_data(prop))
-            
-            return properties
+            # Las llamadas simultáneas con la misma URL esperan una sola descarga
+            propiedades = self._vuelos.ejecutar(url, lambda: self._descargar_propiedades(url))
+            return [prop.to_dict() for prop in propiedades]
             
         except Exception as e:
             print(f"[ERROR] Error al buscar propiedades: {e}")
             return []
     
+    def _descargar_propiedades(self, url: str) -> List[Propiedad]:
+        """Descarga y parsea una página de resultados, y la guarda en el cache."""
+        print(f"[SCRAPER] Buscando en: {url}")
+        
+        response = self._hacer_request(url)
+        if not response:
+            return []
+        
+        propiedades = self._parsear_propiedades(response.content)
+        self._guardar_en_cache(url, propiedades)
+        return propiedades
+    
+    @classmethod
+    def obtener_cache_resultados(cls) -> Optional[CacheTTL]:
+        """Retorna el cache de resultados compartido (None si está deshabilitado)."""
+        if not cls.CACHE_CONFIG['habilitado']:
+            return None
+        if InfocasasScraper._cache_resultados is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._cache_resultados is None:
+                    InfocasasScraper._cache_resultados = CacheTTL(
+                        ttl=cls.CACHE_CONFIG['ttl'],
+                        max_entradas=cls.CACHE_CONFIG['max_entradas'],
+                        max_bytes=cls.CACHE_CONFIG['max_bytes'],
+                    )
+        return InfocasasScraper._cache_resultados
+    
+    @classmethod
+    def obtener_cache_busquedas(cls) -> Optional[CacheSWR]:
+        """Retorna el cache de búsquedas compartido (None si INMO_CACHE_SWR no está activo)."""
+        if not cls.CACHE_CONFIG['swr']:
+            return None
+        if InfocasasScraper._cache_busquedas is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._cache_busquedas is None:
+                    InfocasasScraper._cache_busquedas = CacheSWR(
+                        fresco=cls.CACHE_CONFIG['swr_fresco'],
+                        gracia=cls.CACHE_CONFIG['swr_gracia'],
+                        max_entradas=cls.CACHE_CONFIG['swr_max_entradas'],
+                        max_bytes=cls.CACHE_CONFIG['max_bytes'],
+                        max_refrescos=cls.CACHE_CONFIG['swr_max_refrescos'],
+                    )
+        return InfocasasScraper._cache_busquedas
+    
+    @classmethod
+    def obtener_almacen(cls) -> Optional[AlmacenPropiedades]:
+        """Retorna el almacén local compartido (None si la búsqueda local está deshabilitada)."""
+        if not ALMACEN_CONFIG['busqueda_local']:
+            return None
+        if InfocasasScraper._almacen is None:
+            with cls._lock_cascada:
+                if InfocasasScraper._almacen is None:
+                    InfocasasScraper._almacen = AlmacenPropiedades()
+        return InfocasasScraper._almacen
+    
+    def _ubicacion_crawl(self, location: str) -> Optional[str]:
+        """
+        Retorna la ubicación de la combinación del crawler que cubre 'location'
+        (los barrios de Asunción se recorren dentro de 'asuncion').
+        """
+        if location in self.CONFIG['departamentos'] or location in self.CONFIG['ciudades']:
+            return location
+        if location in self.CONFIG['barrios_asuncion']:
+            return 'asuncion'
+        return None
+    
+    def _buscar_en_almacen(self,
+                           operation: str,
+                           prop_type: str,
+                           location: str,
+                           min_price: Optional[int] = None,
+                           max_price: Optional[int] = None,
+                           bedrooms: Optional[int] = None,
+                           bathrooms: Optional[int] = None,
+                           page: int = 1) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca en el almacén local. Retorna None si no hay almacén o si los
+        datos de esa combinación faltan o están vencidos (hay que ir en vivo).
+        """
+        if self.almacen is None:
+            return None
+        ubicacion = self._ubicacion_crawl(location)
+        if ubicacion is None:
+            return None
+        
+        slug = self.TIPOS_PROPIEDAD_URL.get(prop_type, prop_type + 's')
+        if slug in self.TIPOS_AGREGADOS:
+            tipos = self.TIPOS_AGREGADOS[slug]
+            tipos_recorridos = list(tipos) if tipos else [
+                s for s in dict.fromkeys(self.TIPOS_PROPIEDAD_URL.values())
+                if s not in self.TIPOS_AGREGADOS
+            ]
+        else:
+            tipos = tipos_recorridos = [slug]
+        
+        try:
+            if not self.almacen.esta_fresco(operation, tipos_recorridos, ubicacion):
+                contar_busqueda('vencidas')
+                return None
+            # Las que no aparecieron en el último recorrido pueden ya no estar publicadas
+            properties = self.almacen.buscar(
+                operation, tipos and list(tipos), location,
+                min_price, max_price, bedrooms, bathrooms, page,
+                visto_desde=self.almacen.inicio_pasadas(operation, tipos_recorridos, ubicacion)
+            )
+        except sqlite3.Error as e:
+            print(f"[ALMACEN] Error: {e}, buscando en vivo...")
+            return None
+        
+        contar_busqueda('locales')
+        return properties
+    
+    def _guardar_en_cache(self, url: str, propiedades: List[Propiedad]):
+        """
+        Guarda una página parseada en el cache (también las páginas vacías:
+        evitan repetir niveles de la cascada que no tienen resultados).
+        
+        Se guarda el modelo compacto; cada acierto arma diccionarios nuevos.
+        """
+        if self.cache_resultados is not None:
+            self.cache_resultados.guardar(
+                url, tuple(propiedades),
+                tamano=sum(prop.tamano_aproximado() for prop in propiedades)
+            )
+    
+    def _decodificar_next_data(self, contenido: Union[bytes, str]) -> Optional[Dict[str, Any]]:
+        """
+        Decodifica el JSON de __NEXT_DATA__ de una página.
+        
+        Primero intenta el camino rápido (recorte directo sobre los bytes);
+        solo si falla arma el árbol completo con BeautifulSoup.
+        """
+        with PARSEO_HTML_SEGUNDOS.cronometrar(camino='recorte'):
+            payload = extraer_next_data(contenido)
+        if payload is not None:
+            try:
+                with DECODIFICACION_SEGUNDOS.cronometrar(modo='completa'):
+                    data = json.loads(payload)
+                contar_parseo('rapido')
+                return data
+            except ValueError:
+                pass
+        
+        # Respaldo: parseo HTML completo
+        contar_parseo('respaldo')
+        with PARSEO_HTML_SEGUNDOS.cronometrar(camino='beautifulsoup'):
+            soup = BeautifulSoup(contenido, 'html.parser')
+            script = soup.find('script', id='__NEXT_DATA__', type='application/json')
+        if not script:
+            return None
+        
+        with DECODIFICACION_SEGUNDOS.cronometrar(modo='completa'):
+            return json.loads(script.string)
+    
+    def _parsear_pagina(self, contenido: Union[bytes, str]) -> List[Dict[str, Any]]:
+        """
+        Extrae las propiedades del bloque __NEXT_DATA__ de una página de
+        resultados, con la forma de _extract_property_data.
+        """
+        return [prop.to_dict() for prop in self._parsear_propiedades(contenido)]
+    
+    def _parsear_propiedades(self, contenido: Union[bytes, str]) -> List[Propiedad]:
+        """
+        Igual que _parsear_pagina pero retorna el modelo compacto (Propiedad).
+        """
+        if self.decodificacion == 'selectiva':
+            with PARSEO_HTML_SEGUNDOS.cronometrar(camino='recorte'):
+                payload = extraer_next_data(contenido)
+            if payload is not None:
+                try:
+                    # La decodificación selectiva va intercalada con la
+                    # extracción: su tiempo es el total menos el de extraer
+                    inicio = time.perf_counter()
+                    extraccion = 0.0
+                    properties = []
+                    for prop in iterar_propiedades_crudas(payload):
+                        inicio_extraccion = time.perf_counter()
+                        properties.append(self._extraer_propiedad(prop))
+                        extraccion += time.perf_counter() - inicio_extraccion
+                    DECODIFICACION_SEGUNDOS.observar(time.perf_counter() - inicio - extraccion, modo='selectiva')
+                    contar_parseo('selectivo')
+                    return properties
+                except (ValueError, IndexError):
+                    # JSON inesperado: seguir por el camino completo
+                    pass
+        
+        data = self._decodificar_next_data(contenido)
+        if not data:
+            return []
+        
+        props_data = data.get('props', {}).get('pageProps', {})
+        
+        properties = []
+        
+        # Estructura 1: Propiedad individual con duplicados
+        if 'fetchResult' in props_data and 'property' in props_data['fetchResult']:
+            prop = props_data['fetchResult']['property']
+            properties.append(self._extraer_propiedad(prop))
+            if 'duplicated' in prop and prop['duplicated']:
+                for dup in prop['duplicated']:
+                    properties.append(self._extraer_propiedad(dup))
+        
+        # Estructura 2: Lista de propiedades directa
+        if 'properties' in props_data:
+            for prop in props_data['properties']:
+                properties.append(self._extraer_propiedad(prop))
+        
+        # Estructura 3: Resultados de búsqueda rápida
+        if 'fetchResult' in props_data and 'searchFast' in props_data['fetchResult']:
+            search_data = props_data['fetchResult']['searchFast'].get('data', [])
+            for prop in search_data:
+                properties.append(self._extraer_propiedad(prop))
+        
+        return properties
+    
     # ==========================================================================
     # EXTRACCIÓN DE DATOS
     # ==========================================================================
@@ -469,6 +1276,14 @@ class InfocasasScraper:
         Extrae y estructura todos los datos de una propiedad.
         Incluye detección automática de propiedades destacadas.
         """
+        return self._extraer_propiedad(prop).to_dict()
+    
+    def _extraer_propiedad(self, prop: Dict[str, Any]) -> Propiedad:
+        """
+        Extrae los datos de una propiedad cruda al modelo compacto Propiedad.
+        """
+        inicio = time.perf_counter()
+        
         # Extraer objetos anidados
         price_info = prop.get('price') or {}
         locations = prop.get('locations') or {}
@@ -488,105 +1303,15 @@ class InfocasasScraper:
         # ======================================================================
         # DETECCIÓN DE PROPIEDAD DESTACADA
         # ======================================================================
-        destacado = False
-        
-        # Método 1: Campo 'featured' directo
-        if prop.get('featured'):
-            destacado = True
-        
-        # Método 2: Campo 'is_featured'
-        if prop.get('is_featured'):
-            destacado = True
-        
-        # Método 3: Campo 'highlight' o 'highlighted'
-        if prop.get('highlight') or prop.get('highlighted'):
-            destacado = True
-        
-        # Método 4: Campo 'premium'
-        if prop.get('premium'):
-            destacado = True
-        
-        # Método 5: Campo 'promoted' o 'is_promoted'
-        if prop.get('promoted') or prop.get('is_promoted'):
-            destacado = True
-        
-        # Método 6: Campo 'super' o 'super_destacado'
-        if prop.get('super') or prop.get('super_destacado'):
-            destacado = True
-        
-        # Método 7: Campo en 'tags' o 'labels'
-        tags = prop.get('tags', []) or prop.get('labels', [])
-        if isinstance(tags, list):
-            for tag in tags:
-                if isinstance(tag, str):
-                    tag_lower = tag.lower()
-                    if any(x in tag_lower for x in ['destacad', 'premium', 'super', 'featured']):
-                        destacado = True
-                        break
-                elif isinstance(tag, dict):
-                    tag_name = tag.get('name', '').lower()
-                    if any(x in tag_name for x in ['destacad', 'premium', 'super', 'featured']):
-                        destacado = True
-                        break
-        
-        # Método 8: Campo 'plan' o 'subscription' (planes premium)
-        plan = prop.get('plan') or prop.get('subscription') or {}
-        if isinstance(plan, dict):
-            plan_name = plan.get('name', '').lower()
-            if any(x in plan_name for x in ['premium', 'super', 'destacad', 'gold', 'platinum']):
-                destacado = True
-        elif isinstance(plan, str) and any(x in plan.lower() for x in ['premium', 'super', 'destacad']):
-            destacado = True
+        # Reglas de destacados.py, compiladas una vez al cargar la clase
+        regla = self._detectar_destacado(prop)
+        contar_destacado(regla)
+        destacado = regla is not None
 
         # ======================================================================
         # EXTRACCIÓN DE IMÁGENES
         # ======================================================================
-        imagenes = []
-        
-        if 'images' in prop and prop['images']:
-            for img in prop['images']:
-                if isinstance(img, dict):
-                    url = img.get('image') or img.get('url') or img.get('original')
-                    if url:
-                        imagenes.append({
-                            'url': url,
-                            'thumbnail': img.get('thumbnail') or img.get('small') or url,
-                            'alt': img.get('alt', 'Imagen de propiedad')
-                        })
-                elif isinstance(img, str):
-                    imagenes.append({
-                        'url': img,
-                        'thumbnail': img,
-                        'alt': 'Imagen de propiedad'
-                    })
-        
-        if 'main_image' in prop and prop['main_image']:
-            main_img = prop['main_image']
-            if isinstance(main_img, dict):
-                url = main_img.get('image') or main_img.get('url')
-                if url and not any(i['url'] == url for i in imagenes):
-                    imagenes.insert(0, {
-                        'url': url,
-                        'thumbnail': main_img.get('thumbnail') or url,
-                        'alt': 'Imagen principal'
-                    })
-            elif isinstance(main_img, str) and not any(i['url'] == main_img for i in imagenes):
-                imagenes.insert(0, {
-                    'url': main_img,
-                    'thumbnail': main_img,
-                    'alt': 'Imagen principal'
-                })
-        
-        if 'photos' in prop and prop['photos']:
-            for foto in prop['photos']:
-                if isinstance(foto, dict):
-                    url = foto.get('url') or foto.get('image')
-                    if url and not any(i['url'] == url for i in imagenes):
-                        imagenes.append({
-                            'url': url,
-                            'thumbnail': foto.get('thumbnail') or url,
-                            'alt': 'Foto de propiedad'
-                        })
+        imagenes = self._extraer_imagenes(prop)
         
         # ======================================================================
         # EXTRACCIÓN DE COORDENADAS
@@ -617,54 +1342,156 @@ class InfocasasScraper:
         # ======================================================================
         # CONSTRUIR OBJETO DE RESPUESTA
         # ======================================================================
-        return {
-            'identificacion': {
-                'id': prop.get('id')
-            },
-            'informacion_basica': {
-                'titulo': str(prop.get('title', '')).strip(),
-                'descripcion': str(prop.get('description', '')).strip(),
-                'tipo_propiedad': prop_type.get('name', 'Inmueble'),
-            },
-            'precio': {
-                'monto': price_info.get('amount'),
-                'moneda': currency.get('name') or 'Gs.',
-            },
-            'ubicacion': {
-                'ciudad': ciudad,
-                'barrio': barrio,
-                'departamento': depto,
-                'direccion': prop.get('address') or prop.get('street'),
-                'coordenadas': {
-                    'latitud': latitud,
-                    'longitud': longitud
-                } if latitud and longitud else None
-            },
-            'caracteristicas': {
-                'dormitorios': prop.get('bedrooms'),
-                'banos': prop.get('bathrooms'),
-                'metros_cuadrados': {
-                    'm2_construidos': prop.get('m2Built') or prop.get('m2'),
-                    'm2_terreno': prop.get('m2') if prop.get('m2Built') else None
-                },
-                'antiguedad': prop.get('age'),
-                'garages': prop.get('garages'),
-            },
-            'imagenes': imagenes,
-            'destacado': destacado,  # Campo destacado a nivel raíz
-            'propietario': {
-                'nombre': prop.get('owner', {}).get('name'),
-                'whatsapp': prop.get('owner', {}).get('whatsapp_phone'),
-            },
-            'enlaces': {
-                'url_propiedad': f"{self.base_url}{prop.get('link')}" if prop.get('link') else None,
-            },
-            'metadata': {
-                'fecha_publicacion': prop.get('published_at') or prop.get('created_at'),
-                'destacada': destacado,  # También en metadata por compatibilidad
-            }
-        }
+        owner = prop.get('owner', {})
+        propiedad = Propiedad(
+            id=prop.get('id'),
+            titulo=str(prop.get('title', '')).strip(),
+            descripcion=str(prop.get('description', '')).strip(),
+            tipo_propiedad=prop_type.get('name', 'Inmueble'),
+            monto=price_info.get('amount'),
+            moneda=currency.get('name') or 'Gs.',
+            ciudad=ciudad,
+            barrio=barrio,
+            departamento=depto,
+            direccion=prop.get('address') or prop.get('street'),
+            latitud=latitud,
+            longitud=longitud,
+            dormitorios=prop.get('bedrooms'),
+            banos=prop.get('bathrooms'),
+            m2_construidos=prop.get('m2Built') or prop.get('m2'),
+            m2_terreno=prop.get('m2') if prop.get('m2Built') else None,
+            antiguedad=prop.get('age'),
+            garages=prop.get('garages'),
+            imagenes=imagenes,
+            destacado=destacado,
+            propietario=owner.get('name'),
+            whatsapp=owner.get('whatsapp_phone'),
+            url_propiedad=f"{self.base_url}{prop.get('link')}" if prop.get('link') else None,
+            fecha_publicacion=prop.get('published_at') or prop.get('created_at'),
+        )
+        EXTRACCION_SEGUNDOS.observar(time.perf_counter() - inicio)
+        return propiedad
 
+    def _extraer_imagenes(self, prop: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Arma la galería de una propiedad: 'images', luego 'main_image' (al
+        principio si no estaba) y luego 'photos', sin repetir fotos.
+        
+        Una sola pasada por fuente con un set de claves normalizadas
+        (_clave_imagen), así la misma foto en otra resolución no se duplica.
+        """
+        clave_de = self._claves_imagen.get
+        calcular = self._recordar_clave_imagen
+        imagenes = []
+        vistas = set()
+        
+        for img in prop.get('images') or ():
+            if isinstance(img, dict):
+                url = img.get('image') or img.get('url') or img.get('original')
+                if not url:
+                    continue
+                thumbnail = img.get('thumbnail') or img.get('small') or url
+                alt = img.get('alt', 'Imagen de propiedad')
+            elif isinstance(img, str):
+                url = thumbnail = img
+                alt = 'Imagen de propiedad'
+            else:
+                continue
+            clave = clave_de(url) or calcular(url)
+            if clave not in vistas:
+                vistas.add(clave)
+                imagenes.append({'url': url, 'thumbnail': thumbnail, 'alt': alt})
+        
+        main_img = prop.get('main_image')
+        if isinstance(main_img, dict):
+            url = main_img.get('image') or main_img.get('url')
+            thumbnail = main_img.get('thumbnail') or url
+        else:
+            url = thumbnail = main_img if isinstance(main_img, str) else None
+        if url:
+            clave = clave_de(url) or calcular(url)
+            if clave not in vistas:
+                vistas.add(clave)
+                imagenes.insert(0, {'url': url, 'thumbnail': thumbnail, 'alt': 'Imagen principal'})
+        
+        for foto in prop.get('photos') or ():
+            if isinstance(foto, dict):
+                url = foto.get('url') or foto.get('image')
+                if url:
+                    clave = clave_de(url) or calcular(url)
+                    if clave not in vistas:
+                        vistas.add(clave)
+                        imagenes.append({'url': url, 'thumbnail': foto.get('thumbnail') or url, 'alt': 'Foto de propiedad'})
+        
+        return imagenes
+    
+    @classmethod
+    def _recordar_clave_imagen(cls, url: str) -> str:
+        """Calcula la clave de una URL y la guarda en _claves_imagen."""
+        if len(cls._claves_imagen) >= cls._MAX_CLAVES_IMAGEN:
+            cls._claves_imagen.clear()
+        clave = cls._claves_imagen[url] = cls._clave_imagen(url)
+        return clave
+    
+    @classmethod
+    def _es_marca_tamano(cls, token: str) -> bool:
+        """'800x600', '1024w', 'thumb'... (con o sin prefijo 'outside', 'crop'...)."""
+        if token in cls._MARCAS_TAMANO:
+            return True
+        if token.startswith(cls._PREFIJOS_TAMANO):
+            token = token.lstrip('abcdefghijklmnopqrstuvwxyz')
+        if token.endswith('w'):
+            return token[:-1].isdigit()
+        ancho, x, alto = token.partition('x')
+        return bool(x) and ancho.isdigit() and alto.isdigit()
+    
+    @classmethod
+    def _clave_imagen(cls, url: str) -> str:
+        """
+        Clave de de-duplicación de una URL de imagen: solo la ruta (sin
+        esquema ni host: cdn1/cdn2 sirven la misma foto), sin query ni
+        fragmento y sin las marcas de tamaño del CDN.
+        
+        Solo operaciones de str, y las marcas se buscan únicamente donde
+        pueden aparecer (corre para cada foto de cada propiedad).
+        """
+        clave = url.partition('?')[0].partition('#')[0]
+        inicio = clave.find('//')
+        if inicio >= 0:
+            barra = clave.find('/', inicio + 2)
+            clave = clave[barra:] if barra >= 0 else ''
+        corte = clave.rfind('/')
+        carpeta, archivo = (clave[:corte], clave[corte + 1:]) if corte >= 0 else ('', clave)
+        
+        # Carpeta de tamaño: .../640x480/foto.jpg
+        if carpeta[-1:].isdigit():
+            padre, _, ultima = carpeta.rpartition('/')
+            if cls._es_marca_tamano(ultima):
+                carpeta = padre
+        
+        nombre, punto, extension = archivo.rpartition('.')
+        if not punto:
+            return carpeta + '/' + archivo
+        
+        # Prefijo de tamaño: th.outside600x400.foto.jpg
+        if '.' in nombre:
+            marca, _, resto = nombre.partition('.')
+            if marca == 'th':
+                marca, _, resto = resto.partition('.')
+            if resto and cls._es_marca_tamano(marca):
+                nombre = resto
+        
+        # Sufijo de tamaño: foto_800x600.jpg, foto-thumb.jpg (el chequeo barato
+        # descarta primero los sufijos comunes como '_5')
+        corte = max(nombre.rfind('_'), nombre.rfind('-'))
+        if corte > 0:
+            sufijo = nombre[corte + 1:]
+            if sufijo in cls._MARCAS_TAMANO or (
+                    ('x' in sufijo or sufijo[-1:] == 'w') and cls._es_marca_tamano(sufijo)):
+                nombre = nombre[:corte]
+        
+        return carpeta + '/' + nombre + '.' + extension.lower()
+    
     # ==========================================================================
     # DETECCIÓN DE UBICACIÓN
     # ==========================================================================
@@ -672,42 +1499,26 @@ class InfocasasScraper:
     def _detectar_ubicacion(self, query: str) -> Optional[str]:
         """
         Detecta la ubicación mencionada en un texto de búsqueda.
+        
+        Prioridad: variaciones, barrios de Asunción, ciudades, departamentos
+        (ver ubicaciones.py; el índice se arma una vez desde CONFIG). Si no
+        hay coincidencia exacta se aceptan errores de tipeo ("lamabre").
         """
-        # Normalizar texto
-        query_norm = query.lower()
-        reemplazos = {'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ñ': 'n'}
-        for acento, sin_acento in reemplazos.items():
-            query_norm = query_norm.replace(acento, sin_acento)
-        
-        # Paso 1: Buscar en variaciones (más específicas)
-        for slug, vars_list in self.CONFIG['variaciones'].items():
-            for var in vars_list:
-                pattern = rf'\b{re.escape(var)}\b'
-                if re.search(pattern, query_norm):
-                    return slug
-        
-        # Paso 2: Buscar en barrios de Asunción
-        for barrio in self.CONFIG['barrios_asuncion']:
-            barrio_clean = barrio.replace('-', ' ')
-            pattern = rf'\b{re.escape(barrio_clean)}\b'
-            if re.search(pattern, query_norm):
-                return barrio
-        
-        # Paso 3: Buscar en lista de ciudades
-        for ciudad in self.CONFIG['ciudades']:
-            ciudad_clean = ciudad.replace('-', ' ')
-            pattern = rf'\b{re.escape(ciudad_clean)}\b'
-            if re.search(pattern, query_norm):
-                return ciudad
-        
-        # Paso 4: Buscar en lista de departamentos
-        for depto in self.CONFIG['departamentos']:
-            depto_clean = depto.replace('-', ' ')
-            pattern = rf'\b{re.escape(depto_clean)}\b'
-            if re.search(pattern, query_norm):
-                return depto
-            
-        return None
+        coincidencia = self._resolver_ubicacion(query)
+        return coincidencia.slug if coincidencia else None
+    
+    def _resolver_ubicacion(self, query: str) -> Optional[Coincidencia]:
+        """
+        Como _detectar_ubicacion, pero con el término encontrado, su posición
+        y la confianza (1.0 = exacta).
+        """
+        return self._detector_ubicaciones.resolver(query)
+    
+    def _ubicaciones_en_texto(self, query: str) -> List[Coincidencia]:
+        """
+        Todas las ubicaciones mencionadas en el texto, con sus posiciones.
+        """
+        return self._detector_ubicaciones.coincidencias(query)
 
 
 # =============================================================================
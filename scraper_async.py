@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+INFOCASAS SCRAPER ASÍNCRONO - VERSIÓN PARAGUAY
+=============================================================================
+Variante asyncio de InfocasasScraper para los endpoints async del backend.
+Mantiene la misma semántica de búsqueda (cascada de categorías, filtros,
+estructura de los diccionarios de salida) pero las peticiones HTTP no
+bloquean el event loop, y el parseo de la página corre en el pool de hilos.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Any
+
+import httpx
+
+from cobertura import COBERTURA_CONFIG, contar_cobertura, registrar_latencia, retraso_cobertura
+from metricas import registrar_upstream
+from modelo import Propiedad
+from precarga import PRECARGA_CONFIG, obtener_precarga, obtener_registro
+from replica import grabando, grabar_pagina, redirigir
+from scraper import InfocasasScraper
+from trafico import TraficoRechazado, controlar_async, host_de, interruptor, respuesta_sana
+from transporte import obtener_cliente_async
+from vuelo_unico import VueloUnicoAsync
+
+
+class AsyncInfocasasScraper(InfocasasScraper):
+    """
+    Scraper de InfoCasas Paraguay sobre httpx.AsyncClient.
+
+    Reutiliza de InfocasasScraper la configuración, la construcción de URLs,
+    el parseo de __NEXT_DATA__ y la extracción de datos; solo redefine como
+    corrutinas los métodos que hacen I/O.
+    """
+
+    # Descargas en curso por URL, entre corrutinas (ver vuelo_unico.py)
+    _vuelos_async = VueloUnicoAsync()
+
+    # Refrescos en segundo plano del cache de búsquedas (referencias para que
+    # el event loop no los pierda antes de terminar)
+    _refrescos = set()
+
+    # Precargas en segundo plano (mismo motivo)
+    _precargas = set()
+
+    # ==========================================================================
+    # MÉTODOS DE CONEXIÓN Y REQUESTS
+    # ==========================================================================
+
+    async def _hacer_request(self, url: str, timeout: int = 20) -> Optional[httpx.Response]:
+        """
+        Realiza una petición HTTP usando proxies rotativos o conexión directa.
+        """
+        if self.PROXY_CONFIG['enabled'] and interruptor('proxy').permite():
+            if COBERTURA_CONFIG['activo']:
+                response = await self._request_cubierto(url, timeout)
+            else:
+                response = await self._request_con_proxy(url, timeout)
+        else:
+            response = await self._request_directo(url, timeout)
+        if grabando():
+            grabar_pagina(url, response)
+        return response
+
+    async def _request_con_proxy(self, url: str, timeout: int = 20) -> Optional[httpx.Response]:
+        """Realiza petición usando ProxyScrape (y directo si falla)."""
+        response = await self._intentar_proxy(url, timeout)
+        if response is not None:
+            return response
+        return await self._request_directo(url, timeout)
+
+    async def _intentar_proxy(self, url: str, timeout: int = 20) -> Optional[httpx.Response]:
+        """Una petición por ProxyScrape, sin respaldo: la respuesta 200 o None."""
+        try:
+            async with controlar_async(host_de(self.PROXY_CONFIG['proxy_url'])) as pase:
+                inicio = time.monotonic()
+                response = await obtener_cliente_async().get(
+                    redirigir(self.PROXY_CONFIG['proxy_url']),
+                    params={'apikey': self.PROXY_CONFIG['api_key'], 'url': url},
+                    headers=self.headers,
+                    timeout=timeout,
+                )
+                pase.estado = response.status_code
+            registrar_upstream('proxy', response.status_code, time.monotonic() - inicio)
+            interruptor('proxy').registrar(respuesta_sana(response.status_code))
+
+            if response.status_code == 200:
+                registrar_latencia('proxy', time.monotonic() - inicio)
+                return response
+            else:
+                print(f"[PROXY] Error {response.status_code}, intentando directo...")
+                return None
+
+        except TraficoRechazado as e:
+            registrar_upstream('proxy', 'rechazada')
+            print(f"[PROXY] {e}, intentando directo...")
+            return None
+        except Exception as e:
+            interruptor('proxy').registrar(False)
+            registrar_upstream('proxy', 'error')
+            print(f"[PROXY] Excepción: {e}, intentando directo...")
+            return None
+
+    async def _request_directo(self, url: str, timeout: int = 15) -> Optional[httpx.Response]:
+        """Realiza petición directa sin proxy."""
+        if not interruptor('directo').permite():
+            return None
+        try:
+            async with controlar_async(host_de(url)) as pase:
+                inicio = time.monotonic()
+                response = await obtener_cliente_async().get(redirigir(url), headers=self.headers, timeout=timeout)
+                pase.estado = response.status_code
+            registrar_upstream('directo', response.status_code, time.monotonic() - inicio)
+            interruptor('directo').registrar(respuesta_sana(response.status_code))
+            if response.status_code == 200:
+                registrar_latencia('directo', time.monotonic() - inicio)
+                return response
+            return None
+        except TraficoRechazado:
+            registrar_upstream('directo', 'rechazada')
+            return None
+        except Exception:
+            interruptor('directo').registrar(False)
+            registrar_upstream('directo', 'error')
+            return None
+
+    async def _request_cubierto(self, url: str, timeout: int = 20) -> Optional[httpx.Response]:
+        """
+        Petición por proxy cubierta con una directa (ver la versión sync);
+        acá la perdedora sí se cancela en el momento.
+        """
+        principal = asyncio.ensure_future(self._intentar_proxy(url, timeout))
+        pendientes = {principal}
+        try:
+            hechos, _ = await asyncio.wait(pendientes, timeout=retraso_cobertura('proxy'))
+            if hechos:
+                pendientes = set()
+                response = principal.result()
+                return response if response is not None else await self._request_directo(url, timeout)
+
+            contar_cobertura('disparadas')
+            cubierta = asyncio.ensure_future(self._request_directo(url, timeout))
+            pendientes.add(cubierta)
+            while pendientes:
+                hechos, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in hechos:
+                    response = tarea.result()
+                    if response is not None:
+                        contar_cobertura('ganadas' if tarea is cubierta else 'ganadas_principal')
+                        return response
+            contar_cobertura('sin_respuesta')
+            return None
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    # ==========================================================================
+    # MÉTODOS DE BÚSQUEDA
+    # ==========================================================================
+
+    async def search_properties(self,
+                                operation: str = "venta",
+                                prop_type: str = "inmuebles",
+                                location: str = "asuncion",
+                                min_price: Optional[int] = None,
+                                max_price: Optional[int] = None,
+                                bedrooms: Optional[int] = None,
+                                bathrooms: Optional[int] = None,
+                                page: int = 1,
+                                usar_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Busca propiedades según los filtros especificados.
+        
+        Con INMO_CACHE_SWR=true usa el cache de búsquedas como la versión
+        sync; el refresco de una entrada vieja es una tarea del event loop.
+        """
+        clave = self._clave_busqueda(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, page
+        )
+        if usar_cache and self.cache_busquedas is not None:
+            guardadas, vieja = self.cache_busquedas.obtener_con_estado(clave)
+            if guardadas is not None:
+                if vieja and self.cache_busquedas.reservar_refresco(clave):
+                    tarea = asyncio.ensure_future(self._refrescar_busqueda(clave))
+                    self._refrescos.add(tarea)
+                    tarea.add_done_callback(self._refrescos.discard)
+                self._programar_precarga(clave)
+                return [prop.to_dict() for prop in guardadas]
+
+        _, properties = await self._buscar_con_cascada(*clave, usar_cache)
+        self._guardar_busqueda(clave, properties)
+        if properties:
+            self._programar_precarga(clave)
+        return properties
+
+    async def _refrescar_busqueda(self, clave: tuple):
+        """Vuelve a ejecutar una búsqueda en vivo (en segundo plano) y la guarda."""
+        exito = False
+        try:
+            _, properties = await self._buscar_con_cascada(*clave, False)
+            exito = self._guardar_busqueda(clave, properties)
+        except Exception as e:
+            print(f"[CACHE] Error al refrescar {clave}: {e}")
+        finally:
+            self.cache_busquedas.terminar_refresco(clave, exito)
+
+    def _programar_precarga(self, clave: tuple):
+        """Como la versión sync, con las precargas como tareas del event loop."""
+        if not PRECARGA_CONFIG['activa']:
+            return
+        obtener_registro().registrar(clave)
+        precarga = obtener_precarga()
+        for vecina in precarga.vecinas(clave):
+            if precarga.reservar(vecina):
+                tarea = asyncio.ensure_future(self._precargar(vecina))
+                self._precargas.add(tarea)
+                tarea.add_done_callback(self._precargas.discard)
+
+    async def _precargar(self, clave: tuple) -> bool:
+        """Ejecuta una búsqueda para dejarla en los caches, sin registrarla ni encadenar precargas."""
+        exito = False
+        try:
+            _, properties = await self._buscar_con_cascada(*clave, True)
+            self._guardar_busqueda(clave, properties)
+            exito = bool(properties)
+        except Exception as e:
+            print(f"[PRECARGA] Error al precargar {clave}: {e}")
+        finally:
+            obtener_precarga().terminar(exito)
+        return exito
+
+    async def precalentar(self, cantidad: Optional[int] = None) -> int:
+        """Como la versión sync: las búsquedas más populares del registro, una por una."""
+        if cantidad is None:
+            cantidad = PRECARGA_CONFIG['al_iniciar']
+        if not PRECARGA_CONFIG['activa'] or cantidad <= 0:
+            return 0
+        precarga = obtener_precarga()
+        exitosas = 0
+        for clave in obtener_registro().populares(cantidad):
+            precarga.iniciar_precalentamiento()
+            exitosas += await self._precargar(clave)
+        return exitosas
+
+    async def _buscar_con_cascada(self,
+                                  operation: str,
+                                  prop_type: str,
+                                  location: str,
+                                  min_price: Optional[int] = None,
+                                  max_price: Optional[int] = None,
+                                  bedrooms: Optional[int] = None,
+                                  bathrooms: Optional[int] = None,
+                                  page: int = 1,
+                                  usar_cache: bool = True) -> tuple:
+        """
+        Ejecuta la cascada de categorías y retorna (nivel ganador, propiedades).
+        """
+        # Normalizar ubicación
+        location = self._normalizar_ubicacion(location)
+
+        niveles = self._niveles_cascada(prop_type)
+
+        async def buscar_nivel(tipo_nivel: str) -> List[Dict[str, Any]]:
+            properties = await self._fetch_properties(
+                operation, tipo_nivel, location,
+                min_price, max_price, bedrooms, bathrooms, page,
+                usar_cache=usar_cache
+            )
+            # Filtrar la categoría combinada por el tipo específico pedido
+            if tipo_nivel == 'casas-y-departamentos' and prop_type != tipo_nivel:
+                properties = self._filtrar_por_tipo(properties, prop_type)
+            return properties
+
+        nivel, properties = await self._ejecutar_cascada(niveles, buscar_nivel)
+        self._registrar_ganador(nivel, prop_type)
+        return nivel, properties
+
+    async def iter_properties(self,
+                              operation: str = "venta",
+                              prop_type: str = "inmuebles",
+                              location: str = "asuncion",
+                              min_price: Optional[int] = None,
+                              max_price: Optional[int] = None,
+                              bedrooms: Optional[int] = None,
+                              bathrooms: Optional[int] = None,
+                              max_resultados: Optional[int] = None,
+                              ventana: Optional[int] = None,
+                              usar_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recorre todas las páginas de una búsqueda como generador asíncrono.
+
+        Misma política que InfocasasScraper.iter_properties (ventana de páginas
+        descargadas por adelantado, corte en página vacía o max_resultados,
+        sin repetir ids), con tareas asyncio en lugar de hilos.
+        """
+        ventana = max(1, ventana or self.PAGINACION_CONFIG['ventana'])
+        location = self._normalizar_ubicacion(location)
+        nivel, primera = await self._buscar_con_cascada(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, 1, usar_cache
+        )
+        if nivel is None:
+            return
+
+        def descargar(pagina: int):
+            return asyncio.ensure_future(self._fetch_properties(
+                operation, nivel, location,
+                min_price, max_price, bedrooms, bathrooms, pagina,
+                usar_cache=usar_cache
+            ))
+
+        pendientes = deque()
+        siguiente = 2
+        vistos = set()
+        entregados = 0
+
+        try:
+            pagina_actual = primera
+            while True:
+                # Mantener la ventana de descargas anticipadas llena
+                while len(pendientes) < ventana and siguiente <= self.PAGINACION_CONFIG['max_paginas']:
+                    pendientes.append(descargar(siguiente))
+                    siguiente += 1
+
+                if nivel == 'casas-y-departamentos':
+                    pagina_actual = self._filtrar_por_tipo(pagina_actual, prop_type)
+
+                for prop in pagina_actual:
+                    prop_id = prop['identificacion']['id']
+                    if prop_id is not None:
+                        if prop_id in vistos:
+                            continue
+                        vistos.add(prop_id)
+                    yield prop
+                    entregados += 1
+                    if max_resultados is not None and entregados >= max_resultados:
+                        return
+
+                if not pendientes:
+                    return
+                pagina_actual = await pendientes.popleft()
+                # Página vacía o que solo repite propiedades ya vistas: fin del listado
+                if not pagina_actual or all(p['identificacion']['id'] in vistos for p in pagina_actual):
+                    return
+        finally:
+            for tarea in pendientes:
+                tarea.cancel()
+
+    async def _ejecutar_cascada(self, niveles: List[str], buscar_nivel) -> tuple:
+        """
+        Ejecuta los niveles de la cascada según self.modo_cascada.
+
+        Misma política que InfocasasScraper._ejecutar_cascada, pero con tareas
+        asyncio: los niveles descartados se cancelan de verdad (se corta la
+        petición HTTP en vuelo).
+
+        Returns:
+            Tupla (nivel ganador o None, propiedades)
+        """
+        if self.modo_cascada not in ('especulativo', 'escalonado') or len(niveles) == 1:
+            for nivel in niveles:
+                self._contar_cascada('niveles_lanzados')
+                properties = await buscar_nivel(nivel)
+                if properties:
+                    return nivel, properties
+            return None, []
+
+        tareas = []
+
+        def lanzar():
+            self._contar_cascada('niveles_lanzados')
+            tareas.append(asyncio.ensure_future(buscar_nivel(niveles[len(tareas)])))
+
+        if self.modo_cascada == 'especulativo':
+            while len(tareas) < len(niveles):
+                lanzar()
+        else:
+            lanzar()
+
+        actual = 0
+        try:
+            while actual < len(niveles):
+                pendiente_lanzar = self.modo_cascada == 'escalonado' and len(tareas) < len(niveles)
+                hechos, _ = await asyncio.wait(
+                    [tareas[actual]],
+                    timeout=self.CASCADA_CONFIG['retraso'] if pendiente_lanzar else None
+                )
+                if not hechos:
+                    # El nivel actual tarda: lanzar el siguiente en paralelo
+                    lanzar()
+                    continue
+
+                properties = tareas[actual].result()
+                if properties:
+                    return niveles[actual], properties
+
+                actual += 1
+                if actual < len(niveles) and len(tareas) <= actual:
+                    lanzar()
+            return None, []
+        finally:
+            for tarea in tareas[actual:]:
+                if not tarea.done():
+                    tarea.cancel()
+                    self._contar_cascada('niveles_cancelados')
+
+    async def _fetch_properties(self,
+                                operation: str,
+                                prop_type: str,
+                                location: str,
+                                min_price: Optional[int] = None,
+                                max_price: Optional[int] = None,
+                                bedrooms: Optional[int] = None,
+                                bathrooms: Optional[int] = None,
+                                page: int = 1,
+                                usar_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Método interno que ejecuta la búsqueda real y parsea los resultados.
+        """
+        if usar_cache and self.almacen is not None:
+            # En un hilo: el lock del almacén se comparte con los hilos del
+            # scraper sync y del crawler, y esperarlo bloquearía el loop
+            locales = await asyncio.to_thread(
+                self._buscar_en_almacen,
+                operation, prop_type, location,
+                min_price, max_price, bedrooms, bathrooms, page
+            )
+            if locales is not None:
+                return locales
+        
+        url = self._construir_url_busqueda(
+            operation, prop_type, location,
+            min_price, max_price, bedrooms, bathrooms, page
+        )
+
+        if usar_cache and self.cache_resultados is not None:
+            en_cache = self.cache_resultados.obtener(url)
+            if en_cache is not None:
+                return [prop.to_dict() for prop in en_cache]
+
+        try:
+            # Las corrutinas simultáneas con la misma URL esperan una sola descarga
+            propiedades = await self._vuelos_async.ejecutar(url, lambda: self._descargar_propiedades(url))
+            return [prop.to_dict() for prop in propiedades]
+
+        except Exception as e:
+            print(f"[ERROR] Error al buscar propiedades: {e}")
+            return []
+
+    async def _descargar_propiedades(self, url: str) -> List[Propiedad]:
+        """Descarga y parsea una página de resultados, y la guarda en el cache."""
+        print(f"[SCRAPER] Buscando en: {url}")
+
+        response = await self._hacer_request(url)
+        if not response:
+            return []
+
+        # El parseo es CPU puro: se corre fuera del event loop
+        loop = asyncio.get_running_loop()
+        propiedades = await loop.run_in_executor(None, self._parsear_propiedades, response.content)
+        self._guardar_en_cache(url, propiedades)
+        return propiedades
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+CONTROL DEL TRÁFICO SALIENTE - INMO
+=============================================================================
+Capa compartida por todo el proceso (scraper sync y async) que controla las
+peticiones hacia InfoCasas y ProxyScrape:
+
+- Balde de tokens por host: tasa sostenida + ráfaga máxima.
+- Concurrencia adaptativa (AIMD) por host: el límite de peticiones en curso
+  sube de a poco mientras las respuestas llegan rápido y se reduce a la
+  mitad ante un 429/503, un timeout o una latencia sobre el objetivo.
+- Interruptor (circuit breaker) por ruta ('proxy', 'directo'): tras varias
+  fallas seguidas la ruta se saltea durante un enfriamiento; después se deja
+  pasar una sola petición de prueba para decidir si se cierra de nuevo.
+
+Uso:
+    with controlar(host) as pase:          # async: async with controlar_async(host)
+        respuesta = sesion.get(url)
+        pase.estado = respuesta.status_code
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterator, AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+
+TRAFICO_CONFIG = {
+    'activo': os.getenv('INMO_TRAFICO', 'true').lower() == 'true',
+    # Balde de tokens por host: peticiones/segundo sostenidas y ráfaga
+    'tasa': float(os.getenv('INMO_TRAFICO_TASA', '10')),
+    'rafaga': float(os.getenv('INMO_TRAFICO_RAFAGA', '20')),
+    # Concurrencia adaptativa por host
+    'concurrencia_inicial': float(os.getenv('INMO_TRAFICO_CONCURRENCIA', '16')),
+    'concurrencia_min': float(os.getenv('INMO_TRAFICO_CONCURRENCIA_MIN', '2')),
+    'concurrencia_max': float(os.getenv('INMO_TRAFICO_CONCURRENCIA_MAX', '64')),
+    # Latencia (s) por encima de la cual se reduce la concurrencia
+    'latencia_objetivo': float(os.getenv('INMO_TRAFICO_LATENCIA', '5')),
+    # Espera máxima (s) por token y lugar, sumadas, antes de rechazar la petición
+    'espera_max': float(os.getenv('INMO_TRAFICO_ESPERA_MAX', '10')),
+    # Interruptor por ruta: fallas seguidas para abrir y segundos de enfriamiento
+    'fallas_para_abrir': int(os.getenv('INMO_INTERRUPTOR_FALLAS', '5')),
+    'enfriamiento': float(os.getenv('INMO_INTERRUPTOR_ENFRIAMIENTO', '30')),
+}
+
+# Respuestas que indican que el upstream está saturado o limitándonos
+_STATUS_SATURADO = (429, 503)
+# Respuestas que, además de los 5xx, indican que la ruta no sirve (bloqueo,
+# API key del proxy rechazada)
+_STATUS_RUTA_CAIDA = (401, 403, 407, 429)
+
+
+class TraficoRechazado(Exception):
+    """No hubo lugar (tokens o concurrencia) dentro de la espera máxima."""
+
+
+class BaldeTokens:
+    """Balde de tokens thread-safe; reservar() retorna cuánto esperar."""
+
+    def __init__(self, tasa: float, rafaga: float):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._tokens = rafaga
+        self._actualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reservar(self) -> float:
+        """
+        Toma un token (puede quedar en negativo: el token se "adelanta") y
+        retorna los segundos a esperar antes de usarlo.
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.rafaga, self._tokens + (ahora - self._actualizado) * self.tasa)
+            self._actualizado = ahora
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.tasa
+
+    def devolver(self):
+        """Devuelve un token reservado que no se llegó a usar."""
+        with self._lock:
+            self._tokens = min(self.rafaga, self._tokens + 1)
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            transcurrido = time.monotonic() - self._actualizado
+            return min(self.rafaga, self._tokens + transcurrido * self.tasa)
+
+
+class ConcurrenciaAdaptativa:
+    """
+    Límite de peticiones en curso con AIMD: +1 por cada "ventana" de
+    respuestas buenas, x0.5 ante saturación (como máximo una vez por
+    latencia objetivo, para no colapsar con fallas simultáneas).
+    """
+
+    def __init__(self, inicial: float, minimo: float, maximo: float, latencia_objetivo: float):
+        self.limite = inicial
+        self.minimo = minimo
+        self.maximo = maximo
+        self.latencia_objetivo = latencia_objetivo
+        self.en_curso = 0
+        self.reducciones = 0
+        self._ultima_reduccion = 0.0
+        self._condicion = threading.Condition()
+
+    def intentar_entrar(self) -> bool:
+        with self._condicion:
+            if self.en_curso < int(self.limite):
+                self.en_curso += 1
+                return True
+            return False
+
+    def entrar(self, espera_max: float) -> bool:
+        """Espera (bloqueando el hilo) un lugar libre; False si no hubo."""
+        limite_tiempo = time.monotonic() + espera_max
+        with self._condicion:
+            while self.en_curso >= int(self.limite):
+                restante = limite_tiempo - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._condicion.wait(restante)
+            self.en_curso += 1
+            return True
+
+    async def entrar_async(self, espera_max: float) -> bool:
+        """Como entrar(), sin bloquear el event loop (sondea cada pocos ms)."""
+        limite_tiempo = time.monotonic() + espera_max
+        pausa = 0.005
+        while not self.intentar_entrar():
+            if time.monotonic() >= limite_tiempo:
+                return False
+            await asyncio.sleep(pausa)
+            pausa = min(pausa * 2, 0.1)
+        return True
+
+    def salir(self, latencia: float, saturado: bool, ajustar: bool = True):
+        """Libera el lugar y ajusta el límite según el resultado."""
+        with self._condicion:
+            self.en_curso -= 1
+            if ajustar and (saturado or latencia > self.latencia_objetivo):
+                ahora = time.monotonic()
+                if ahora - self._ultima_reduccion >= self.latencia_objetivo:
+                    self.limite = max(self.minimo, self.limite * 0.5)
+                    self._ultima_reduccion = ahora
+                    self.reducciones += 1
+            elif ajustar:
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self._condicion.notify()
+
+
+class Interruptor:
+    """
+    Circuit breaker de una ruta: 'cerrado' (pasa todo), 'abierto' (no pasa
+    nada hasta que termine el enfriamiento) y 'semiabierto' (una prueba).
+    """
+
+    def __init__(self, nombre: str, fallas_para_abrir: int, enfriamiento: float):
+        self.nombre = nombre
+        self.fallas_para_abrir = fallas_para_abrir
+        self.enfriamiento = enfriamiento
+        self.estado = 'cerrado'
+        self.fallas_seguidas = 0
+        self.aperturas = 0
+        self.salteadas = 0
+        self._abierto_hasta = 0.0
+        self._prueba_desde: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def permite(self) -> bool:
+        """True si la ruta puede usarse ahora (en semiabierto, solo una prueba)."""
+        with self._lock:
+            ahora = time.monotonic()
+            if self.estado == 'abierto' and ahora >= self._abierto_hasta:
+                self.estado = 'semiabierto'
+                self._prueba_desde = None
+            if self.estado == 'cerrado':
+                return True
+            # Una prueba por vez; si nunca se registró su resultado (p. ej. se
+            # rechazó antes de salir), pasado el enfriamiento se permite otra
+            if self.estado == 'semiabierto' and (
+                    self._prueba_desde is None or ahora - self._prueba_desde >= self.enfriamiento):
+                self._prueba_desde = ahora
+                return True
+            self.salteadas += 1
+            return False
+
+    def registrar(self, exito: bool):
+        with self._lock:
+            if exito:
+                self.estado = 'cerrado'
+                self.fallas_seguidas = 0
+                self._prueba_desde = None
+                return
+            self.fallas_seguidas += 1
+            # Las fallas de peticiones que ya estaban en curso no extienden la apertura
+            if self.estado != 'abierto' and (
+                    self.estado == 'semiabierto' or self.fallas_seguidas >= self.fallas_para_abrir):
+                self.aperturas += 1
+                print(f"[TRAFICO] Ruta '{self.nombre}' abierta por {self.enfriamiento:.0f} s "
+                      f"({self.fallas_seguidas} fallas seguidas)")
+                self.estado = 'abierto'
+                self._abierto_hasta = time.monotonic() + self.enfriamiento
+                self._prueba_desde = None
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            restante = max(self._abierto_hasta - time.monotonic(), 0.0) if self.estado == 'abierto' else 0.0
+            return {
+                'estado': self.estado,
+                'fallas_seguidas': self.fallas_seguidas,
+                'aperturas': self.aperturas,
+                'salteadas': self.salteadas,
+                'reabre_en': round(restante, 1),
+            }
+
+
+# =============================================================================
+# REGISTRO COMPARTIDO POR HOST Y POR RUTA
+# =============================================================================
+
+class _ControlHost:
+    def __init__(self, host: str):
+        self.host = host
+        self.balde = BaldeTokens(TRAFICO_CONFIG['tasa'], TRAFICO_CONFIG['rafaga'])
+        self.concurrencia = ConcurrenciaAdaptativa(
+            TRAFICO_CONFIG['concurrencia_inicial'],
+            TRAFICO_CONFIG['concurrencia_min'],
+            TRAFICO_CONFIG['concurrencia_max'],
+            TRAFICO_CONFIG['latencia_objetivo'],
+        )
+        self.contadores = {'peticiones': 0, 'saturadas': 0, 'rechazadas': 0, 'espera_total': 0.0}
+        self._lock = threading.Lock()
+
+    def contar(self, campo: str, valor: float = 1):
+        with self._lock:
+            self.contadores[campo] += valor
+
+    def reservar_token(self) -> float:
+        """Segundos a esperar por el token; rechaza si superan la espera máxima."""
+        espera = self.balde.reservar()
+        if espera > TRAFICO_CONFIG['espera_max']:
+            self.balde.devolver()
+            self.contar('rechazadas')
+            raise TraficoRechazado(f"{self.host}: sin tokens por {espera:.1f} s")
+        return espera
+
+    def rechazar_por_concurrencia(self):
+        self.contar('rechazadas')
+        raise TraficoRechazado(f"{self.host}: concurrencia al límite ({int(self.concurrencia.limite)})")
+
+    def empezar(self, inicio_espera: float) -> float:
+        inicio = time.monotonic()
+        with self._lock:
+            self.contadores['peticiones'] += 1
+            self.contadores['espera_total'] += inicio - inicio_espera
+        return inicio
+
+    def terminar(self, inicio: float, estado: Optional[int], fallo: bool, cancelada: bool = False):
+        saturado = fallo or estado in _STATUS_SATURADO
+        if saturado:
+            self.contar('saturadas')
+        # Una petición cancelada no dice nada sobre el upstream
+        self.concurrencia.salir(time.monotonic() - inicio, saturado, ajustar=not cancelada)
+
+
+class Pase:
+    """Lo que ve quien hace la petición: anota el status recibido."""
+    __slots__ = ('estado',)
+
+    def __init__(self):
+        self.estado: Optional[int] = None
+
+
+_hosts: Dict[str, _ControlHost] = {}
+_interruptores: Dict[str, Interruptor] = {}
+_lock = threading.Lock()
+
+
+def _control(host: str) -> _ControlHost:
+    control = _hosts.get(host)
+    if control is None:
+        with _lock:
+            control = _hosts.setdefault(host, _ControlHost(host))
+    return control
+
+
+def interruptor(ruta: str) -> Interruptor:
+    """Retorna el interruptor compartido de una ruta ('proxy', 'directo')."""
+    actual = _interruptores.get(ruta)
+    if actual is None:
+        with _lock:
+            actual = _interruptores.setdefault(
+                ruta, Interruptor(ruta, TRAFICO_CONFIG['fallas_para_abrir'], TRAFICO_CONFIG['enfriamiento'])
+            )
+    return actual
+
+
+def host_de(url: str) -> str:
+    """Host (con puerto, si lo tiene) de una URL."""
+    return urlsplit(url).netloc
+
+
+def respuesta_sana(estado: int) -> bool:
+    """True si el status indica que la ruta funciona (un 404 es una respuesta válida)."""
+    return estado < 500 and estado not in _STATUS_RUTA_CAIDA
+
+
+@contextmanager
+def controlar(host: str) -> Iterator[Pase]:
+    """
+    Espera token y lugar para una petición a host (bloqueando el hilo), en
+    total hasta TRAFICO_CONFIG['espera_max']. Si no entra, el token vuelve
+    al balde. Una excepción dentro del bloque cuenta como saturación
+    (timeout, conexión).
+
+    Raises:
+        TraficoRechazado: si no hubo lugar dentro de TRAFICO_CONFIG['espera_max']
+    """
+    pase = Pase()
+    if not TRAFICO_CONFIG['activo']:
+        yield pase
+        return
+
+    control = _control(host)
+    inicio_espera = time.monotonic()
+    espera = control.reservar_token()
+    try:
+        if espera:
+            time.sleep(espera)
+        if not control.concurrencia.entrar(TRAFICO_CONFIG['espera_max'] - espera):
+            control.rechazar_por_concurrencia()
+    except BaseException:
+        # Sin lugar (o interrumpida): el token no se usó
+        control.balde.devolver()
+        raise
+    inicio = control.empezar(inicio_espera)
+
+    try:
+        yield pase
+    except (asyncio.CancelledError, GeneratorExit):
+        control.terminar(inicio, pase.estado, fallo=False, cancelada=True)
+        raise
+    except BaseException:
+        control.terminar(inicio, pase.estado, fallo=True)
+        raise
+    control.terminar(inicio, pase.estado, fallo=False)
+
+
+@asynccontextmanager
+async def controlar_async(host: str) -> AsyncIterator[Pase]:
+    """Como controlar(), con esperas que no bloquean el event loop."""
+    pase = Pase()
+    if not TRAFICO_CONFIG['activo']:
+        yield pase
+        return
+
+    control = _control(host)
+    inicio_espera = time.monotonic()
+    espera = control.reservar_token()
+    try:
+        if espera:
+            await asyncio.sleep(espera)
+        if not await control.concurrencia.entrar_async(TRAFICO_CONFIG['espera_max'] - espera):
+            control.rechazar_por_concurrencia()
+    except BaseException:
+        # Sin lugar (o cancelada): el token no se usó
+        control.balde.devolver()
+        raise
+    inicio = control.empezar(inicio_espera)
+
+    try:
+        yield pase
+    except (asyncio.CancelledError, GeneratorExit):
+        control.terminar(inicio, pase.estado, fallo=False, cancelada=True)
+        raise
+    except BaseException:
+        control.terminar(inicio, pase.estado, fallo=True)
+        raise
+    control.terminar(inicio, pase.estado, fallo=False)
+
+
+# =============================================================================
+# ESTADÍSTICAS
+# =============================================================================
+
+def estadisticas_trafico() -> Dict[str, Any]:
+    """Estado de cada host (tokens, concurrencia) y de cada ruta (interruptor)."""
+    hosts = {}
+    for host, control in list(_hosts.items()):
+        concurrencia = control.concurrencia
+        with control._lock:
+            contadores = dict(control.contadores)
+        peticiones = contadores['peticiones']
+        hosts[host] = {
+            'peticiones': peticiones,
+            'saturadas': contadores['saturadas'],
+            'rechazadas': contadores['rechazadas'],
+            'espera_media_ms': round(contadores['espera_total'] / peticiones * 1000, 1) if peticiones else 0.0,
+            'tokens': round(control.balde.tokens, 1),
+            'limite_concurrencia': round(concurrencia.limite, 1),
+            'en_curso': concurrencia.en_curso,
+            'reducciones': concurrencia.reducciones,
+        }
+    return {
+        'activo': TRAFICO_CONFIG['activo'],
+        'hosts': hosts,
+        'rutas': {ruta: i.estadisticas() for ruta, i in list(_interruptores.items())},
+    }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+TRANSPORTE HTTP COMPARTIDO - INMO
+=============================================================================
+Pool de conexiones HTTP único para todo el proceso. Todas las instancias de
+InfocasasScraper y todas las sesiones de AgenteInmoParaguay reutilizan las
+mismas conexiones keep-alive hacia InfoCasas, ProxyScrape y OpenRouter, en
+lugar de pagar DNS + TCP + TLS en cada búsqueda.
+
+Incluye también el cliente asíncrono (httpx) usado por AsyncInfocasasScraper
+y por los endpoints async del backend.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Any
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# =============================================================================
+# CONFIGURACIÓN DEL POOL
+# =============================================================================
+
+HTTP_CONFIG = {
+    # Cantidad de hosts distintos con pool propio (InfoCasas, ProxyScrape, OpenRouter...)
+    'pool_connections': int(os.getenv('INMO_HTTP_POOL_HOSTS', '10')),
+    # Conexiones keep-alive máximas por host
+    'pool_maxsize': int(os.getenv('INMO_HTTP_POOL_MAXSIZE', '20')),
+    # Reintentos a nivel de adaptador: solo fallas de conexión de métodos
+    # idempotentes. Un 5xx no se reintenta acá: cada intento tiene que pasar
+    # por trafico.controlar (un token y un lugar) y verlo el interruptor
+    'reintentos': int(os.getenv('INMO_HTTP_REINTENTOS', '2')),
+    'backoff': float(os.getenv('INMO_HTTP_BACKOFF', '0.3')),
+    # Conexiones simultáneas máximas del cliente async (todas las rutas)
+    'async_max_conexiones': int(os.getenv('INMO_HTTP_ASYNC_MAX_CONEXIONES', '200')),
+}
+
+_lock = threading.Lock()
+_adaptador: HTTPAdapter = None
+_local = threading.local()
+_peticiones = 0
+
+
+def _crear_adaptador() -> HTTPAdapter:
+    """Crea el adaptador con pool de conexiones y política de reintentos."""
+    reintentos = Retry(
+        total=HTTP_CONFIG['reintentos'],
+        connect=HTTP_CONFIG['reintentos'],
+        read=0,
+        backoff_factor=HTTP_CONFIG['backoff'],
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=HTTP_CONFIG['pool_connections'],
+        pool_maxsize=HTTP_CONFIG['pool_maxsize'],
+        max_retries=reintentos,
+        pool_block=False,
+    )
+
+
+def obtener_adaptador() -> HTTPAdapter:
+    """Retorna el adaptador compartido del proceso (se crea una sola vez)."""
+    global _adaptador
+    if _adaptador is None:
+        with _lock:
+            if _adaptador is None:
+                _adaptador = _crear_adaptador()
+    return _adaptador
+
+
+class _SesionContada(requests.Session):
+    """Session que cuenta las peticiones realizadas para las estadísticas."""
+
+    def request(self, *args, **kwargs):
+        global _peticiones
+        with _lock:
+            _peticiones += 1
+        return super().request(*args, **kwargs)
+
+
+def obtener_sesion() -> requests.Session:
+    """
+    Retorna la sesión HTTP del hilo actual.
+
+    requests.Session no es seguro entre hilos (cookies, estado interno), pero
+    el pool de urllib3 sí lo es. Por eso cada hilo tiene su propia Session
+    liviana, y todas montan el mismo adaptador: las conexiones se comparten
+    en todo el proceso.
+    """
+    sesion = getattr(_local, 'sesion', None)
+    if sesion is None:
+        adaptador = obtener_adaptador()
+        sesion = _SesionContada()
+        sesion.mount('https://', adaptador)
+        sesion.mount('http://', adaptador)
+        _local.sesion = sesion
+    return sesion
+
+
+# =============================================================================
+# CLIENTE ASÍNCRONO
+# =============================================================================
+
+_cliente_async: httpx.AsyncClient = None
+_loop_cliente_async = None
+
+
+def obtener_cliente_async() -> httpx.AsyncClient:
+    """
+    Retorna el cliente httpx compartido del event loop actual.
+
+    httpx.AsyncClient queda atado al loop donde se crea; si el loop cambia
+    (tests, scripts con asyncio.run sucesivos) se crea uno nuevo.
+    """
+    global _cliente_async, _loop_cliente_async
+    loop = asyncio.get_running_loop()
+    if _cliente_async is None or _loop_cliente_async is not loop or _cliente_async.is_closed:
+        # Los límites van en el transporte: con transport= explícito httpx
+        # ignora el limits= del cliente
+        _cliente_async = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=HTTP_CONFIG['async_max_conexiones'],
+                    max_keepalive_connections=HTTP_CONFIG['pool_maxsize'],
+                ),
+                retries=HTTP_CONFIG['reintentos'],
+            ),
+            follow_redirects=True,
+        )
+        _loop_cliente_async = loop
+    return _cliente_async
+
+
+async def cerrar_cliente_async():
+    """Cierra el cliente async (llamar al apagar el servidor)."""
+    global _cliente_async, _loop_cliente_async
+    if _cliente_async is not None:
+        await _cliente_async.aclose()
+    _cliente_async = None
+    _loop_cliente_async = None
+
+
+# =============================================================================
+# ESTADÍSTICAS DE REUTILIZACIÓN
+# =============================================================================
+
+def estadisticas_conexiones() -> Dict[str, Any]:
+    """
+    Retorna contadores de conexiones abiertas vs. peticiones por host.
+
+    'reutilizadas' es la cantidad de peticiones que viajaron por una conexión
+    ya abierta (sin handshake nuevo).
+    """
+    hosts = {}
+    adaptador = _adaptador
+    if adaptador is not None:
+        pools = adaptador.poolmanager.pools
+        # Solo la API pública del contenedor de urllib3 (keys + get); get
+        # marca el pool como usado, lo que no cambia nada con pocos hosts
+        for clave in pools.keys():
+            pool = pools.get(clave)
+            if pool is None:
+                continue
+            host = f"{clave.key_scheme}://{clave.key_host}:{clave.key_port}"
+            conexiones = pool.num_connections
+            peticiones = pool.num_requests
+            hosts[host] = {
+                'conexiones_abiertas': conexiones,
+                'peticiones': peticiones,
+                'reutilizadas': max(peticiones - conexiones, 0),
+            }
+
+    total_conexiones = sum(h['conexiones_abiertas'] for h in hosts.values())
+    total_reutilizadas = sum(h['reutilizadas'] for h in hosts.values())
+    return {
+        'peticiones': _peticiones,
+        'conexiones_abiertas': total_conexiones,
+        'reutilizadas': total_reutilizadas,
+        'pool_maxsize': HTTP_CONFIG['pool_maxsize'],
+        'hosts': hosts,
+    }
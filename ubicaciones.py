@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+DETECCIÓN DE UBICACIONES EN TEXTO - INMO
+=============================================================================
+Busca en un mensaje las ubicaciones conocidas del scraper (variaciones,
+barrios de Asunción, ciudades y departamentos de InfocasasScraper.CONFIG).
+
+El índice se arma una sola vez: cada término queda registrado bajo su
+primera palabra, así que una pasada por las palabras del mensaje encuentra
+todas las apariciones (incluidas las superpuestas, como "carmelitas" dentro
+de "las carmelitas") sin compilar ni ejecutar una expresión por término.
+
+La prioridad es la misma que el recorrido original: primero variaciones,
+después barrios, ciudades y departamentos, cada lista en su orden.
+
+Si no hay ninguna coincidencia exacta, resolver() prueba con errores de
+tipeo ("lamabre", "encarnacon", "fdo de la mora"): un índice de trigramas
+de caracteres propone candidatos para cada tramo de 1 a N palabras del
+mensaje y la distancia de edición (con transposiciones) los ordena. La
+confianza es 1 - distancia / largo; por debajo de UBICACIONES_CONFIG
+['confianza_minima'] no se devuelve nada.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+UBICACIONES_CONFIG = {
+    # Resolver errores de tipeo cuando no hay coincidencia exacta
+    'difusa': os.getenv('INMO_UBICACION_DIFUSA', 'true').lower() == 'true',
+    # Confianza mínima (0-1) para aceptar una ubicación aproximada
+    'confianza_minima': float(os.getenv('INMO_UBICACION_CONFIANZA', '0.75')),
+}
+
+# Normalización del texto: minúsculas y sin acentos (como el scraper)
+_SIN_ACENTOS = str.maketrans('áéíóúñ', 'aeioun')
+_PALABRA = re.compile(r'\w+')
+
+# Abreviaturas habituales en nombres de ciudades y barrios
+_ABREVIATURAS = {
+    'fdo': 'fernando', 'sta': 'santa', 'sto': 'santo', 'sn': 'san',
+    'cnel': 'coronel', 'pte': 'presidente', 'pdte': 'presidente',
+    'gral': 'general', 'mcal': 'mariscal', 'pto': 'puerto',
+}
+
+# Palabras del chat que no pueden abrir ni cerrar un tramo aproximado
+# (evita que "centro" se lea como "central" o "limpia" como "limpio"); los
+# artículos quedan afuera porque abren nombres como "los laureles"
+_PALABRAS_COMUNES = frozenset('''
+    a al algo alquiler alquilar barrio busco casa casas centro cerca como compra
+    comprar con de del departamento departamentos depto dormitorios duplex en
+    entre es esta hasta limpia lo mas me mi o oficina para patio piscina por
+    precio que quiero se sin su terreno terrenos un una venta y ya zona
+'''.split())
+
+# Largo mínimo (en letras) de un término o tramo para comparar con errores
+_MIN_LARGO_DIFUSO = 4
+
+
+class Coincidencia(NamedTuple):
+    """Una ubicación encontrada en el texto."""
+    slug: str
+    inicio: int  # posiciones sobre el texto normalizado
+    fin: int
+    termino: str
+    nivel: str  # 'variacion', 'barrio', 'ciudad' o 'departamento'
+    prioridad: int  # menor = gana
+    confianza: float = 1.0  # < 1 si se encontró con errores de tipeo
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y vocales sin acento (mismo largo que el texto original)."""
+    return texto.lower().translate(_SIN_ACENTOS)
+
+
+def _trigramas(texto: str) -> set:
+    """Trigramas de caracteres, con bordes marcados por espacios."""
+    texto = f' {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def distancia_edicion(a: str, b: str, tope: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein (transposiciones contiguas, como
+    'lamabre' -> 'lambare'). Corta en cuanto supera tope y retorna tope + 1.
+    """
+    if abs(len(a) - len(b)) > tope:
+        return tope + 1
+    anterior2: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            costo = ca != cb
+            valor = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + costo)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                valor = min(valor, anterior2[j - 2] + 1)
+            actual[j] = valor
+        if min(actual) > tope:
+            return tope + 1
+        anterior2, anterior = anterior, actual
+    return min(anterior[-1], tope + 1)
+
+
+class DetectorUbicaciones:
+    """
+    Índice de términos de ubicación construido desde la CONFIG del scraper.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        # primera palabra -> [(término, slug, nivel, prioridad)] en orden de prioridad
+        self._por_palabra: Dict[str, List[Tuple[str, str, str, int]]] = {}
+        self._vistos = set()
+        self._prioridad = 0
+
+        for slug, variaciones in config.get('variaciones', {}).items():
+            for variacion in variaciones:
+                self._agregar(variacion, slug, 'variacion')
+        for nivel, clave in (('barrio', 'barrios_asuncion'), ('ciudad', 'ciudades'),
+                             ('departamento', 'departamentos')):
+            for slug in config.get(clave, []):
+                self._agregar(slug.replace('-', ' '), slug, nivel)
+
+        del self._vistos
+        self._armar_indice_difuso()
+
+    def _agregar(self, termino: str, slug: str, nivel: str):
+        prioridad = self._prioridad
+        self._prioridad += 1
+        primera = _PALABRA.match(termino)
+        # Un término que no empieza con letra nunca cumplía el \b inicial
+        if primera is None or primera.start() != 0 or (termino, slug) in self._vistos:
+            return
+        self._vistos.add((termino, slug))
+        self._por_palabra.setdefault(primera.group(0), []).append((termino, slug, nivel, prioridad))
+
+    def _armar_indice_difuso(self):
+        """Índice trigrama -> términos (uno por texto, el de mayor prioridad)."""
+        terminos: Dict[str, Tuple[str, str, str, int]] = {}
+        for candidatos in self._por_palabra.values():
+            for termino, slug, nivel, prioridad in candidatos:
+                # Los términos con acento nunca se ven en el texto normalizado
+                if len(termino) >= _MIN_LARGO_DIFUSO and termino == normalizar(termino):
+                    if termino not in terminos or prioridad < terminos[termino][3]:
+                        terminos[termino] = (termino, slug, nivel, prioridad)
+
+        self._terminos_difusos = list(terminos.values())
+        self._trigramas_termino = [len(_trigramas(t[0])) for t in self._terminos_difusos]
+        self._por_trigrama: Dict[str, List[int]] = defaultdict(list)
+        for posicion, (termino, _, _, _) in enumerate(self._terminos_difusos):
+            for trigrama in _trigramas(termino):
+                self._por_trigrama[trigrama].append(posicion)
+        self._max_palabras = max((t[0].count(' ') + 1 for t in self._terminos_difusos), default=1)
+
+    def coincidencias(self, texto: str) -> List[Coincidencia]:
+        """
+        Todas las ubicaciones del texto, en orden de aparición (a igual
+        posición, por prioridad). Un término cuenta solo como palabra entera.
+        """
+        norm = normalizar(texto)
+        palabras = list(_PALABRA.finditer(norm))
+        fines = {palabra.end() for palabra in palabras}
+
+        encontradas: List[Coincidencia] = []
+        for palabra in palabras:
+            candidatos = self._por_palabra.get(palabra.group(0))
+            if not candidatos:
+                continue
+            inicio = palabra.start()
+            for termino, slug, nivel, prioridad in candidatos:
+                fin = inicio + len(termino)
+                if fin in fines and norm.startswith(termino, inicio):
+                    encontradas.append(Coincidencia(slug, inicio, fin, termino, nivel, prioridad))
+        return encontradas
+
+    def detectar(self, texto: str) -> Optional[str]:
+        """Slug de la ubicación de mayor prioridad mencionada, o None."""
+        encontradas = self.coincidencias(texto)
+        if not encontradas:
+            return None
+        return min(encontradas, key=lambda c: c.prioridad).slug
+
+    def aproximadas(self, texto: str, confianza_minima: Optional[float] = None,
+                    limite: int = 3) -> List[Coincidencia]:
+        """
+        Ubicaciones escritas con errores: para cada tramo de palabras del
+        mensaje, los términos con trigramas en común se ordenan por distancia
+        de edición. Retorna las mejores (una por slug), de mayor a menor
+        confianza.
+        """
+        if confianza_minima is None:
+            confianza_minima = UBICACIONES_CONFIG['confianza_minima']
+        norm = normalizar(texto)
+        palabras = [(p.group(0), p.start(), p.end()) for p in _PALABRA.finditer(norm)]
+
+        mejores: Dict[str, Coincidencia] = {}
+        for i in range(len(palabras)):
+            if palabras[i][0] in _PALABRAS_COMUNES:
+                continue
+            for j in range(i, min(i + self._max_palabras, len(palabras))):
+                if palabras[j][0] in _PALABRAS_COMUNES:
+                    continue
+                tramo = ' '.join(_ABREVIATURAS.get(p[0], p[0]) for p in palabras[i:j + 1])
+                if len(tramo) < _MIN_LARGO_DIFUSO:
+                    continue
+                for coincidencia in self._candidatos(tramo, palabras[i][1], palabras[j][2], confianza_minima):
+                    actual = mejores.get(coincidencia.slug)
+                    if actual is None or (coincidencia.confianza, -coincidencia.prioridad) > (actual.confianza, -actual.prioridad):
+                        mejores[coincidencia.slug] = coincidencia
+
+        return sorted(mejores.values(), key=lambda c: (-c.confianza, c.prioridad))[:limite]
+
+    def _candidatos(self, tramo: str, inicio: int, fin: int, confianza_minima: float) -> List[Coincidencia]:
+        """Términos parecidos a un tramo, con confianza >= confianza_minima."""
+        trigramas = _trigramas(tramo)
+        comunes: Dict[int, int] = defaultdict(int)
+        for trigrama in trigramas:
+            for posicion in self._por_trigrama.get(trigrama, ()):
+                comunes[posicion] += 1
+
+        resultado = []
+        for posicion, cantidad in comunes.items():
+            # Filtro barato (Dice sobre trigramas) antes de la distancia de edición
+            if 2 * cantidad < 0.4 * (len(trigramas) + self._trigramas_termino[posicion]):
+                continue
+            termino, slug, nivel, prioridad = self._terminos_difusos[posicion]
+            largo = max(len(tramo), len(termino))
+            tope = int(largo * (1 - confianza_minima))
+            distancia = distancia_edicion(tramo, termino, tope)
+            if distancia <= tope:
+                resultado.append(Coincidencia(slug, inicio, fin, termino, nivel, prioridad,
+                                              round(1 - distancia / largo, 3)))
+        return resultado
+
+    def resolver(self, texto: str) -> Optional[Coincidencia]:
+        """
+        La ubicación del texto: la coincidencia exacta de mayor prioridad o,
+        si no hay y UBICACIONES_CONFIG['difusa'] está activo, la aproximada
+        de mayor confianza.
+        """
+        encontradas = self.coincidencias(texto)
+        if encontradas:
+            return min(encontradas, key=lambda c: c.prioridad)
+        if UBICACIONES_CONFIG['difusa']:
+            aproximadas = self.aproximadas(texto, limite=1)
+            if aproximadas:
+                return aproximadas[0]
+        return None
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+=============================================================================
+VUELO ÚNICO (COALESCENCIA DE PETICIONES IDÉNTICAS) - INMO
+=============================================================================
+Cuando una búsqueda se pone de moda, muchas sesiones piden la misma URL de
+InfoCasas al mismo tiempo. Con un vuelo único por clave, la primera llamada
+hace la descarga y el parseo, y las que llegan mientras tanto esperan ese
+mismo resultado en lugar de repetir el trabajo.
+
+- VueloUnico: para hilos (scraper sync, pool de la cascada y paginación).
+- VueloUnicoAsync: para corrutinas (AsyncInfocasasScraper). La tarea se
+  comparte con asyncio.shield: si se cancela quien la inició, las demás
+  siguen esperando el resultado.
+
+El resultado se comparte tal cual entre todos los que esperan: debe ser
+inmutable o copiarse antes de modificarlo.
+
+Autor: Guaraniux
+Fecha: 2024
+=============================================================================
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Vuelo:
+    __slots__ = ('evento', 'resultado', 'error', 'esperando')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.error: Optional[BaseException] = None
+        self.esperando = 0
+
+
+class _Contadores:
+    """Estadísticas comunes a las dos variantes."""
+
+    def __init__(self):
+        self._lock_contadores = threading.Lock()
+        # Ejecuciones reales (una por vuelo)
+        self.vuelos = 0
+        # Llamadas que esperaron un vuelo en curso en lugar de ejecutar
+        self.coalescidas = 0
+        # Máximo de llamadas que esperaron un mismo vuelo
+        self.max_esperando = 0
+        # Vuelos en curso, por clave
+        self._vuelos: Dict[Any, Any] = {}
+
+    def _contar(self, lider: bool, esperando: int = 0):
+        with self._lock_contadores:
+            if lider:
+                self.vuelos += 1
+            else:
+                self.coalescidas += 1
+                self.max_esperando = max(self.max_esperando, esperando)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock_contadores:
+            return {
+                'vuelos': self.vuelos,
+                'coalescidas': self.coalescidas,
+                'max_esperando': self.max_esperando,
+                'en_vuelo': self._en_vuelo(),
+            }
+
+    def _en_vuelo(self) -> int:
+        return len(self._vuelos)
+
+
+class VueloUnico(_Contadores):
+    """Coalescencia por clave entre hilos."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave: str, funcion: Callable[[], Any]) -> Any:
+        """
+        Ejecuta funcion() o, si ya hay un vuelo con la misma clave, espera su
+        resultado (o su excepción).
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+            else:
+                vuelo.esperando += 1
+                esperando = vuelo.esperando
+
+        if not lider:
+            self._contar(False, esperando)
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        self._contar(True)
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.evento.set()
+
+
+class VueloUnicoAsync(_Contadores):
+    """Coalescencia por clave entre corrutinas del mismo event loop."""
+
+    def __init__(self):
+        super().__init__()
+        # _vuelos: (id del loop, clave) -> [tarea, cantidad esperando]
+
+    async def ejecutar(self, clave: str, funcion: Callable[[], Awaitable[Any]]) -> Any:
+        """Como VueloUnico.ejecutar, con funcion() una corrutina."""
+        llave = (id(asyncio.get_running_loop()), clave)
+        vuelo = self._vuelos.get(llave)
+        if vuelo is None:
+            tarea = asyncio.ensure_future(funcion())
+            vuelo = self._vuelos[llave] = [tarea, 0]
+            tarea.add_done_callback(lambda _, llave=llave: self._vuelos.pop(llave, None))
+            self._contar(True)
+        else:
+            vuelo[1] += 1
+            self._contar(False, vuelo[1])
+        return await asyncio.shield(vuelo[0])